@@ -0,0 +1,105 @@
+"""
+Compares the cache codec with pickle and pydantic json.
+
+Prints the size of an encoded entry and the time needed
+to encode and decode it.
+
+    python benchmarks/cache_codec.py
+
+The digicubes_flask package has to be importable, e.g. after
+``pip install -e .``
+"""
+import pickle
+import timeit
+from datetime import date, datetime, timedelta
+from typing import List
+
+from pydantic import parse_raw_as
+
+from digicubes_flask.client.cache import codec
+from digicubes_flask.client.model import (CourseModel, RoleModel, SchoolModel,
+                                          UnitModel, UserModel)
+
+NOW = datetime(2021, 4, 1, 12, 30, 15)
+
+SAMPLES = {
+    "user": UserModel(
+        id=4711,
+        created_at=NOW,
+        modified_at=NOW,
+        verified_at=NOW,
+        last_login_at=NOW,
+        first_name="Marion",
+        last_name="Nebuhr",
+        login="mnebuhr",
+        email="marion.nebuhr@example.org",
+        is_active=True,
+        is_verified=True,
+    ),
+    "role": RoleModel(id=3, created_at=NOW, modified_at=NOW, name="teacher", home_route="t.home"),
+    "school": SchoolModel(
+        id=12, created_at=NOW, modified_at=NOW, name="Schule", description="x" * 200
+    ),
+    "course": CourseModel(
+        id=7,
+        created_at=NOW,
+        modified_at=NOW,
+        school_id=12,
+        name="Python",
+        is_private=False,
+        description="Learning python" * 10,
+        created_by_id=4711,
+        from_date=date(2021, 4, 1),
+        until_date=date(2021, 7, 1),
+    ),
+    "unit": UnitModel(id=9, course_id=7, name="Loops", position=1, is_active=True, is_visible=True),
+}
+# Distinct values, as in real data. Pickle would store identical objects only once.
+SAMPLES["user list (100)"] = [
+    SAMPLES["user"].copy(
+        update={
+            "id": i,
+            "login": f"user{i}",
+            "email": f"user{i}@example.org",
+            "created_at": NOW - timedelta(days=i, seconds=i * 7),
+            "modified_at": NOW - timedelta(hours=i, seconds=i * 13),
+            "verified_at": NOW - timedelta(days=i, minutes=i),
+            "last_login_at": NOW - timedelta(minutes=i * 3),
+        }
+    )
+    for i in range(1, 101)
+]
+
+NUMBER = 2000
+
+
+def measure(name, dumps, loads, value):
+    raw = dumps(value)
+    encode_time = timeit.timeit(lambda: dumps(value), number=NUMBER) / NUMBER
+    decode_time = timeit.timeit(lambda: loads(raw), number=NUMBER) / NUMBER
+    print(
+        f"    {name:8} {len(raw):7d} bytes "
+        f"{encode_time * 1e6:9.1f} us {decode_time * 1e6:9.1f} us"
+    )
+
+
+def main():
+    print(f"    {'codec':8} {'size':>13} {'encode':>12} {'decode':>12}")
+    for sample_name, value in SAMPLES.items():
+        print(sample_name)
+        measure("pickle", pickle.dumps, pickle.loads, value)
+        if isinstance(value, list):
+            model = type(value[0])
+            measure(
+                "json",
+                lambda v: ("[" + ",".join(item.json() for item in v) + "]").encode(),
+                lambda raw, m=model: parse_raw_as(List[m], raw),
+                value,
+            )
+        else:
+            measure("json", lambda v: v.json().encode(), type(value).parse_raw, value)
+        measure("codec", codec.encode, codec.decode, value)
+
+
+if __name__ == "__main__":
+    main()
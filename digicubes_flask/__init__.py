@@ -61,11 +61,13 @@ class CurrentUser:
         self._roles: Optional[List[str]] = None
         self._dbuser = None
         self._token = None
+        self._user_id = None
         self._lifetime = None
         self._expires_at = None
 
     def set_data(self, data: BearerTokenData):
         self._token = data.bearer_token
+        self._user_id = data.user_id
         self._lifetime = data.lifetime
         self._expires_at = data.expires_at
 
@@ -77,6 +79,8 @@ class CurrentUser:
         g.pop("digiuser", None)
         self._dbuser = None
         self._rights = None
+        self._roles = None
+        self._user_id = None
         self._lifetime = None
         self._expires_at = None
 
@@ -138,6 +142,12 @@ class CurrentUser:
         """
         return right in self.rights or "no_limits" in self.rights
 
+    def has_role(self, role_name: str) -> bool:
+        """
+        Test, wether the current user has the given role.
+        """
+        return role_name in self.roles
+
     @property
     def is_root(self) -> bool:
         """
@@ -146,28 +156,48 @@ class CurrentUser:
         return self.has_right("no_limits")
 
     @property
-    def rights(self):
+    def rights(self) -> List[str]:
         """
         Getting the lazy loaded rights for the current
         user.
+
+        The rights are loaded once per request. Between requests
+        they are kept in the cache of the account manager, until
+        they expire or the roles of the user are changed.
         """
         if self.token is None:
             return []
 
         if self._rights is None:
-            self._rights = [str(r) for r in account_manager.user.get_my_rights(self.token)]
+            cache = account_manager.cache
+            rights = None if self._user_id is None else cache.get_user_rights(self._user_id)
+            if rights is None:
+                rights = [str(r) for r in account_manager.user.get_my_rights(self.token)]
+                if self._user_id is not None:
+                    cache.set_user_rights(self._user_id, rights)
+            self._rights = rights
 
         return self._rights
 
     @property
     def roles(self) -> List[str]:
+        """
+        Getting the names of the lazy loaded roles for the
+        current user. Roles are cached like the rights.
+        """
         if self.token is None:
             return []
 
         if self._roles is None:
-            # Lazy load the rols of the current user
-            # TODO: get_my_roles gibt es noch nicht.
-            self._roles = [str(r) for r in account_manager.user.get_my_roles(self.token)]
+            cache = account_manager.cache
+            roles = None if self._user_id is None else cache.get_user_roles(self._user_id)
+            if roles is None:
+                roles = account_manager.user.get_my_roles(self.token)
+                if self._user_id is not None:
+                    cache.set_user_roles(self._user_id, roles)
+            self._roles = [role.name for role in roles]
+
+        return self._roles
 
 
 def _get_current_user():
@@ -1,17 +1,23 @@
 """
     Client for the DigiCubeServer
 """
+import hashlib
 import logging
-
-import requests
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
 
 from digicubes_flask.client.model import BearerTokenData
 from digicubes_flask.exceptions import DoesNotExist, ServerError, TokenExpired
 
+from .async_client import AsyncDigiCubeClient
 from .cache import create_cache
+from .parallel import WORKER_THREAD_PREFIX, FetchGroup
 from .service import RightService, RoleService, SchoolService, UserService
+from .transport import Transport, create_transport
 
-__all__ = ["DigiCubeClient"]
+__all__ = ["DigiCubeClient", "AsyncDigiCubeClient", "FetchGroup"]
 
 logger = logging.getLogger(__name__)
 
@@ -37,7 +43,14 @@ class DigiCubeClient:
         "right_service",
         "school_service",
         "requests",
+        "transport",
         "cache",
+        "max_workers",
+        "token_refresh_window",
+        "token_cache_max_age",
+        "_executor",
+        "_executor_pid",
+        "_executor_lock",
         "__token",
     ]
 
@@ -52,7 +65,10 @@ class DigiCubeClient:
         self.right_service = RightService(self)
         self.school_service = SchoolService(self)
 
-        self.requests = requests
+        # The pooled http transport. It offers the same api as
+        # the requests module, so the services can use it directly.
+        self.transport: Transport = create_transport()
+        self.requests = self.transport
 
         # The configured cache. The function returns always
         # a valid cache object. When no implementation is spcified,
@@ -60,6 +76,67 @@ class DigiCubeClient:
         # but can be used in the code.
         self.cache = create_cache()
 
+        # Number of threads used to run service calls concurrently.
+        # Defaults to the size of the connection pool, so concurrent
+        # calls never have to wait for a free connection.
+        self.max_workers = int(os.getenv("DC_CLIENT_WORKERS", str(self.transport.pool_size)))
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+
+        # Verified tokens are cached, until they are this
+        # many seconds away from their expiration.
+        self.token_refresh_window = int(os.getenv("DC_TOKEN_REFRESH_WINDOW", "300"))
+        self.token_cache_max_age = int(os.getenv("DC_TOKEN_CACHE_MAX_AGE", "600"))
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        The thread pool used to run service calls concurrently.
+        The pool is created lazily per process, so forked workers
+        never inherit the threads of their parent.
+        """
+        pid = os.getpid()
+        if self._executor_pid != pid:
+            with self._executor_lock:
+                if self._executor_pid != pid:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=WORKER_THREAD_PREFIX
+                    )
+                    self._executor_pid = pid
+        return self._executor
+
+    def parallel(self) -> FetchGroup:
+        """
+        Returns a new group to run independent service
+        calls concurrently. See :class:`FetchGroup`.
+        """
+        return FetchGroup(self.executor)
+
+    def gather(self, *calls: Callable[[], Any]) -> List[Any]:
+        """
+        Runs the given argumentless callables concurrently and returns
+        their results in the same order. Exceptions are propagated
+        unchanged.
+        """
+        group = self.parallel()
+        for call in calls:
+            group.submit(call)
+        return group.wait()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Returns statistics about the http connection pool
+        of the current process.
+        """
+        return self.transport.stats()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Returns the counters of the configured cache.
+        """
+        return self.cache.statistics()
+
     def generate_token_for(self, login: str, password: str) -> BearerTokenData:
         """
         Log into the server with the given credentials.
@@ -97,7 +174,9 @@ class DigiCubeClient:
         """
         token = self.generate_token_for(login, password)
         me = self.user_service.me(token.bearer_token)
-        self.cache.set_user(me)
+        # The token is renewed with the next request, so
+        # the user is cached without access for this token.
+        self.cache.set_user(None, me)
         return token
 
     def url_for(self, route: str, **kwargs):
@@ -144,6 +223,65 @@ class DigiCubeClient:
 
         raise ServerError("A server error occurred.")
 
+    @staticmethod
+    def token_key(token: str) -> str:
+        """
+        Returns the key, under which the data for the token
+        is cached. The token itself is never used as a key.
+        """
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def verify_token(self, token) -> BearerTokenData:
+        """
+        Verifies the token and returns the current token data.
+
+        The result of a successful refresh is cached for the old and
+        the new token. As long as the cached data is valid, no request
+        is sent to the server. A new token is requested, when the
+        cached data is within ``token_refresh_window`` seconds of its
+        expiration or older than ``token_cache_max_age`` seconds.
+
+        :raises TokenExpired: If the token is not valid anymore.
+        """
+        key = self.token_key(token)
+        data = self.cache.get_token_data(key)
+        if data is not None:
+            return data
+
+        data = self.refresh_token(token)
+        max_age = min(self.token_cache_max_age, data.lifetime - self.token_refresh_window)
+        if max_age > 0:
+            new_key = self.token_key(data.bearer_token)
+            self.cache.set_token_data(key, data, max_age)
+            self.cache.set_token_data(new_key, data, max_age)
+            if new_key != key:
+                # Remember the old token, so it is forgotten
+                # together with the new one.
+                self.cache.set_token_origin(new_key, key, max_age)
+
+        return data
+
+    def forget_token(self, token) -> None:
+        """
+        Removes the cached data of the token. The next
+        verification will ask the server again.
+
+        The data of a refreshed token is cached for the old and the
+        new token. Both entries are removed, whichever token is given.
+        """
+        key = self.token_key(token)
+        keys = {key}
+        data = self.cache.get_token_data(key)
+        if data is not None:
+            keys.add(self.token_key(data.bearer_token))
+
+        for token_hash in list(keys):
+            origin = self.cache.get_token_origin(token_hash)
+            if origin is not None:
+                keys.add(origin)
+
+        self.cache.delete_token_data(*keys)
+
     def home_routes(self):
         url = self.url_for("/info/")
         response = self.requests.post(f"{url}?w=home_routes")
@@ -0,0 +1,158 @@
+"""
+    Asyncio client for the DigiCubeServer
+"""
+import asyncio
+import functools
+import logging
+from typing import Any, Callable, Optional
+
+from digicubes_flask.client.model import BearerTokenData
+
+from .service.abstract_service import AbstractService
+
+__all__ = ["AsyncDigiCubeClient"]
+
+logger = logging.getLogger(__name__)
+
+# Helpers of the services, that neither block nor do any io. They
+# are returned unchanged. Every other method is run on the pool.
+SYNC_HELPERS = frozenset(["create_default_header", "url_for", "check_response_status"])
+
+
+class AsyncService:
+    """
+    Base class for the async services.
+
+    Every public method of the wrapped service, including the bulk
+    helpers like ``resolve_many`` or ``run_bulk``, is offered as a
+    coroutine function with the same signature. The calls are executed
+    on the thread pool of the blocking client and share its pooled
+    http transport. Results are the same pydantic models and errors
+    are the same :class:`digicubes_flask.exceptions.DigiCubeError`
+    subclasses, that the blocking service returns or raises.
+    """
+
+    __slots__ = ["client", "service"]
+
+    def __init__(self, client: "AsyncDigiCubeClient", service: AbstractService) -> None:
+        self.client = client
+        self.service = service
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        attr = getattr(self.service, name)
+        if not callable(attr) or name in SYNC_HELPERS:
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await self.client.run(attr, *args, **kwargs)
+
+        return call
+
+
+class AsyncUserService(AsyncService):
+    """
+    Async version of the :class:`digicubes_flask.client.service.UserService`
+    """
+
+
+class AsyncRoleService(AsyncService):
+    """
+    Async version of the :class:`digicubes_flask.client.service.RoleService`
+    """
+
+
+class AsyncRightService(AsyncService):
+    """
+    Async version of the :class:`digicubes_flask.client.service.RightService`
+    """
+
+
+class AsyncSchoolService(AsyncService):
+    """
+    Async version of the :class:`digicubes_flask.client.service.SchoolService`
+    """
+
+
+class AsyncDigiCubeClient:
+    """
+    The asyncio client to communicate with the digicube server.
+
+    It wraps a blocking :class:`digicubes_flask.client.DigiCubeClient`
+    and offers the same services with ``async def`` methods. So many
+    calls can be awaited concurrently, e.g. with ``asyncio.gather``:
+
+    .. code-block:: python
+
+        client = AsyncDigiCubeClient(hostname="dcrest")
+        user, roles = await asyncio.gather(
+            client.user_service.get(token, user_id),
+            client.role_service.all(token),
+        )
+
+    The number of concurrently running calls is limited by the thread
+    pool of the blocking client (``DC_CLIENT_WORKERS``).
+    """
+
+    __slots__ = [
+        "client",
+        "user_service",
+        "role_service",
+        "right_service",
+        "school_service",
+    ]
+
+    def __init__(
+        self,
+        protocol: str = "http",
+        hostname: str = "localhost",
+        port: int = 3548,
+        client: Optional[Any] = None,
+    ) -> None:
+        if client is None:
+            from digicubes_flask.client import \
+                DigiCubeClient  # pylint: disable=import-outside-toplevel
+
+            client = DigiCubeClient(protocol=protocol, hostname=hostname, port=port)
+
+        self.client = client
+        self.user_service = AsyncUserService(self, client.user_service)
+        self.role_service = AsyncRoleService(self, client.role_service)
+        self.right_service = AsyncRightService(self, client.right_service)
+        self.school_service = AsyncSchoolService(self, client.school_service)
+
+    @property
+    def cache(self):
+        """The cache of the wrapped client"""
+        return self.client.cache
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Runs a blocking function on the thread pool of the
+        client and returns its result.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.client.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def generate_token_for(self, login: str, password: str) -> BearerTokenData:
+        """
+        Async version of :meth:`DigiCubeClient.generate_token_for`
+        """
+        return await self.run(self.client.generate_token_for, login, password)
+
+    async def login(self, login: str, password: str) -> BearerTokenData:
+        """
+        Async version of :meth:`DigiCubeClient.login`
+        """
+        return await self.run(self.client.login, login, password)
+
+    async def refresh_token(self, token: str) -> BearerTokenData:
+        """
+        Async version of :meth:`DigiCubeClient.refresh_token`
+        """
+        return await self.run(self.client.refresh_token, token)
@@ -1,14 +1,32 @@
 import os
 
-from .cache import Cache
+from digicubes_flask.exceptions import ConfigurationError
+
+from .cache import Cache, CacheStats
+from .invalidation_listener import InvalidationListener
+from .memory_cache import MemoryCache
 from .redis_cache import RedisCache
+from .tiered_cache import TieredCache
 
+__all__ = [
+    "Cache",
+    "CacheStats",
+    "InvalidationListener",
+    "MemoryCache",
+    "RedisCache",
+    "TieredCache",
+    "create_cache",
+]
+
+
+def _create_memory_cache(max_age: str) -> MemoryCache:
+    return MemoryCache(
+        max_entries=int(os.getenv("DC_CACHE_MAX_ENTRIES", "10000")),
+        max_age=int(max_age),
+    )
 
-def create_cache():
-    redis_server = os.getenv("DC_REDIS_HOST")
-    if redis_server is None:
-        return Cache()
 
+def _create_redis_cache(redis_server: str) -> RedisCache:
     return RedisCache(
         **{
             "host": redis_server,
@@ -16,5 +34,40 @@ def create_cache():
             "password": os.getenv("DC_REDIS_PASSWORD"),
             "port": int(os.getenv("DC_REDIS_PORT", "6379")),
             "max_age": int(os.getenv("DC_REDIS_MAX_AGE", "1800")),
+            "prefix": os.getenv("DC_REDIS_PREFIX", "dcweb:"),
         }
     )
+
+
+def create_cache() -> Cache:
+    """
+    Creates the configured cache.
+
+    The backend is selected by ``DC_CACHE_BACKEND``, which is one of
+    ``none``, ``memory``, ``redis`` or ``tiered``. If it is not set,
+    redis is used when ``DC_REDIS_HOST`` is set and nothing is cached
+    otherwise. The in-process cache has to be selected explicitly, as
+    changes made by other worker processes are not visible to it
+    before its entries expire.
+    """
+    redis_server = os.getenv("DC_REDIS_HOST")
+    backend = os.getenv("DC_CACHE_BACKEND", "none" if redis_server is None else "redis")
+    backend = backend.lower()
+
+    if backend not in ("none", "memory", "redis", "tiered"):
+        raise ConfigurationError(f"Unknown cache backend '{backend}'")
+
+    if backend == "none":
+        cache = Cache()
+    elif backend == "memory" or redis_server is None:
+        cache = _create_memory_cache(os.getenv("DC_CACHE_MAX_AGE", "1800"))
+    elif backend == "tiered":
+        cache = TieredCache(
+            _create_memory_cache(os.getenv("DC_CACHE_L1_MAX_AGE", "60")),
+            _create_redis_cache(redis_server),
+        )
+    else:
+        cache = _create_redis_cache(redis_server)
+
+    cache.access_max_age = int(os.getenv("DC_CACHE_ACCESS_MAX_AGE", "300"))
+    return cache
@@ -1,29 +1,395 @@
-from typing import List, Optional
+import threading
+from typing import Any, Dict, Iterable, List, Optional
 
-from digicubes_flask.client.model import RoleModel, UserModel
+from digicubes_flask.client.model import (BearerTokenData, CourseModel,
+                                          RightModel, RoleModel, SchoolModel,
+                                          UnitModel, UserModel)
+
+
+# The keys used by the cache. Service methods changing data
+# refer to the same formats in their ``invalidates`` declaration.
+
+
+def user_key(user_id: int) -> str:
+    return f"USER:{user_id}"
+
+
+def user_rights_key(user_id: int) -> str:
+    return f"USER:{user_id}:RIGHTS"
+
+
+def user_roles_key(user_id: int) -> str:
+    return f"USER:{user_id}:ROLES"
+
+
+def token_key(token_hash: str) -> str:
+    return f"TOKEN:{token_hash}"
+
+
+def token_origin_key(token_hash: str) -> str:
+    return f"TOKEN:{token_hash}:ORIGIN"
+
+
+def access_key(token_hash: str, key: str) -> str:
+    return f"ACCESS:{token_hash}:{key}"
+
+
+def school_key(school_id: int) -> str:
+    return f"SCHOOL:{school_id}"
+
+
+def school_courses_key(school_id: int) -> str:
+    return f"SCHOOL:{school_id}:COURSES"
+
+
+def course_key(course_id: int) -> str:
+    return f"COURSE:{course_id}"
+
+
+def course_units_key(course_id: int) -> str:
+    return f"COURSE:{course_id}:UNITS"
+
+
+def unit_key(unit_id: int) -> str:
+    return f"UNIT:{unit_id}"
+
+
+def import_key(job_id: str) -> str:
+    return f"IMPORT:{job_id}"
+
+
+ROLES_KEY = "ROLES"
+RIGHTS_KEY = "RIGHTS"
+
+
+class CacheStats:
+    """
+    Thread safe counters for a cache.
+    """
+
+    __slots__ = ["hits", "misses", "sets", "deletes", "evictions", "_lock"]
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.deletes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "sets": self.sets,
+                "deletes": self.deletes,
+                "evictions": self.evictions,
+            }
 
 
 class Cache:
-    def get_user_rights(self, user_id: int) -> Optional[List[str]]:
+    """
+    The base class for all caches.
+
+    The typed methods (``get_user``, ``set_roles``, ...) are built on
+    the primitives ``get``, ``set``, ``delete`` and ``get_many``, which
+    in turn call the backend hooks ``_get``, ``_set``, ``_delete`` and
+    ``_get_many``. This class does not store anything. It is used, if no
+    cache is configured, and can be called like any other cache.
+    """
+
+    def __init__(self, max_age: int = 1800, access_max_age: int = 300):
+        self.max_age = int(max_age)
+        self.access_max_age = int(access_max_age)
+        self.stats = CacheStats()
+
+    # ------------------------------------------------------------------
+    # Backend hooks
+    # ------------------------------------------------------------------
+
+    def _get(self, key: str) -> Optional[Any]:
         return None
 
-    def set_user_rights(self, user_id: int, rights: List[str]):
+    def _get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        return [self._get(key) for key in keys]
+
+    def _set(self, key: str, value: Any, max_age: int):
         pass
 
-    def get_user(self, user_id: int) -> UserModel:
-        return None
+    def _delete(self, keys: List[str]):
+        pass
 
-    def set_user(self, user: UserModel):
+    def _delete_matching(self, pattern: str):
         pass
 
-    def get_user_roles(self, user_id: int) -> Optional[List[RoleModel]]:
+    def _clear(self):
         pass
 
+    # ------------------------------------------------------------------
+    # Primitives
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns the cached value or None, if the key is not cached.
+        """
+        value = self._get(key)
+        self.stats.count("misses" if value is None else "hits")
+        return value
+
+    def get_many(self, keys: Iterable[str]) -> List[Optional[Any]]:
+        """
+        Returns the cached values for the keys in the same order.
+        Missing values are None.
+        """
+        keys = list(keys)
+        if not keys:
+            return []
+
+        values = self._get_many(keys)
+        hits = sum(1 for value in values if value is not None)
+        self.stats.count("hits", hits)
+        self.stats.count("misses", len(values) - hits)
+        return values
+
+    def set(self, key: str, value: Any, max_age: Optional[int] = None):
+        """
+        Caches the value. If no ``max_age`` is provided, the default
+        max age of the cache is used.
+        """
+        if value is None:
+            return
+
+        max_age = self.max_age if max_age is None else min(int(max_age), self.max_age)
+        if max_age <= 0:
+            return
+
+        self._set(key, value, max_age)
+        self.stats.count("sets")
+
+    def get_authorized(self, token_hash: Optional[str], key: str) -> Optional[Any]:
+        """
+        Returns the cached value, if the token may read it. See
+        :meth:`get_many_authorized`.
+        """
+        return self.get_many_authorized(token_hash, [key])[0]
+
+    def get_many_authorized(
+        self, token_hash: Optional[str], keys: Iterable[str]
+    ) -> List[Optional[Any]]:
+        """
+        Returns the cached values, that the token may read, in the
+        order of the keys. Other values are None.
+
+        A value may be read, if the server has returned it for the
+        same token within ``access_max_age`` seconds and the token is
+        still verified (see ``DigiCubeClient.verify_token``). So the
+        rights check of the server is never skipped for another token,
+        an expired token or a token, that has been logged out.
+        """
+        keys = list(keys)
+        if token_hash is None or not keys:
+            return [None] * len(keys)
+
+        values = self._get_many(
+            [token_key(token_hash)] + [access_key(token_hash, key) for key in keys] + keys
+        )
+        count = len(keys)
+        verified, grants, values = values[0], values[1:][:count], values[-count:]
+        if verified is None:
+            values = [None] * count
+        else:
+            values = [value if grant is not None else None for grant, value in zip(grants, values)]
+
+        hits = sum(1 for value in values if value is not None)
+        self.stats.count("hits", hits)
+        self.stats.count("misses", count - hits)
+        return values
+
+    def set_authorized(self, token_hash: Optional[str], key: str, value: Any):
+        """
+        Caches a value, that the server has returned for the token,
+        and allows the token to read it from the cache.
+        """
+        if value is None:
+            return
+
+        self.set(key, value)
+        if token_hash is not None:
+            self.set(access_key(token_hash, key), True, self.access_max_age)
+
+    def delete(self, *keys: str):
+        """
+        Removes the keys from the cache.
+        """
+        if keys:
+            self._delete(list(keys))
+            self.stats.count("deletes", len(keys))
+
+    def delete_matching(self, pattern: str):
+        """
+        Removes all keys matching the glob style pattern,
+        e.g. ``USER:*:RIGHTS``.
+        """
+        self._delete_matching(pattern)
+        self.stats.count("deletes")
+
+    def invalidate(self, keys: Iterable[str]):
+        """
+        Removes the keys from the cache. Keys containing a ``*``
+        are treated as patterns.
+        """
+        plain_keys = []
+        for key in keys:
+            if "*" in key:
+                self.delete_matching(key)
+            else:
+                plain_keys.append(key)
+        self.delete(*plain_keys)
+
+    def clear(self):
+        """
+        Removes everything from the cache.
+        """
+        self._clear()
+
+    def statistics(self) -> Dict[str, Any]:
+        """
+        Returns the counters of the cache.
+        """
+        result: Dict[str, Any] = {"backend": type(self).__name__}
+        result.update(self.stats.as_dict())
+        return result
+
+    # ------------------------------------------------------------------
+    # Typed api
+    # ------------------------------------------------------------------
+
+    def get_user_rights(self, user_id: int) -> Optional[List[str]]:
+        return self.get(user_rights_key(user_id))
+
+    def set_user_rights(self, user_id: int, rights: List[str]):
+        self.set(user_rights_key(user_id), rights)
+
+    def delete_user_rights(self, user_id: int):
+        self.delete(user_rights_key(user_id))
+
+    def get_user(self, token_hash: Optional[str], user_id: int) -> Optional[UserModel]:
+        return self.get_authorized(token_hash, user_key(user_id))
+
+    def set_user(self, token_hash: Optional[str], user: UserModel):
+        self.set_authorized(token_hash, user_key(user.id), user)
+
+    def delete_user(self, user_id: int):
+        self.delete(user_key(user_id))
+
+    def get_users(
+        self, token_hash: Optional[str], user_ids: List[int]
+    ) -> List[Optional[UserModel]]:
+        return self.get_many_authorized(token_hash, [user_key(user_id) for user_id in user_ids])
+
+    def get_user_roles(self, user_id: int) -> Optional[List[RoleModel]]:
+        return self.get(user_roles_key(user_id))
+
     def set_user_roles(self, user_id: int, roles: List[RoleModel]):
-        pass
+        self.set(user_roles_key(user_id), roles)
 
-    def get_roles(self) -> List[RoleModel]:
-        return None
+    def delete_user_roles(self, user_id: int):
+        self.delete(user_roles_key(user_id))
 
-    def set_roles(self, roles: List[RoleModel]):
-        pass
+    def get_roles(self, token_hash: Optional[str]) -> Optional[List[RoleModel]]:
+        return self.get_authorized(token_hash, ROLES_KEY)
+
+    def set_roles(self, token_hash: Optional[str], roles: List[RoleModel]):
+        self.set_authorized(token_hash, ROLES_KEY, roles)
+
+    def delete_roles(self):
+        self.delete(ROLES_KEY)
+
+    def get_rights(self, token_hash: Optional[str]) -> Optional[List[RightModel]]:
+        return self.get_authorized(token_hash, RIGHTS_KEY)
+
+    def set_rights(self, token_hash: Optional[str], rights: List[RightModel]):
+        self.set_authorized(token_hash, RIGHTS_KEY, rights)
+
+    def delete_rights(self):
+        self.delete(RIGHTS_KEY)
+
+    def get_school(self, token_hash: Optional[str], school_id: int) -> Optional[SchoolModel]:
+        return self.get_authorized(token_hash, school_key(school_id))
+
+    def set_school(self, token_hash: Optional[str], school: SchoolModel):
+        self.set_authorized(token_hash, school_key(school.id), school)
+
+    def get_schools(
+        self, token_hash: Optional[str], school_ids: List[int]
+    ) -> List[Optional[SchoolModel]]:
+        return self.get_many_authorized(
+            token_hash, [school_key(school_id) for school_id in school_ids]
+        )
+
+    def get_school_courses(
+        self, token_hash: Optional[str], school_id: int
+    ) -> Optional[List[CourseModel]]:
+        return self.get_authorized(token_hash, school_courses_key(school_id))
+
+    def set_school_courses(
+        self, token_hash: Optional[str], school_id: int, courses: List[CourseModel]
+    ):
+        self.set_authorized(token_hash, school_courses_key(school_id), courses)
+
+    def get_schools_courses(
+        self, token_hash: Optional[str], school_ids: List[int]
+    ) -> List[Optional[List[CourseModel]]]:
+        return self.get_many_authorized(
+            token_hash, [school_courses_key(school_id) for school_id in school_ids]
+        )
+
+    def get_course(self, token_hash: Optional[str], course_id: int) -> Optional[CourseModel]:
+        return self.get_authorized(token_hash, course_key(course_id))
+
+    def set_course(self, token_hash: Optional[str], course: CourseModel):
+        self.set_authorized(token_hash, course_key(course.id), course)
+
+    def get_course_units(
+        self, token_hash: Optional[str], course_id: int
+    ) -> Optional[List[UnitModel]]:
+        return self.get_authorized(token_hash, course_units_key(course_id))
+
+    def set_course_units(self, token_hash: Optional[str], course_id: int, units: List[UnitModel]):
+        self.set_authorized(token_hash, course_units_key(course_id), units)
+
+    def get_unit(self, token_hash: Optional[str], unit_id: int) -> Optional[UnitModel]:
+        return self.get_authorized(token_hash, unit_key(unit_id))
+
+    def set_unit(self, token_hash: Optional[str], unit: UnitModel):
+        self.set_authorized(token_hash, unit_key(unit.id), unit)
+
+    def get_token_data(self, token_hash: str) -> Optional[BearerTokenData]:
+        return self.get(token_key(token_hash))
+
+    def set_token_data(self, token_hash: str, data: BearerTokenData, max_age: int):
+        self.set(token_key(token_hash), data, max_age)
+
+    def delete_token_data(self, *token_hashes: str):
+        keys = []
+        for token_hash in token_hashes:
+            keys.extend((token_key(token_hash), token_origin_key(token_hash)))
+        self.delete(*keys)
+
+    def get_token_origin(self, token_hash: str) -> Optional[str]:
+        return self.get(token_origin_key(token_hash))
+
+    def set_token_origin(self, token_hash: str, origin_hash: str, max_age: int):
+        self.set(token_origin_key(token_hash), origin_hash, max_age)
+
+    def get_import_progress(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.get(import_key(job_id))
+
+    def set_import_progress(self, job_id: str, progress: Dict[str, Any], max_age: int):
+        self.set(import_key(job_id), progress, max_age)
@@ -0,0 +1,211 @@
+"""
+The codec used to store values in a shared cache.
+
+Every encoded value starts with a small header::
+
+    magic (1 byte) | version (1 byte) | kind (1 byte)
+
+Plain values (``kind`` 0) are followed by their json representation.
+Models (``kind`` 1) and lists of models (``kind`` 2) are followed by
+the tag of the model class (1 byte), the fingerprint of its fields
+(4 bytes) and the field values as a json array in declaration order.
+So field names are not stored with every entry. A list of models is
+stored once for all items, with one json array per field.
+
+Payloads of at least ``COMPRESS_MIN_SIZE`` bytes are compressed with
+zlib. This is marked by the ``FLAG_COMPRESSED`` bit of the kind.
+
+Only the registered models can be encoded. Other models raise a
+``TypeError``, like values, that cannot be serialized to json.
+
+Decoding does not validate the data again, as it has been validated
+when the model was created. Only date and datetime fields are converted
+back from their iso format. Values written with another version of the
+codec or another version of a model are treated like a cache miss.
+Nothing is ever unpickled.
+"""
+import struct
+import zlib
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
+
+import orjson
+from pydantic import BaseModel
+
+from digicubes_flask.client.model import (BearerTokenData, CourseModel,
+                                          RightModel, RoleModel, SchoolModel,
+                                          UnitModel, UserModel)
+
+__all__ = ["encode", "decode", "VERSION"]
+
+MAGIC = 0xDC
+VERSION = 3
+
+KIND_PLAIN = 0
+KIND_MODEL = 1
+KIND_MODEL_LIST = 2
+FLAG_COMPRESSED = 0x80
+
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_LEVEL = 1
+
+HEADER = struct.Struct("!BBB")
+MODEL_HEADER = struct.Struct("!BI")
+
+# The tags are part of the stored data. Never change the tag
+# of an existing model. New models get new tags.
+MODEL_TAGS: Dict[int, Type[BaseModel]] = {
+    1: BearerTokenData,
+    2: CourseModel,
+    3: RightModel,
+    4: RoleModel,
+    5: SchoolModel,
+    6: UnitModel,
+    7: UserModel,
+}
+
+
+def _converter(field_type: Any) -> Optional[Callable[[Any], Any]]:
+    if isinstance(field_type, type) and issubclass(field_type, datetime):
+        return datetime.fromisoformat
+    if isinstance(field_type, type) and issubclass(field_type, date):
+        return date.fromisoformat
+    return None
+
+
+class _Schema:
+    """
+    The stored layout of a model class.
+    """
+
+    __slots__ = ["model", "tag", "fields", "fingerprint", "converters"]
+
+    def __init__(self, tag: int, model: Type[BaseModel]):
+        self.model = model
+        self.tag = tag
+        self.fields: Tuple[str, ...] = tuple(model.__fields__.keys())
+        self.fingerprint = zlib.crc32(",".join(self.fields).encode("utf-8"))
+        self.converters = [
+            (index, converter)
+            for index, field in enumerate(model.__fields__.values())
+            for converter in (_converter(field.type_),)
+            if converter is not None
+        ]
+
+    def values(self, model: BaseModel) -> List[Any]:
+        data = model.__dict__
+        return [data.get(name) for name in self.fields]
+
+    def columns(self, models: List[BaseModel]) -> List[List[Any]]:
+        return [[model.__dict__.get(name) for model in models] for name in self.fields]
+
+    def restore(self, values: List[Any]) -> BaseModel:
+        for index, converter in self.converters:
+            value = values[index]
+            if isinstance(value, str):
+                values[index] = converter(value)
+        return self._construct(values)
+
+    def restore_columns(self, columns: List[List[Any]]) -> List[BaseModel]:
+        for index, converter in self.converters:
+            columns[index] = [
+                converter(value) if isinstance(value, str) else value for value in columns[index]
+            ]
+        return [self._construct(values) for values in zip(*columns)]
+
+    def _construct(self, values) -> BaseModel:
+        # Same as ``model.construct``, but without looking up defaults,
+        # as every field is part of the stored values.
+        model = self.model.__new__(self.model)
+        object.__setattr__(model, "__dict__", dict(zip(self.fields, values)))
+        object.__setattr__(model, "__fields_set__", set(self.fields))
+        return model
+
+
+SCHEMAS_BY_TAG = {tag: _Schema(tag, model) for tag, model in MODEL_TAGS.items()}
+SCHEMAS_BY_MODEL = {schema.model: schema for schema in SCHEMAS_BY_TAG.values()}
+
+
+def _schema(model: Type[BaseModel]) -> _Schema:
+    schema = SCHEMAS_BY_MODEL.get(model, None)
+    if schema is None:
+        raise TypeError(f"The model {model.__name__} is not registered in the cache codec.")
+    return schema
+
+
+def _pack(kind: int, prefix: bytes, payload: bytes) -> bytes:
+    if COMPRESS_MIN_SIZE <= len(payload):
+        compressed = zlib.compress(payload, COMPRESS_LEVEL)
+        if len(compressed) < len(payload):
+            kind, payload = kind | FLAG_COMPRESSED, compressed
+    return HEADER.pack(MAGIC, VERSION, kind) + prefix + payload
+
+
+def encode(value: Any) -> bytes:
+    """
+    Encodes a value. Supported are the registered models, lists
+    of these models and everything, that can be serialized to json.
+
+    Raises a ``TypeError``, if the value cannot be encoded.
+    """
+    if isinstance(value, BaseModel):
+        schema = _schema(type(value))
+        return _pack(
+            KIND_MODEL,
+            MODEL_HEADER.pack(schema.tag, schema.fingerprint),
+            orjson.dumps(schema.values(value)),
+        )
+
+    if isinstance(value, list) and value and isinstance(value[0], BaseModel):
+        model = type(value[0])
+        if any(type(item) is not model for item in value):
+            raise TypeError("Only lists of models of the same class can be encoded.")
+        schema = _schema(model)
+        return _pack(
+            KIND_MODEL_LIST,
+            MODEL_HEADER.pack(schema.tag, schema.fingerprint),
+            orjson.dumps(schema.columns(value)),
+        )
+
+    return _pack(KIND_PLAIN, b"", orjson.dumps(value))
+
+
+def decode(raw: Union[bytes, bytearray]) -> Optional[Any]:
+    """
+    Decodes a value, that has been encoded with ``encode``. Returns
+    None, if the value was written by an incompatible codec or for
+    an outdated version of the model.
+    """
+    if len(raw) < HEADER.size:
+        return None
+
+    magic, version, kind = HEADER.unpack_from(raw)
+    if magic != MAGIC or version != VERSION:
+        return None
+
+    compressed = kind & FLAG_COMPRESSED
+    kind &= ~FLAG_COMPRESSED
+
+    if kind == KIND_PLAIN:
+        return orjson.loads(_payload(raw, HEADER.size, compressed))
+
+    tag, fingerprint = MODEL_HEADER.unpack_from(raw, HEADER.size)
+    schema = SCHEMAS_BY_TAG.get(tag, None)
+    if schema is None or schema.fingerprint != fingerprint:
+        return None
+
+    payload = orjson.loads(_payload(raw, HEADER.size + MODEL_HEADER.size, compressed))
+    if kind == KIND_MODEL:
+        return schema.restore(payload)
+
+    if kind == KIND_MODEL_LIST:
+        return schema.restore_columns(payload)
+
+    return None
+
+
+def _payload(
+    raw: Union[bytes, bytearray], start: int, compressed: int
+) -> Union[bytes, memoryview]:
+    payload = memoryview(raw)[start:]
+    return zlib.decompress(payload) if compressed else payload
@@ -0,0 +1,108 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+import orjson
+import redis
+
+from .cache import Cache
+from .redis_cache import RedisCache
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationListener:
+    """
+    Listens for invalidation events published by a ``RedisCache``
+    and evicts the affected entries from a cache local to the process.
+
+    Events published by the same process are ignored, as the local
+    cache has already been updated by the writer. If the connection
+    to redis is lost, the local cache is cleared after reconnecting,
+    because events may have been missed in the meantime.
+
+    The listener runs in a daemon thread. It is started lazily by
+    ``ensure_running``, once per process. ``on_invalidate`` is called
+    after the local cache has been changed by an event.
+    """
+
+    def __init__(
+        self,
+        shared: RedisCache,
+        local: Cache,
+        retry_delay: float = 5.0,
+        on_invalidate: Optional[Callable[[], None]] = None,
+    ):
+        self.shared = shared
+        self.local = local
+        self.retry_delay = retry_delay
+        self.on_invalidate = on_invalidate
+        self._pid = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def ensure_running(self):
+        """
+        Starts the listener thread, if it is not running in
+        the current process.
+        """
+        pid = os.getpid()
+        if self._pid == pid and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._pid == pid and self._thread.is_alive():
+                return
+
+            self._thread = threading.Thread(
+                target=self._run, name="digicubes-cache-invalidation", daemon=True
+            )
+            self._pid = pid
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                pubsub = self.shared.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.shared.channel)
+                # We may have missed events while we were not subscribed.
+                self.local.clear()
+                self._notify()
+                logger.debug("Listening for cache invalidations on %s", self.shared.channel)
+                for message in pubsub.listen():
+                    self.handle(message.get("data"))
+            except redis.RedisError:
+                logger.warning(
+                    "Lost connection to the invalidation channel. Retrying in %s seconds.",
+                    self.retry_delay,
+                    exc_info=True,
+                )
+                time.sleep(self.retry_delay)
+
+    def handle(self, data):
+        """
+        Evicts the entries named by an invalidation event.
+        """
+        try:
+            event = orjson.loads(data)
+        except (TypeError, orjson.JSONDecodeError):
+            logger.warning("Ignoring malformed invalidation event %r", data)
+            return
+
+        if event.get("origin") == self.shared.origin:
+            return
+
+        keys = event.get("keys")
+        if keys:
+            self.local.delete(*keys)
+
+        for pattern in event.get("patterns", []):
+            self.local.delete_matching(pattern)
+
+        self._notify()
+
+    def _notify(self):
+        if self.on_invalidate is not None:
+            self.on_invalidate()
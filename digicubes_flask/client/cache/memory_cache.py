@@ -0,0 +1,74 @@
+import copy
+import fnmatch
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .cache import Cache
+
+
+class MemoryCache(Cache):
+    """
+    A bounded in-process cache. Entries expire after ``max_age``
+    seconds. If more than ``max_entries`` entries are stored, the
+    least recently used entries are evicted.
+
+    The cache is local to the worker process. It is thread safe.
+    Values are copied, when they are stored and when they are read,
+    so a caller changing its model never changes the cached one.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_age: int = 1800):
+        super().__init__(max_age=max_age)
+        self.max_entries = int(max_entries)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.stats.count("evictions")
+                return None
+
+            self._data.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def _set(self, key: str, value: Any, max_age: int):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._data[key] = (time.monotonic() + max_age, value)
+            self._data.move_to_end(key)
+            evicted = 0
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evicted += 1
+
+        if evicted:
+            self.stats.count("evictions", evicted)
+
+    def _delete(self, keys: List[str]):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def _delete_matching(self, pattern: str):
+        with self._lock:
+            for key in fnmatch.filter(list(self._data.keys()), pattern):
+                del self._data[key]
+
+    def _clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def statistics(self) -> Dict[str, Any]:
+        result = super().statistics()
+        result["entries"] = len(self._data)
+        result["max_entries"] = self.max_entries
+        return result
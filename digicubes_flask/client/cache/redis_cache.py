@@ -1,14 +1,30 @@
-import pickle
-from typing import List, Optional
+import logging
+import os
+import uuid
+from typing import Any, Dict, List, Optional
 
+import orjson
 import redis
 
-from digicubes_flask.client.model import RoleModel, UserModel
-
+from . import codec
 from .cache import Cache
 
+logger = logging.getLogger(__name__)
+
 
 class RedisCache(Cache):
+    """
+    A cache, that is shared by all workers. All keys are
+    prefixed, so the database can be shared with other
+    applications. If redis is not reachable, the cache
+    behaves like an empty cache.
+
+    Every delete is published on the invalidation channel, so
+    workers holding local copies can evict them. Writes are not
+    published. Changed values have to be deleted before they are
+    written again. See :class:`InvalidationListener`.
+    """
+
     def __init__(
         self,
         host: str = None,
@@ -16,7 +32,9 @@ class RedisCache(Cache):
         db: str = None,
         password: str = None,
         max_age: int = 1800,
+        prefix: str = "dcweb:",
     ):
+        super().__init__(max_age=max_age)
         kwargs = {}
 
         if host is not None:
@@ -31,37 +49,78 @@ class RedisCache(Cache):
         if password is not None:
             kwargs["password"] = password
 
-        self.max_age = int(max_age)
-
+        self.prefix = prefix
+        self.channel = f"{prefix}invalidate"
+        self.instance_id = uuid.uuid4().hex
         self.redis = redis.Redis(**kwargs)
 
-    def get_user(self, user_id: int) -> UserModel:
-        raw_data = self.redis.get(f"USER:{user_id}")
-        return None if raw_data is None else pickle.loads(raw_data)
-
-    def set_user(self, user: UserModel):
-        key = f"USER:{user.id}"
-        self.redis.set(key, user.json(), ex=self.max_age)
-
-    def get_user_rights(self, user_id: int) -> Optional[List[str]]:
-        raw_data = self.redis.get(f"USER:{user_id}:RIGHTS")
-        return None if raw_data is None else UserModel.parse_obj(raw_data)
-
-    def set_user_rights(self, user_id: int, rights: List[str]):
-        key = f"USER:{user_id}:RIGHTS"
-        self.redis.set(key, pickle.dumps(rights), ex=self.max_age)
-
-    def get_user_roles(self, user_id: int) -> Optional[List[RoleModel]]:
-        raw_data = self.redis.get(f"USER:{user_id}:ROLES")
-        return None if raw_data is None else pickle.loads(raw_data)
-
-    def set_user_roles(self, user_id: int, roles: List[RoleModel]):
-        key = f"USER:{user_id}:ROLES"
-        self.redis.set(key, pickle.dumps(roles), ex=self.max_age)
-
-    def get_roles(self) -> List[RoleModel]:
-        raw_data = self.redis.get("ROLES")
-        return None if raw_data is None else pickle.loads(raw_data)
-
-    def set_roles(self, roles: List[RoleModel]):
-        self.redis.set("ROLES", pickle.dumps(roles), ex=self.max_age)
+    @property
+    def origin(self) -> str:
+        """
+        Identifies the writer of an invalidation event. As the cache
+        may be created before the workers are forked, the process id
+        is part of the origin.
+        """
+        return f"{self.instance_id}:{os.getpid()}"
+
+    def publish(self, keys: List[str] = None, patterns: List[str] = None):
+        """
+        Publishes an invalidation event for the keys and patterns.
+        """
+        event: Dict[str, Any] = {"origin": self.origin}
+        if keys:
+            event["keys"] = keys
+        if patterns:
+            event["patterns"] = patterns
+
+        try:
+            self.redis.publish(self.channel, orjson.dumps(event))
+        except redis.RedisError:
+            logger.warning("Could not publish invalidation event.", exc_info=True)
+
+    def _get(self, key: str) -> Optional[Any]:
+        try:
+            raw_data = self.redis.get(f"{self.prefix}{key}")
+            return None if raw_data is None else codec.decode(raw_data)
+        except redis.RedisError:
+            logger.warning("Could not read %s from redis.", key, exc_info=True)
+            return None
+
+    def _get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        try:
+            raw_values = self.redis.mget([f"{self.prefix}{key}" for key in keys])
+        except redis.RedisError:
+            logger.warning("Could not read %d keys from redis.", len(keys), exc_info=True)
+            return [None] * len(keys)
+
+        return [None if raw_data is None else codec.decode(raw_data) for raw_data in raw_values]
+
+    def _set(self, key: str, value: Any, max_age: int):
+        try:
+            raw_data = codec.encode(value)
+        except TypeError:
+            logger.warning("Could not encode %s. The value is not cached.", key, exc_info=True)
+            return
+
+        try:
+            self.redis.set(f"{self.prefix}{key}", raw_data, ex=max_age)
+        except redis.RedisError:
+            logger.warning("Could not write %s to redis.", key, exc_info=True)
+
+    def _delete(self, keys: List[str]):
+        try:
+            self.redis.delete(*[f"{self.prefix}{key}" for key in keys])
+        except redis.RedisError:
+            logger.warning("Could not delete %s from redis.", keys, exc_info=True)
+        self.publish(keys=keys)
+
+    def _delete_matching(self, pattern: str):
+        try:
+            for key in self.redis.scan_iter(match=f"{self.prefix}{pattern}", count=500):
+                self.redis.delete(key)
+        except redis.RedisError:
+            logger.warning("Could not delete %s from redis.", pattern, exc_info=True)
+        self.publish(patterns=[pattern])
+
+    def _clear(self):
+        self._delete_matching("*")
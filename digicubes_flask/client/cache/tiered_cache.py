@@ -0,0 +1,98 @@
+import threading
+from typing import Any, Dict, List, Optional
+
+from .cache import Cache
+from .invalidation_listener import InvalidationListener
+from .redis_cache import RedisCache
+
+
+class TieredCache(Cache):
+    """
+    A two level cache. The first level is a small and fast cache
+    local to the process, typically a ``MemoryCache``. The second
+    level is shared by all workers, typically a ``RedisCache``.
+
+    Values are read from the first level. Misses are read from the
+    second level and copied into the first level. Writes and deletes
+    go to both levels.
+
+    If the second level is a ``RedisCache``, an ``InvalidationListener``
+    evicts local copies, as soon as another worker changes them. Otherwise
+    the first level should use a short max age, as changes made by other
+    workers are only visible after the local copy has expired.
+
+    A value read from the second level is not copied into the first
+    level, if the cache has been changed during the read. Otherwise an
+    old value could be copied after its invalidation has evicted it.
+    """
+
+    def __init__(self, l1: Cache, l2: Cache):
+        super().__init__(max_age=l2.max_age)
+        self.l1 = l1
+        self.l2 = l2
+        self.listener = (
+            InvalidationListener(l2, l1, on_invalidate=self._changed)
+            if isinstance(l2, RedisCache)
+            else None
+        )
+        self._generation = 0
+        self._generation_lock = threading.Lock()
+
+    def _changed(self):
+        with self._generation_lock:
+            self._generation += 1
+
+    def _get(self, key: str) -> Optional[Any]:
+        if self.listener is not None:
+            self.listener.ensure_running()
+
+        value = self.l1.get(key)
+        if value is None:
+            generation = self._generation
+            value = self.l2.get(key)
+            if value is not None and generation == self._generation:
+                self.l1.set(key, value)
+        return value
+
+    def _get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        if self.listener is not None:
+            self.listener.ensure_running()
+
+        values = self.l1.get_many(keys)
+        missing = [index for index, value in enumerate(values) if value is None]
+        if missing:
+            generation = self._generation
+            l2_values = self.l2.get_many([keys[index] for index in missing])
+            fill = generation == self._generation
+            for index, value in zip(missing, l2_values):
+                if value is not None:
+                    if fill:
+                        self.l1.set(keys[index], value)
+                    values[index] = value
+        return values
+
+    def _set(self, key: str, value: Any, max_age: int):
+        self._changed()
+        self.l2.set(key, value, max_age)
+        self.l1.set(key, value, max_age)
+
+    def _delete(self, keys: List[str]):
+        self._changed()
+        self.l2.delete(*keys)
+        self.l1.delete(*keys)
+
+    def _delete_matching(self, pattern: str):
+        self._changed()
+        self.l2.delete_matching(pattern)
+        self.l1.delete_matching(pattern)
+
+    def _clear(self):
+        self._changed()
+        self.l2.clear()
+        self.l1.clear()
+
+    def statistics(self) -> Dict[str, Any]:
+        result = super().statistics()
+        result["l1"] = self.l1.statistics()
+        result["l2"] = self.l2.statistics()
+        return result
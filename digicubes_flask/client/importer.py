@@ -0,0 +1,341 @@
+"""
+Importing users in bulk.
+
+The rows of a csv or json file are validated and imported
+concurrently. Every row creates a user, sets the password,
+assigns the roles and optionally adds the user to a school.
+
+.. code-block:: python
+
+    with open("students.csv", newline="") as f:
+        importer = UserImporter(digicubes, token, roles=["student"], school_id=3)
+        progress = importer.run(read_rows(f, "csv"))
+
+    print(progress.succeeded, progress.failed)
+
+Supported columns are the attributes of
+:class:`~digicubes_flask.client.model.UserModelUpsert`, ``roles``
+(role names separated by ``,`` or ``;``) and ``school_id``.
+"""
+import csv
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, Optional,
+                    TextIO, Tuple)
+
+from pydantic import ValidationError
+
+from digicubes_flask.client.model import (RoleModel, SchoolModel, UserModel,
+                                          UserModelUpsert)
+from digicubes_flask.exceptions import DigiCubeError
+
+__all__ = ["UserImporter", "ImportProgress", "RowResult", "read_rows", "FILE_FORMATS"]
+
+logger = logging.getLogger(__name__)
+
+FILE_FORMATS = ("csv", "json", "jsonl")
+
+SCHOOL_SPACES = ("student", "teacher")
+
+# Without an explicit ``max_workers`` or ``DC_IMPORT_WORKERS``, an import
+# uses this share of the client pool. The rest is left to the web app.
+DEFAULT_POOL_SHARE = 0.5
+
+Row = Tuple[int, Dict[str, Any]]
+
+
+def read_rows(stream: TextIO, file_format: str) -> Iterator[Row]:
+    """
+    Reads the rows of an import file. Yields tuples of the line
+    number and the row data.
+
+    ``csv`` files need a header line. ``jsonl`` files contain one
+    json object per line. Both are read line by line. ``json`` files
+    contain an array of objects and are read at once.
+    """
+    if file_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Empty cells are treated like missing values
+            yield reader.line_num, {key: value for key, value in row.items() if value}
+
+    elif file_format == "jsonl":
+        for line_number, line in enumerate(stream, start=1):
+            if line.strip():
+                yield line_number, json.loads(line)
+
+    elif file_format == "json":
+        data = json.load(stream)
+        if not isinstance(data, list):
+            raise ValueError("A json import file has to contain an array of users.")
+        yield from enumerate(data, start=1)
+
+    else:
+        raise ValueError(f"Unsupported file format '{file_format}'")
+
+
+class RowResult:
+    """
+    The result of importing a single row.
+    """
+
+    __slots__ = ["line", "login", "user_id", "error"]
+
+    def __init__(
+        self,
+        line: int,
+        login: Optional[str],
+        user_id: Optional[int] = None,
+        error: Optional[str] = None,
+    ):
+        self.line = line
+        self.login = login
+        self.user_id = user_id
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "line": self.line,
+            "login": self.login,
+            "user_id": self.user_id,
+            "error": self.error,
+        }
+
+
+class ImportProgress:
+    """
+    The thread safe progress of an import. Only failed rows are
+    kept, up to ``max_errors`` of them.
+    """
+
+    def __init__(self, max_errors: int = 1000):
+        self.state = "pending"
+        self.processed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.errors: List[RowResult] = []
+        self.max_errors = max_errors
+        self.message: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self.state = "running"
+            self.started_at = time.time()
+
+    def add(self, result: RowResult):
+        with self._lock:
+            self.processed += 1
+            if result.ok:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+                if len(self.errors) < self.max_errors:
+                    self.errors.append(result)
+
+    def finish(self, message: Optional[str] = None):
+        with self._lock:
+            self.state = "done" if message is None else "failed"
+            self.message = message
+            self.finished_at = time.time()
+
+    @property
+    def done(self) -> bool:
+        return self.state in ("done", "failed")
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            end = self.finished_at if self.finished_at is not None else time.time()
+            return {
+                "state": self.state,
+                "processed": self.processed,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "errors": [error.as_dict() for error in self.errors],
+                "message": self.message,
+                "duration": 0.0 if self.started_at is None else round(end - self.started_at, 3),
+            }
+
+
+class UserImporter:
+    """
+    Imports users concurrently on the thread pool of the client.
+    The import has to be run from a thread outside of that pool.
+
+    At most ``max_workers`` rows are imported at the same time and
+    only these rows are held in memory, so files of any size can be
+    imported. A failing row does not stop the import. Its error is
+    reported in the :class:`ImportProgress`.
+
+    :param client: The :class:`~digicubes_flask.client.DigiCubeClient`
+    :param str token: The bearer token used for all calls.
+    :param roles: Role names assigned to every imported user.
+    :param int school_id: The school, the users are added to. A
+        ``school_id`` column overrides it for a single row.
+    :param str school_space: Add the users as ``student`` or ``teacher``.
+    :param int max_workers: The maximum number of rows imported concurrently.
+        Defaults to ``DC_IMPORT_WORKERS`` or half of the client pool.
+    :param on_progress: Called with the progress after every row.
+    """
+
+    def __init__(
+        self,
+        client,
+        token: str,
+        roles: Iterable[str] = (),
+        school_id: Optional[int] = None,
+        school_space: str = "student",
+        max_workers: Optional[int] = None,
+        on_progress: Optional[Callable[[ImportProgress], None]] = None,
+    ):
+        if school_space not in SCHOOL_SPACES:
+            raise ValueError(f"Unknown school space '{school_space}'")
+
+        self.client = client
+        self.token = token
+        self.roles = [role for role in roles if role]
+        self.school_id = school_id
+        self.school_space = school_space
+        if max_workers is None:
+            max_workers = os.getenv("DC_IMPORT_WORKERS", None) or (
+                client.max_workers * DEFAULT_POOL_SHARE
+            )
+        self.max_workers = max(1, int(max_workers))
+        self.on_progress = on_progress
+        self._roles_by_name: Dict[str, RoleModel] = {}
+
+    def run(self, rows: Iterable[Row], progress: Optional[ImportProgress] = None) -> ImportProgress:
+        """
+        Imports the rows and returns the progress, once all rows
+        have been processed.
+        """
+        progress = progress if progress is not None else ImportProgress()
+        progress.start()
+        try:
+            self._roles_by_name = {
+                role.name: role for role in self.client.role_service.all(self.token)
+            }
+            unknown_roles = [name for name in self.roles if name not in self._roles_by_name]
+            if unknown_roles:
+                raise ValueError(f"Unknown roles {', '.join(unknown_roles)}")
+
+            # A slot is released, after the row has been added to the
+            # progress. So only the running rows are held in memory.
+            slots = threading.BoundedSemaphore(self.max_workers)
+
+            def done(line, future):
+                try:
+                    try:
+                        result = future.result()
+                    except Exception as error:  # pylint: disable=broad-except
+                        # import_row should not raise. But if it does, the
+                        # row still has to be counted.
+                        logger.exception("Could not import line %s.", line)
+                        result = RowResult(line, None, error=str(error) or type(error).__name__)
+                    progress.add(result)
+                    if self.on_progress is not None:
+                        self.on_progress(progress)
+                finally:
+                    slots.release()
+
+            for line, data in rows:
+                slots.acquire()
+                future = self.client.executor.submit(self.import_row, line, data)
+                future.add_done_callback(functools.partial(done, line))
+
+            # Wait for the remaining rows
+            for _ in range(self.max_workers):
+                slots.acquire()
+
+        except Exception as error:  # pylint: disable=broad-except
+            logger.exception("User import failed.")
+            progress.finish(str(error))
+        else:
+            progress.finish()
+
+        if self.on_progress is not None:
+            self.on_progress(progress)
+        return progress
+
+    def import_row(self, line: int, data: Dict[str, Any]) -> RowResult:
+        """
+        Imports a single row. Never raises, but returns the
+        error as part of the result.
+        """
+        login = data.get("login", None) if isinstance(data, dict) else None
+        try:
+            if not isinstance(data, dict):
+                raise ValueError("A row has to be an object.")
+            data = dict(data)
+            roles = self._row_roles(data.pop("roles", None))
+            school_id = self._row_school_id(data.pop("school_id", self.school_id))
+            user = UserModelUpsert.parse_obj(data)
+        except (ValidationError, ValueError, TypeError, AttributeError) as error:
+            return RowResult(line, login, error=str(error) or type(error).__name__)
+
+        user_id = None
+        try:
+            created: UserModel = self.client.user_service.create(self.token, user)
+            user_id = created.id
+            for role in roles:
+                if not self.client.user_service.add_role(self.token, created, role):
+                    raise DigiCubeError(f"Could not add role {role.name}")
+
+            if school_id is not None:
+                school = SchoolModel(id=school_id)
+                if self.school_space == "teacher":
+                    added = self.client.school_service.add_teacher(self.token, school, created)
+                else:
+                    added = self.client.school_service.add_student(self.token, school, created)
+                if not added:
+                    raise DigiCubeError(f"Could not add user to school {school_id}")
+
+        except Exception as error:  # pylint: disable=broad-except
+            # If the user has been created, the id is reported,
+            # so the user can be fixed or deleted.
+            message = str(error) or type(error).__name__
+            return RowResult(line, login, user_id=user_id, error=message)
+
+        return RowResult(line, login, user_id=user_id)
+
+    def _row_roles(self, value: Any) -> List[RoleModel]:
+        names = list(self.roles)
+        if isinstance(value, str):
+            value = value.replace(";", ",").split(",")
+        if value is not None and not isinstance(value, list):
+            raise ValueError("Roles have to be a list or a string.")
+        for name in value or []:
+            if not isinstance(name, str):
+                raise ValueError(f"Invalid role name {name!r}")
+            name = name.strip()
+            if name and name not in names:
+                names.append(name)
+
+        unknown = [name for name in names if name not in self._roles_by_name]
+        if unknown:
+            raise ValueError(f"Unknown roles {', '.join(unknown)}")
+        return [self._roles_by_name[name] for name in names]
+
+    @staticmethod
+    def _row_school_id(value: Any) -> Optional[int]:
+        # Checked before the user is created, so an invalid
+        # school does not leave an unassigned user behind.
+        if value is None or value == "":
+            return None
+        try:
+            school_id = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid school id {value!r}") from None
+        if isinstance(value, bool) or school_id < 1:
+            raise ValueError(f"Invalid school id {value!r}")
+        return school_id
@@ -1,3 +1,4 @@
+from .abstract_base import parse_partial
 from .authentification import BearerTokenData, LoginData, PasswordData
 from .course import CourseModel
 from .right import RightModel
@@ -17,4 +18,5 @@ __all__ = [
     BearerTokenData,
     LoginData,
     PasswordData,
+    parse_partial,
 ]
@@ -1,9 +1,12 @@
-from typing import Any, Union
+from typing import Any, Dict, Type, TypeVar, Union
 
 import orjson
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+from pydantic.error_wrappers import ErrorWrapper
 
-__all__ = ["DigiBaseModel", "orjson_dumps", "orjson_loads"]
+__all__ = ["DigiBaseModel", "orjson_dumps", "orjson_loads", "parse_partial"]
+
+MODEL = TypeVar("MODEL", bound=BaseModel)
 
 
 def orjson_dumps(v, *, default):
@@ -19,3 +22,36 @@ class DigiBaseModel(BaseModel):
     class Config:
         json_loads = orjson_loads
         json_dumps = orjson_dumps
+
+
+def parse_partial(model: Type[MODEL], data: Dict[str, Any]) -> MODEL:
+    """
+    Creates a model from a partial representation, as it is
+    send back, if ``X-Filter-Fields`` has been requested.
+
+    Only the provided fields are validated. Absent fields are
+    set to their default (None for required fields) and are not
+    part of ``__fields_set__``. Unknown keys are ignored.
+    """
+    values = {}
+    errors = []
+    for name, value in data.items():
+        field = model.__fields__.get(name, None)
+        if field is None:
+            continue
+
+        value, error = field.validate(value, values, loc=name, cls=model)
+        if error:
+            errors.append(error if isinstance(error, ErrorWrapper) else ErrorWrapper(error, name))
+        else:
+            values[name] = value
+
+    if errors:
+        raise ValidationError(errors, model)
+
+    fields_set = set(values)
+    for name, field in model.__fields__.items():
+        if name not in values:
+            values[name] = field.get_default()
+
+    return model.construct(_fields_set=fields_set, **values)
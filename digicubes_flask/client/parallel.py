@@ -0,0 +1,92 @@
+"""
+Running independent service calls concurrently.
+"""
+import logging
+import threading
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, List
+
+__all__ = ["FetchGroup", "WORKER_THREAD_PREFIX"]
+
+logger = logging.getLogger(__name__)
+
+WORKER_THREAD_PREFIX = "digicubes-client"
+
+
+class FetchGroup:
+    """
+    A group of service calls, that are executed concurrently
+    on the thread pool of the client. A group is meant to be
+    used for the lifetime of a single request.
+
+    .. code-block:: python
+
+        with digicubes.parallel() as fetch:
+            user = fetch(digicubes.user.get, token, user_id)
+            roles = fetch(digicubes.role.all, token)
+
+        render_template("user.jinja", user=user.result(), roles=roles.result())
+
+    Leaving the ``with`` block waits for all calls. If one of the calls
+    failed, its exception is raised unchanged, so a ``DoesNotExist`` or
+    ``TokenExpired`` is handled like it would be for a blocking call.
+    If more than one call failed, the exception of the call submitted
+    first is raised.
+
+    Calls submitted from a thread of the pool itself are executed
+    immediately, to avoid waiting for a pool that is exhausted by the
+    callers.
+    """
+
+    __slots__ = ["executor", "futures"]
+
+    def __init__(self, executor: Executor) -> None:
+        self.executor = executor
+        self.futures: List[Future] = []
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """
+        Schedules the call ``func(*args, **kwargs)`` and returns
+        the future for its result.
+        """
+        if threading.current_thread().name.startswith(WORKER_THREAD_PREFIX):
+            future = Future()
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as error:  # pylint: disable=broad-except
+                future.set_exception(error)
+        else:
+            future = self.executor.submit(func, *args, **kwargs)
+
+        self.futures.append(future)
+        return future
+
+    __call__ = submit
+
+    def wait(self) -> List[Any]:
+        """
+        Waits for all submitted calls and returns their results
+        in the order they were submitted.
+        """
+        try:
+            return [future.result() for future in self.futures]
+        except Exception:
+            self.cancel()
+            raise
+
+    def cancel(self) -> None:
+        """
+        Cancels all calls, that have not been started yet.
+        """
+        for future in self.futures:
+            future.cancel()
+
+    def __enter__(self) -> "FetchGroup":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self.cancel()
+            return
+
+        self.wait()
@@ -1,9 +1,20 @@
 """
 Just importing the classes.
 """
+from .bulk import BulkError, BulkResult
+from .filter import FilterFunction, Query
 from .right_service import RightService
 from .role_service import RoleService
 from .school_service import SchoolService
 from .user_service import UserService
 
-__all__ = [RightService, RoleService, SchoolService, UserService]
+__all__ = [
+    RightService,
+    RoleService,
+    SchoolService,
+    UserService,
+    Query,
+    FilterFunction,
+    BulkResult,
+    BulkError,
+]
@@ -1,9 +1,16 @@
 """
 A base class for all service endpoint.
 """
-from typing import Dict, List, Optional, Text
+import functools
+import threading
+from typing import (Any, Callable, Dict, Iterable, List, Optional, Text, Tuple,
+                    Type)
 
 from digicubes_flask import exceptions as ex
+from digicubes_flask.client.model import parse_partial
+
+from .bulk import BulkError, BulkResult
+from .filter import Query
 
 __ALL__ = ["AbstractService"]
 
@@ -49,10 +56,174 @@ class AbstractService:
             header["X-Filter-Fields"] = ",".join(fields)
         return header
 
+    def token_hash(self, token) -> Optional[str]:
+        """
+        Returns the hash, under which the data of the token is
+        cached. Cached values are only returned to the token, that
+        has read them from the server.
+        """
+        return self.client.token_key(token) if token else None
+
     def url_for(self, route: str, **kwargs) -> str:
         # pylint: disable=C0111
         return self.client.url_for(route, **kwargs)
 
+    def parse_model(self, model, data: Dict[str, Any], fields: Optional[List[Text]] = None):
+        """
+        Creates a model from the response data. If only some ``fields``
+        have been requested, the model is constructed from the provided
+        fields without validating the absent ones.
+        """
+        if fields is None:
+            return model.parse_obj(data)
+        return parse_partial(model, data)
+
+    def parse_models(
+        self, model, data: List[Dict[str, Any]], fields: Optional[List[Text]] = None
+    ) -> List[Any]:
+        """
+        Creates a list of models from the response data.
+        See :meth:`parse_model`.
+        """
+        return [self.parse_model(model, item, fields) for item in data]
+
+    def run_query(self, token, route: str, model, query) -> Any:
+        """
+        Runs a :class:`~digicubes_flask.client.service.filter.Query`
+        against the filter endpoint ``route``.
+
+        Returns the number of matching entries for a ``count`` query,
+        the first matching model or None for a ``first`` query and a
+        list of models otherwise. If the query selects columns, the
+        models are constructed partially.
+        """
+        response = self.requests.get(
+            self.url_for(route), headers=self.create_default_header(token), params=query.build()
+        )
+        self.check_response_status(response, expected_status=200)
+
+        # The server sends an empty body, if the query failed.
+        data = response.json() if response.text else None
+        if query.is_count:
+            if not isinstance(data, int):
+                raise ex.ServerError(f"Expected a count, but got {data!r}")
+            return data
+
+        fields = query.selected_columns
+        if query.is_first:
+            return None if data is None else self.parse_model(model, data, fields)
+
+        if data is None:
+            raise ex.ServerError("The query returned no result.")
+        return self.parse_models(model, data, fields)
+
+    def count_matching(self, token, route: str, model, **conditions: Any) -> int:
+        """
+        Returns the number of entries matching the conditions. The
+        conditions are the same as for ``Query.filter``.
+        """
+        return self.run_query(token, route, model, Query().filter(**conditions).count())
+
+    def exists_matching(
+        self, token, route: str, model, exclude_id: Optional[int] = None, **conditions: Any
+    ) -> bool:
+        """
+        Checks, if an entry matching the conditions exists. Only the id
+        of the first matching entry is requested. If ``exclude_id`` is
+        provided, the entry with this id is ignored. This is useful
+        to validate unique attributes of an existing entry.
+        """
+        query = Query().filter(**conditions).columns("id")
+        if exclude_id is None:
+            return self.run_query(token, route, model, query.first()) is not None
+
+        # At most two entries are needed to find one, that is not excluded.
+        items = self.run_query(token, route, model, query.limit(2))
+        return any(item.id != exclude_id for item in items)
+
+    def resolve_many(
+        self,
+        ids: Iterable[Any],
+        fetch: Callable[[Any], Any],
+        cached: Optional[Callable[[List[Any]], List[Any]]] = None,
+    ) -> List[Any]:
+        """
+        Resolves a list of ids with as few requests as possible.
+
+        Duplicate ids are resolved only once. If provided, ``cached``
+        is called with the unique ids and returns the cached values in
+        the same order, None for a miss. ``fetch`` is called with every
+        id, that was not cached. These calls run concurrently on the
+        thread pool of the client.
+
+        The results are returned in the order of ``ids``.
+        """
+        ids = list(ids)
+        unique_ids = list(dict.fromkeys(ids))
+        if not unique_ids:
+            return []
+
+        values = cached(unique_ids) if cached is not None else [None] * len(unique_ids)
+        found = dict(zip(unique_ids, values))
+        missing = [id_ for id_, value in found.items() if value is None]
+        if missing:
+            results = self.client.gather(*[functools.partial(fetch, id_) for id_ in missing])
+            found.update(zip(missing, results))
+
+        return [found[id_] for id_ in ids]
+
+    def run_bulk(
+        self,
+        items: Iterable[Any],
+        call: Callable[[Any], Any],
+        max_concurrency: Optional[int] = None,
+        errors: Tuple[Type[Exception], ...] = (ex.ConstraintViolation, ex.ServerError),
+    ) -> BulkResult:
+        """
+        Calls ``call`` for every item concurrently on the thread pool
+        of the client. At most ``max_concurrency`` calls are running at
+        the same time. It defaults to the size of the pool.
+
+        Items failing with one of the ``errors`` are reported in the
+        result and do not stop the other items. Every other exception,
+        like a ``TokenExpired``, cancels the remaining items and is
+        raised unchanged.
+        """
+        limit = max(1, int(max_concurrency or self.client.max_workers))
+        slots = threading.BoundedSemaphore(limit)
+        aborted = threading.Event()
+
+        def run(index: int, item: Any) -> Any:
+            try:
+                return call(item)
+            except errors as error:
+                return BulkError(index, item, error)
+            except Exception:
+                aborted.set()
+                raise
+
+        group = self.client.parallel()
+        try:
+            for index, item in enumerate(items):
+                slots.acquire()
+                if aborted.is_set():
+                    slots.release()
+                    break
+                future = group.submit(run, index, item)
+                future.add_done_callback(lambda _: slots.release())
+            outcomes = group.wait()
+        except BaseException:
+            group.cancel()
+            raise
+
+        result = BulkResult()
+        for outcome in outcomes:
+            if isinstance(outcome, BulkError):
+                result.failed.append(outcome)
+            else:
+                result.succeeded.append(outcome)
+        return result
+
     def check_response_status(self, response, expected_status: Optional[int] = 200):
         """
         A default handler for the most common exception.
@@ -0,0 +1,48 @@
+"""
+The result of bulk operations, that are not atomic.
+"""
+from typing import Any, List
+
+__all__ = ["BulkResult", "BulkError"]
+
+
+class BulkError:
+    """
+    A single failed item of a bulk operation.
+
+    :param int index: The position of the item in the request.
+    :param item: The item, that failed.
+    :param Exception error: The error raised for the item.
+    """
+
+    __slots__ = ["index", "item", "error"]
+
+    def __init__(self, index: int, item: Any, error: Exception):
+        self.index = index
+        self.item = item
+        self.error = error
+
+    def __repr__(self) -> str:
+        return f"BulkError(index={self.index}, error={self.error!r})"
+
+
+class BulkResult:
+    """
+    The outcome of a bulk operation. ``succeeded`` contains the
+    results of the successful items, ``failed`` the errors of the
+    other items. Both are in the order of the request.
+    """
+
+    __slots__ = ["succeeded", "failed"]
+
+    def __init__(self):
+        self.succeeded: List[Any] = []
+        self.failed: List[BulkError] = []
+
+    @property
+    def ok(self) -> bool:
+        """True, if no item failed"""
+        return len(self.failed) == 0
+
+    def __repr__(self) -> str:
+        return f"BulkResult(succeeded={len(self.succeeded)}, failed={len(self.failed)})"
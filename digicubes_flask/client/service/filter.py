@@ -1,8 +1,31 @@
+"""
+A builder for the query parameters understood by the filter
+endpoints of the digicubes server (e.g. ``/users/filter/``).
+
+.. code-block:: python
+
+    query = (
+        Query()
+        .filter(login__istartswith="adm", is_active=True)
+        .order_by("last_name", "first_name")
+        .columns("id", "login")
+        .page(offset=0, limit=20)
+    )
+    users = digicubes.user.filter(token, query)
+
+The server combines all filters with a logical ``and``.
+"""
 from enum import IntEnum
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
+
+__all__ = ["FilterFunction", "Query"]
 
 
 class FilterFunction(IntEnum):
+    """
+    The filter functions supported by the server. The value
+    is the code used in the query parameter.
+    """
 
     EQUALS = 0
     IEQUALS = 1
@@ -17,9 +40,9 @@ class FilterFunction(IntEnum):
         return FilterFunction.to_name(self.value)
 
     @staticmethod
-    def to_name(i: int):
+    def to_name(i: int) -> str:
         return [
-            None,
+            "equals",
             "iequals",
             "startswith",
             "istartswith",
@@ -29,47 +52,142 @@ class FilterFunction(IntEnum):
             "icontains",
         ][i]
 
-    def build(self, attribute: str):
+    @staticmethod
+    def from_name(name: str) -> "FilterFunction":
+        """
+        Returns the filter function for a lookup name
+        like ``icontains``.
+        """
+        try:
+            return FilterFunction[name.upper()]
+        except KeyError:
+            raise ValueError(f"Unknown filter function '{name}'") from None
+
+    def build(self, attribute: str) -> str:
         return (
             attribute
-            if self == FilterFunction.EQUAL
+            if self == FilterFunction.EQUALS
             else f"{attribute}__{FilterFunction.to_name(self.value)}"
         )
 
 
 class Query:
-    def __init__(self):
-        self._filter_elems = []
-        self._specials = []
-        self._columns = []
-        self._page = None
-        self._order_by = []
+    """
+    A query for one of the filter endpoints. All methods return
+    the query itself, so calls can be chained.
+
+    The specials ``count`` and ``first`` change the result of the
+    query. With ``count`` the server returns the number of matching
+    entries, with ``first`` only the first matching entry or None.
+    """
 
-    def order_by(self, *attributes):
+    # The separators of the filter parameter. They must
+    # not be part of attributes or values.
+    FILTER_SEPARATORS = (",", ":")
+
+    def __init__(self):
+        self._filter_elems: List[Tuple[str, FilterFunction, str]] = []
+        self._specials: List[str] = []
+        self._columns: Tuple[str, ...] = ()
+        self._page: Optional[Tuple[int, int]] = None
+        self._order_by: Tuple[str, ...] = ()
+
+    def order_by(self, *attributes: str) -> "Query":
+        """
+        Orders the result by the attributes. A leading ``-``
+        reverses the order for that attribute.
+        """
         self._order_by = attributes
         return self
 
-    def count(self):
-        self._specials.append("count")
+    def count(self) -> "Query":
+        """
+        Returns only the number of matching entries.
+        """
+        if "count" not in self._specials:
+            self._specials.append("count")
         return self
 
-    def columns(self, *fields):
+    def columns(self, *fields: str) -> "Query":
+        """
+        Returns only the given attributes of the matching entries.
+        """
         self._columns = fields
         return self
 
-    def first(self):
-        self._specials.append("first")
+    def first(self) -> "Query":
+        """
+        Returns only the first matching entry.
+        """
+        if "first" not in self._specials:
+            self._specials.append("first")
+        return self
+
+    def page(self, offset: int, limit: int) -> "Query":
+        """
+        Returns at most ``limit`` entries, starting with
+        the ``offset``-th matching entry.
+        """
+        if offset < 0 or limit < 1:
+            raise ValueError("Offset must not be negative and limit must be positive.")
+
+        self._page = (int(offset), int(limit))
         return self
 
-    def page(self, offset: int, limit: int):
-        self._page = (offset, limit)
+    def limit(self, limit: int) -> "Query":
+        """
+        Returns at most ``limit`` entries.
+        """
+        return self.page(0, limit)
+
+    def add_filter(self, attribute: str, filter_function: FilterFunction, value: Any) -> "Query":
+        """
+        Adds a filter for the attribute.
+        """
+        value = str(value)
+        for text in (attribute, value):
+            if any(separator in text for separator in Query.FILTER_SEPARATORS):
+                raise ValueError(f"Filter attributes and values must not contain , or : ({text})")
+
+        self._filter_elems.append((attribute, FilterFunction(filter_function), value))
         return self
 
-    def add_filter(self, attribute: str, filter_function: FilterFunction, value: Any):
-        self._filter_elems.append((attribute, filter_function, value))
+    def filter(self, **conditions: Any) -> "Query":
+        """
+        Adds filters in the form ``attribute__function=value``.
+        Without a function, the attribute has to be equal to the value.
+
+        .. code-block:: python
+
+            Query().filter(login__icontains="smith", is_active=True)
+        """
+        for key, value in conditions.items():
+            attribute, _, function_name = key.partition("__")
+            function = (
+                FilterFunction.from_name(function_name) if function_name else FilterFunction.EQUALS
+            )
+            self.add_filter(attribute, function, value)
         return self
 
+    @property
+    def is_count(self) -> bool:
+        return "count" in self._specials
+
+    @property
+    def is_first(self) -> bool:
+        return "first" in self._specials
+
+    @property
+    def selected_columns(self) -> Optional[List[str]]:
+        """
+        The requested columns or None, if all columns are requested.
+        """
+        return list(self._columns) if self._columns else None
+
     def build(self) -> Dict[str, Any]:
+        """
+        Returns the query parameters.
+        """
         result = {}
         if len(self._specials) > 0:
             result["s"] = ",".join(self._specials)
@@ -82,12 +200,18 @@ class Query:
 
         if len(self._filter_elems) > 0:
             filter_defs = []
-            for elem in self._filter_elems:
-                print(elem)
-                filter_defs.append(f"{elem[0]},{int(elem[1])},{elem[2]}")
+            for attribute, function, value in self._filter_elems:
+                filter_defs.append(f"{attribute},{int(function)},{value}")
             result["f"] = ":".join(filter_defs)
 
+        if self._page is not None:
+            offset, limit = self._page
+            result["p"] = f"{limit}:{offset}"
+
         return result
 
-    def _asdict(self):
-        return self.build_query()
+    def _asdict(self) -> Dict[str, Any]:
+        return self.build()
+
+    def __repr__(self) -> str:
+        return f"Query({self.build()!r})"
@@ -0,0 +1,66 @@
+"""
+Declarative cache invalidation for service methods.
+"""
+import functools
+import inspect
+import logging
+from typing import Callable, Optional
+
+__all__ = ["invalidates"]
+
+logger = logging.getLogger(__name__)
+
+
+def invalidates(*keys: str, refresh: Optional[str] = None) -> Callable:
+    """
+    Decorator for service methods, that change data on the server.
+
+    After the method returned successfully, the cached entries for the
+    given keys are removed. The keys are format strings, that can refer
+    to the arguments of the method and to its ``result``. Keys containing
+    a ``*`` remove all matching entries.
+
+    If ``refresh`` is provided, the result of the method is cached under
+    this key, instead of waiting for the next read. The old entry is
+    invalidated first, so copies in other processes are evicted.
+
+    .. code-block:: python
+
+        @invalidates("USER:{user.id}:ROLES", "USER:{user.id}:RIGHTS")
+        def add_role(self, token, user: UserModel, role: RoleModel) -> bool:
+            ...
+
+    The key formats are the ones defined in
+    :mod:`digicubes_flask.client.cache.cache`.
+    """
+
+    def decorator(method: Callable) -> Callable:
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+
+            arguments = signature.bind(self, *args, **kwargs)
+            arguments.apply_defaults()
+            values = dict(arguments.arguments, result=result)
+            try:
+                invalidated = [key.format(**values) for key in keys]
+                if refresh is not None:
+                    invalidated.append(refresh.format(**values))
+                self.cache.invalidate(invalidated)
+                if refresh is not None:
+                    self.cache.set(invalidated[-1], result)
+            except (AttributeError, KeyError, IndexError):
+                logger.warning(
+                    "Could not invalidate the cache after calling %s.",
+                    method.__qualname__,
+                    exc_info=True,
+                )
+
+            return result
+
+        wrapper.invalidated_keys = keys
+        return wrapper
+
+    return decorator
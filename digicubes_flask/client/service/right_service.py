@@ -1,6 +1,7 @@
 """
 All serice calls for rights
 """
+import functools
 from typing import List, Optional
 
 from digicubes_flask.client.model import RightModel, RoleModel
@@ -8,8 +9,11 @@ from digicubes_flask.exceptions import (ConstraintViolation, DoesNotExist,
                                         ServerError)
 
 from .abstract_service import AbstractService
+from .bulk import BulkResult
+from .invalidation import invalidates
 
 RightList = List[RightModel]
+XFieldList = Optional[List[str]]
 
 
 class RightService(AbstractService):
@@ -17,6 +21,7 @@ class RightService(AbstractService):
     The rights service
     """
 
+    @invalidates("RIGHTS")
     def create(self, token, right: RightModel) -> RightModel:
         """
         Creates a new right
@@ -37,46 +42,59 @@ class RightService(AbstractService):
 
         raise ServerError(f"Unknown error. [{result.status_code}] {result.text}")
 
-    def create_multiple(self, token, rights: RightList):
+    def create_multiple(
+        self, token, rights: RightList, max_concurrency: Optional[int] = None
+    ) -> BulkResult:
         """
-        Creates a set of rights and returns a list of created
-        right proxies. The creation of the rights is not an atomic
-        operation.
+        Creates a set of rights concurrently. The creation of the
+        rights is not an atomic operation. The result contains the
+        created rights and the errors of the rights, that could not
+        be created. See :meth:`AbstractService.run_bulk`.
         """
-        # TODO: Maybe e could do this as an parallel async operation
-        # TODO: Also we should return two sets. One for the successfully
-        # created and one for the failed.
-        return [self.create(token, right) for right in rights]
+        return self.run_bulk(
+            rights, functools.partial(self.create, token), max_concurrency=max_concurrency
+        )
 
-    def all(self, token) -> RightList:
+    def all(self, token, fields: XFieldList = None) -> RightList:
         """
         Returns all rigths.
-        The result is a list of ``RightModel`` objects.
+        The result is a list of ``RightModel`` objects. If ``fields``
+        is provided, only these attributes are requested.
         """
-        headers = self.create_default_header(token)
+        # Only complete rights are cached.
+        if fields is None:
+            cached_rights = self.cache.get_rights(self.token_hash(token))
+            if cached_rights is not None:
+                return cached_rights
+
+        headers = self.create_default_header(token, fields=fields)
         url = self.url_for("/rights/")
         result = self.requests.get(url, headers=headers)
 
         if result.status_code == 404:
             return []
 
-        return [RightModel.parse_obj(right) for right in result.json()]
+        rights = self.parse_models(RightModel, result.json(), fields)
+        if fields is None:
+            self.cache.set_rights(self.token_hash(token), rights)
+        return rights
 
-    def get(self, token, right_id: int) -> Optional[RightModel]:
+    def get(self, token, right_id: int, fields: XFieldList = None) -> Optional[RightModel]:
         """
         Get a single right by id
         """
-        headers = self.create_default_header(token)
+        headers = self.create_default_header(token, fields=fields)
         url = self.url_for(f"/right/{right_id}")
         result = self.requests.get(url, headers=headers)
         if result.status_code == 404:
             return None
 
         if result.status_code == 200:
-            return RightModel.parse_obj(result.json())
+            return self.parse_model(RightModel, result.json(), fields)
 
         return None
 
+    @invalidates("RIGHTS", "USER:*:RIGHTS")
     def delete_all(self, token):
         """
         Delete all digicube rights. This operation is atomic.
@@ -92,12 +110,11 @@ class RightService(AbstractService):
         if result.status_code != 200:
             raise ServerError(result.text)
 
-    def get_roles(self, token, right: RightModel) -> List[RoleModel]:
-        # TODO: Use Filter fields
+    def get_roles(self, token, right: RightModel, fields: XFieldList = None) -> List[RoleModel]:
         """
         Get all roles associated with this right
         """
-        headers = self.create_default_header(token)
+        headers = self.create_default_header(token, fields=fields)
         url = self.url_for(f"/right/{right.id}/roles/")
         result = self.requests.get(url, headers=headers)
 
@@ -105,10 +122,11 @@ class RightService(AbstractService):
             raise DoesNotExist(result.text)
 
         if result.status_code == 200:
-            return [RoleModel.parse_obj(role) for role in result.json()]
+            return self.parse_models(RoleModel, result.json(), fields)
 
         raise ServerError(result.text)
 
+    @invalidates("USER:*:RIGHTS")
     def add_role(self, token, right: RightModel, role: RoleModel) -> bool:
         """
         Add a role to this right. The role and the right must exist.
@@ -122,6 +140,7 @@ class RightService(AbstractService):
 
         return result.status_code == 200
 
+    @invalidates("USER:*:RIGHTS")
     def remove_role(self, token, right: RightModel, role: RoleModel) -> bool:
         """
         Removes a role from this right. Both, the role and the right must exist.
@@ -140,6 +159,7 @@ class RightService(AbstractService):
 
         return False
 
+    @invalidates("USER:*:RIGHTS")
     def clear_roles(self, token, right: RightModel) -> bool:
         """
         Clears all roles from the right. After a succesful call no
@@ -1,6 +1,7 @@
 """
 All service calls for roles.
 """
+import functools
 from typing import List, Optional
 
 from pydantic import parse_obj_as
@@ -9,8 +10,11 @@ from digicubes_flask.client.model import RightModel, RoleModel
 from digicubes_flask.exceptions import DoesNotExist
 
 from .abstract_service import AbstractService
+from .bulk import BulkResult
+from .invalidation import invalidates
 
 RoleList = Optional[List[RoleModel]]
+XFieldList = Optional[List[str]]
 
 
 class RoleService(AbstractService):
@@ -18,6 +22,7 @@ class RoleService(AbstractService):
     All role services
     """
 
+    @invalidates("ROLES")
     def create(self, token, role: RoleModel) -> RoleModel:
         """
         Creates a new role.
@@ -41,26 +46,45 @@ class RoleService(AbstractService):
         self.check_response_status(response, expected_status=201)
         return RoleModel.parse_obj(response.json())
 
-    def all(self, token) -> List[RoleModel]:
+    def create_multiple(
+        self, token, roles: List[RoleModel], max_concurrency: Optional[int] = None
+    ) -> BulkResult:
+        """
+        Creates a set of roles concurrently. The creation of the
+        roles is not an atomic operation. The result contains the
+        created roles and the errors of the roles, that could not
+        be created. See :meth:`AbstractService.run_bulk`.
+        """
+        return self.run_bulk(
+            roles, functools.partial(self.create, token), max_concurrency=max_concurrency
+        )
+
+    def all(self, token, fields: XFieldList = None) -> List[RoleModel]:
         """
         Returns all roles
 
-        The result is a list of ``RoleModel`` objects
+        The result is a list of ``RoleModel`` objects. If ``fields``
+        is provided, only these attributes are requested.
         """
-        cached_roles = self.cache.get_roles()
-        if cached_roles is not None:
-            return cached_roles
+        # Only complete roles are cached.
+        if fields is None:
+            cached_roles = self.cache.get_roles(self.token_hash(token))
+            if cached_roles is not None:
+                return cached_roles
 
-        headers = self.create_default_header(token)
+        headers = self.create_default_header(token, fields=fields)
         url = self.url_for("/roles/")
         response = self.requests.get(url, headers=headers)
 
         self.check_response_status(response)
+        if fields is not None:
+            return self.parse_models(RoleModel, response.json(), fields)
+
         roles = parse_obj_as(List[RoleModel], response.json())
-        self.cache.set_roles(roles)
+        self.cache.set_roles(self.token_hash(token), roles)
         return roles
 
-    def get(self, token, role_id: int) -> Optional[RoleModel]:
+    def get(self, token, role_id: int, fields: XFieldList = None) -> Optional[RoleModel]:
         """
         Get a single role.
 
@@ -68,13 +92,13 @@ class RoleService(AbstractService):
         If the requested role was found, a ``RoleModel`` object
         will be returned. ``None`` otherwise.
         """
-        headers = self.create_default_header(token)
+        headers = self.create_default_header(token, fields=fields)
         url = self.url_for(f"/role/{role_id}")
         response = self.requests.get(url, headers=headers)
         self.check_response_status(response)
-        return RoleModel.parse_obj(response.json())
+        return self.parse_model(RoleModel, response.json(), fields)
 
-    def get_by_name(self, token: str, name: str) -> RoleModel:
+    def get_by_name(self, token: str, name: str, fields: XFieldList = None) -> RoleModel:
         """
         Get a single role by the name.
 
@@ -82,16 +106,17 @@ class RoleService(AbstractService):
         not exist.
 
         :param str name: The name of the role.
+        :param XFieldList fields: The attributes to request. All, if omitted.
         :return: The role
         :rtype: :class:`digicubes_flask.client.model.RoleModel`
         """
-        headers = self.create_default_header(token)
+        headers = self.create_default_header(token, fields=fields)
         url = self.url_for(f"/role/byname/{name}")
         response = self.requests.get(url, headers=headers)
         self.check_response_status(response, expected_status=200)
-        return RoleModel.parse_obj(response.json())
+        return self.parse_model(RoleModel, response.json(), fields)
 
-    def get_by_name_or_none(self, token: str, name: str) -> RoleModel:
+    def get_by_name_or_none(self, token: str, name: str, fields: XFieldList = None) -> RoleModel:
         """
         Get a single role by the name.
 
@@ -99,10 +124,11 @@ class RoleService(AbstractService):
         not exist.
         """
         try:
-            return self.get_by_name(token, name)
+            return self.get_by_name(token, name, fields=fields)
         except DoesNotExist:
             return None
 
+    @invalidates("ROLES", "USER:*:ROLES", "USER:*:RIGHTS")
     def delete(self, token, role_id: int) -> Optional[RoleModel]:
         """
         Deletes a role from the database
@@ -113,6 +139,7 @@ class RoleService(AbstractService):
         self.check_response_status(response)
         return RoleModel.parse_obj(response.json())
 
+    @invalidates("ROLES", "USER:*:ROLES", "USER:*:RIGHTS")
     def delete_all(self, token):
         """
         Removes all roles from the database.This operation is atomic.
@@ -126,12 +153,12 @@ class RoleService(AbstractService):
         response = self.requests.delete(url, headers=headers)
         self.check_response_status(response)
 
-    def get_rights(self, token, role: RoleModel) -> List[RightModel]:
+    def get_rights(self, token, role: RoleModel, fields: XFieldList = None) -> List[RightModel]:
         """
         Get all rights assiciated with this role.
         """
-        headers = self.create_default_header(token)
+        headers = self.create_default_header(token, fields=fields)
         url = self.url_for(f"/role/{role.id}/rights/")
         response = self.requests.get(url, headers=headers)
         self.check_response_status(response)
-        return [RightModel.parse(right) for right in response.json()]
+        return self.parse_models(RightModel, response.json(), fields)
@@ -1,13 +1,16 @@
 """
 All service calls for schooles.
 """
+import functools
 import logging
 from typing import List, Optional
 
 from digicubes_flask.client.model import (CourseModel, SchoolModel, UnitModel,
                                           UserModel)
+from digicubes_flask.exceptions import DoesNotExist
 
 from .abstract_service import AbstractService
+from .invalidation import invalidates
 
 SchoolList = Optional[List[SchoolModel]]
 CourseList = Optional[List[CourseModel]]
@@ -21,20 +24,26 @@ XFieldList = Optional[List[str]]
 class SchoolService(AbstractService):
     """
     School services
+
+    Unlike the :class:`UserService`, there are no ``filter``, ``count``
+    and ``exists`` calls. The server does not answer filter queries for
+    schools, neither on ``/schools/filter/`` nor on the list route. Use
+    :meth:`get_by_name` to check, if a school name is taken.
     """
 
-    def all(self, token) -> SchoolList:
+    def all(self, token, fields: XFieldList = None) -> SchoolList:
         """
         Returns all schools.
-        The result is a list of ``SchoolModel`` objects.
+        The result is a list of ``SchoolModel`` objects. If ``fields``
+        is provided, only these attributes are requested.
         """
-        headers = self.create_default_header(token)
+        headers = self.create_default_header(token, fields=fields)
         url = self.url_for("/schools/")
         response = self.requests.get(url, headers=headers)
 
         self.check_response_status(response, expected_status=200)
 
-        return [SchoolModel.parse_obj(school) for school in response.json()]
+        return self.parse_models(SchoolModel, response.json(), fields)
 
     def get(self, token, school_id: int, fields: XFieldList = None) -> Optional[SchoolModel]:
         """
@@ -42,17 +51,46 @@ class SchoolService(AbstractService):
 
         Requested Endpoint: `/school/{school_id}`
         """
-        headers = self.create_default_header(token)
-        if fields is not None:
-            headers[self.X_FILTER_FIELDS] = ",".join(fields)
+        if fields is None:
+            school = self.cache.get_school(self.token_hash(token), school_id)
+            if school is not None:
+                return school
+
+        return self._fetch_school(token, school_id, fields)
+
+    def get_many(
+        self, token, school_ids: List[int], fields: XFieldList = None
+    ) -> List[Optional[SchoolModel]]:
+        """
+        Get the schools with the given ids in the same order. Cached
+        schools are read with a single cache request, the missing ones
+        are requested concurrently. If a school does not exist, its
+        entry is None.
+        """
+
+        def fetch(school_id: int) -> Optional[SchoolModel]:
+            try:
+                return self._fetch_school(token, school_id, fields)
+            except DoesNotExist:
+                return None
 
+        cached = None
+        if fields is None:
+            cached = functools.partial(self.cache.get_schools, self.token_hash(token))
+        return self.resolve_many(school_ids, fetch, cached)
+
+    def _fetch_school(self, token, school_id: int, fields: XFieldList = None) -> SchoolModel:
+        headers = self.create_default_header(token, fields=fields)
         url = self.url_for(f"/school/{school_id}")
         response = self.requests.get(url, headers=headers)
         self.check_response_status(response, expected_status=200)
 
-        return SchoolModel.parse_obj(response.json())
+        school = self.parse_model(SchoolModel, response.json(), fields)
+        if fields is None:
+            self.cache.set_school(self.token_hash(token), school)
+        return school
 
-    def get_by_name(self, token: str, name: str) -> SchoolModel:
+    def get_by_name(self, token: str, name: str, fields: XFieldList = None) -> SchoolModel:
         """
         Get a single school by the name.
 
@@ -60,11 +98,13 @@ class SchoolService(AbstractService):
         Method: GET
         """
         response = self.requests.get(
-            self.url_for(f"/school/byname/{name}"), headers=self.create_default_header(token)
+            self.url_for(f"/school/byname/{name}"),
+            headers=self.create_default_header(token, fields=fields),
         )
         self.check_response_status(response, expected_status=200)
-        return SchoolModel.parse_obj(response.json())
+        return self.parse_model(SchoolModel, response.json(), fields)
 
+    @invalidates(refresh="SCHOOL:{result.id}")
     def update(self, token, school: SchoolModel) -> SchoolModel:
         """
         Update an existing school.
@@ -79,6 +119,7 @@ class SchoolService(AbstractService):
 
         return SchoolModel.parse_obj(response.json())
 
+    @invalidates("SCHOOL:{school_id}", "SCHOOL:{school_id}:COURSES")
     def delete(self, token, school_id: int) -> Optional[SchoolModel]:
         """
         Deletes a school from the database
@@ -100,6 +141,7 @@ class SchoolService(AbstractService):
         self.check_response_status(response, expected_status=201)
         return SchoolModel.parse_obj(response.json())
 
+    @invalidates("SCHOOL:*", "COURSE:*", "UNIT:*")
     def delete_all(self, token: str) -> None:
         """
         Deletes all schools from the database. This operation is atomic.
@@ -113,6 +155,7 @@ class SchoolService(AbstractService):
         response = self.requests.delete(url, headers=headers)
         self.check_response_status(response, expected_status=200)
 
+    @invalidates("SCHOOL:{school.id}:COURSES")
     def create_course(self, token: str, school: SchoolModel, course: CourseModel) -> CourseModel:
         headers = self.create_default_header(token)
         course.school_id = school.id
@@ -122,43 +165,88 @@ class SchoolService(AbstractService):
         self.check_response_status(response, expected_status=201)
         return CourseModel.parse_obj(response.json())
 
-    def get_courses(self, token: str, school: SchoolModel) -> CourseList:
+    def get_courses(self, token: str, school: SchoolModel, fields: XFieldList = None) -> CourseList:
         """
         Get a list of courses, associated with the provided school.
         """
+        if fields is None:
+            courses = self.cache.get_school_courses(self.token_hash(token), school.id)
+            if courses is not None:
+                return courses
+
+        return self._fetch_courses(token, school.id, fields)
+
+    def get_courses_many(
+        self, token: str, school_ids: List[int], fields: XFieldList = None
+    ) -> List[Optional[CourseList]]:
+        """
+        Get the courses of several schools. Returns a list of course
+        lists in the order of ``school_ids``. Cached lists are read
+        with a single cache request, the missing ones are requested
+        concurrently. If a school does not exist, its entry is None.
+        """
+
+        def fetch(school_id: int) -> Optional[CourseList]:
+            try:
+                return self._fetch_courses(token, school_id, fields)
+            except DoesNotExist:
+                return None
+
+        cached = None
+        if fields is None:
+            cached = functools.partial(self.cache.get_schools_courses, self.token_hash(token))
+        return self.resolve_many(school_ids, fetch, cached)
+
+    def _fetch_courses(self, token: str, school_id: int, fields: XFieldList = None) -> CourseList:
         response = self.requests.get(
-            self.url_for(f"/school/{school.id}/courses/"), headers=self.create_default_header(token)
+            self.url_for(f"/school/{school_id}/courses/"),
+            headers=self.create_default_header(token, fields=fields),
         )
         self.check_response_status(response, expected_status=200)
-        return [CourseModel.parse_obj(course) for course in response.json()]
+        courses = self.parse_models(CourseModel, response.json(), fields)
+        if fields is None:
+            self.cache.set_school_courses(self.token_hash(token), school_id, courses)
+        return courses
 
-    def get_course(self, token: str, course_id: int) -> CourseModel:
+    def get_course(self, token: str, course_id: int, fields: XFieldList = None) -> CourseModel:
         """
         Get an course by id.
 
         We do not need an school id, as course ids are unique.
-        For security reasons, we should check if this course is
-        within the scope of the current user. But for the time
-        beeing, we are optimistic.
+        The server checks, if the course is within the scope of the
+        current user. A cached course is only returned to a token,
+        that has passed this check.
         """
-        # TODO: Check rights
-        headers = self.create_default_header(token)
+        if fields is None:
+            course = self.cache.get_course(self.token_hash(token), course_id)
+            if course is not None:
+                return course
+
+        headers = self.create_default_header(token, fields=fields)
         url = self.url_for(f"/course/{course_id}")
         response = self.requests.get(url, headers=headers)
         self.check_response_status(response, expected_status=200)
 
-        return CourseModel.parse_obj(response.json())
+        course = self.parse_model(CourseModel, response.json(), fields)
+        if fields is None:
+            self.cache.set_course(self.token_hash(token), course)
+        return course
 
-    def get_course_or_none(self, token: str, course_id: int) -> Optional[CourseModel]:
+    def get_course_or_none(
+        self, token: str, course_id: int, fields: XFieldList = None
+    ) -> Optional[CourseModel]:
         """
         Returns the CourseModel for the requested course is or None, if
         any prerequisite does not match (Does not exist, not enough rigths, ...)
         """
         try:
-            return self.get_course(token, course_id)
+            return self.get_course(token, course_id, fields=fields)
         except Exception:  # pylint: disable=bare-except
             return None
 
+    @invalidates(
+        "COURSE:{course_id}", "COURSE:{course_id}:UNITS", "SCHOOL:{result.school_id}:COURSES"
+    )
     def delete_course(self, token: str, course_id: int) -> CourseModel:
         """
         Delete a course specified by it's id
@@ -177,6 +265,7 @@ class SchoolService(AbstractService):
         self.check_response_status(response, expected_status=200)
         return CourseModel.parse_obj(response.json())
 
+    @invalidates("SCHOOL:{result.school_id}:COURSES", refresh="COURSE:{result.id}")
     def update_course(self, token: str, updated_course: CourseModel) -> CourseModel:
         """
         Update an existing course specified by it's id of the course.
@@ -198,20 +287,37 @@ class SchoolService(AbstractService):
         self.check_response_status(response, expected_status=200)
         return CourseModel.parse_obj(response.json())
 
-    def get_units(self, token: str, course_id: int) -> UnitList:
-        headers = self.create_default_header(token)
+    def get_units(self, token: str, course_id: int, fields: XFieldList = None) -> UnitList:
+        if fields is None:
+            units = self.cache.get_course_units(self.token_hash(token), course_id)
+            if units is not None:
+                return units
+
+        headers = self.create_default_header(token, fields=fields)
         url = self.url_for(f"/course/{course_id}/units/")
         response = self.requests.get(url, headers=headers)
         self.check_response_status(response, expected_status=200)
-        return [UnitModel.parse_obj(unit) for unit in response.json()]
-
-    def get_unit(self, token: str, unit_id: int) -> UnitModel:
-        headers = self.create_default_header(token)
+        units = self.parse_models(UnitModel, response.json(), fields)
+        if fields is None:
+            self.cache.set_course_units(self.token_hash(token), course_id, units)
+        return units
+
+    def get_unit(self, token: str, unit_id: int, fields: XFieldList = None) -> UnitModel:
+        if fields is None:
+            unit = self.cache.get_unit(self.token_hash(token), unit_id)
+            if unit is not None:
+                return unit
+
+        headers = self.create_default_header(token, fields=fields)
         url = self.url_for(f"/unit/{unit_id}")
         response = self.requests.get(url, headers=headers)
         self.check_response_status(response, expected_status=200)
-        return UnitModel.parse_obj(response.json())
+        unit = self.parse_model(UnitModel, response.json(), fields)
+        if fields is None:
+            self.cache.set_unit(self.token_hash(token), unit)
+        return unit
 
+    @invalidates("COURSE:{course_id}:UNITS")
     def create_unit(self, token: str, course_id: int, unit: UnitModel) -> CourseModel:
         headers = self.create_default_header(token)
         data = unit.json()
@@ -220,6 +326,11 @@ class SchoolService(AbstractService):
         self.check_response_status(response, expected_status=201)
         return UnitModel.parse_obj(response.json())
 
+    @invalidates(
+        "COURSE:{unit.course_id}:UNITS",
+        "COURSE:{result.course_id}:UNITS",
+        refresh="UNIT:{result.id}",
+    )
     def update_unit(self, token: str, unit: UnitModel) -> UnitModel:
         headers = self.create_default_header(token)
         url = self.url_for(f"/unit/{unit.id}")
@@ -227,6 +338,7 @@ class SchoolService(AbstractService):
         self.check_response_status(response, expected_status=200)
         return UnitModel.parse_obj(response.json())
 
+    @invalidates("UNIT:{unit_id}", "COURSE:{result.course_id}:UNITS")
     def delete_unit(self, token: str, unit_id: int) -> UnitModel:
         headers = self.create_default_header(token)
         url = self.url_for(f"/unit/{unit_id}")
@@ -234,28 +346,38 @@ class SchoolService(AbstractService):
         self.check_response_status(response, expected_status=200)
         return UnitModel.parse_obj(response.json())
 
-    def get_school_teacher(self, token: str, school_id: int) -> List[UserModel]:
-        headers = self.create_default_header(token)
+    def get_school_teacher(
+        self, token: str, school_id: int, fields: XFieldList = None
+    ) -> List[UserModel]:
+        headers = self.create_default_header(token, fields=fields)
         url = self.url_for(f"/school/{school_id}/teacher/")
         response = self.requests.get(url, headers=headers)
         self.check_response_status(response, expected_status=200)
-        return [UserModel.parse_obj(user) for user in response.json()]
+        return self.parse_models(UserModel, response.json(), fields)
 
-    def _get_space_schools(self, token, user: UserModel, space: str) -> List[SchoolModel]:
-        headers = self.create_default_header(token)
+    def _get_space_schools(
+        self, token, user: UserModel, space: str, fields: XFieldList = None
+    ) -> List[SchoolModel]:
+        headers = self.create_default_header(token, fields=fields)
         url = self.url_for(f"/user/{user.id}/{space}/schools/")
         response = self.requests.get(url, headers=headers)
         self.check_response_status(response, expected_status=200)
-        return [SchoolModel.parse_obj(school) for school in response.json()]
+        return self.parse_models(SchoolModel, response.json(), fields)
 
-    def get_headmaster_schools(self, token, user: UserModel) -> List[SchoolModel]:
-        return self._get_space_schools(token, user, "headmaster")
+    def get_headmaster_schools(
+        self, token, user: UserModel, fields: XFieldList = None
+    ) -> List[SchoolModel]:
+        return self._get_space_schools(token, user, "headmaster", fields)
 
-    def get_teacher_schools(self, token, user: UserModel) -> List[SchoolModel]:
-        return self._get_space_schools(token, user, "teacher")
+    def get_teacher_schools(
+        self, token, user: UserModel, fields: XFieldList = None
+    ) -> List[SchoolModel]:
+        return self._get_space_schools(token, user, "teacher", fields)
 
-    def get_student_schools(self, token, user: UserModel) -> List[SchoolModel]:
-        return self._get_space_schools(token, user, "student")
+    def get_student_schools(
+        self, token, user: UserModel, fields: XFieldList = None
+    ) -> List[SchoolModel]:
+        return self._get_space_schools(token, user, "student", fields)
 
     def add_teacher(self, token: str, school: SchoolModel, teacher: UserModel) -> bool:
         headers = self.create_default_header(token)
@@ -268,3 +390,15 @@ class SchoolService(AbstractService):
         url = self.url_for(f"/school/{school.id}/teacher/{teacher.id}/")
         response = self.requests.delete(url, headers=headers)
         return response.status_code == 200
+
+    def add_student(self, token: str, school: SchoolModel, student: UserModel) -> bool:
+        headers = self.create_default_header(token)
+        url = self.url_for(f"/school/{school.id}/student/{student.id}/")
+        response = self.requests.put(url, headers=headers)
+        return response.status_code == 200
+
+    def remove_student(self, token: str, school: SchoolModel, student: UserModel) -> bool:
+        headers = self.create_default_header(token)
+        url = self.url_for(f"/school/{school.id}/student/{student.id}/")
+        response = self.requests.delete(url, headers=headers)
+        return response.status_code == 200
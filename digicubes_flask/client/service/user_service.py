@@ -1,8 +1,9 @@
 """
 All user requests
 """
+import functools
 import logging
-from typing import List, Optional, Text
+from typing import Any, Dict, Iterator, List, Optional, Text, Union
 
 from pydantic import parse_obj_as
 
@@ -14,6 +15,7 @@ from digicubes_flask.exceptions import (ConstraintViolation, DigiCubeError,
 
 from .abstract_service import AbstractService
 from .filter import Query
+from .invalidation import invalidates
 
 UserList = List[UserModel]
 XFieldList = Optional[List[Text]]
@@ -61,6 +63,79 @@ class UserService(AbstractService):
         :raises TokenExpired: is the token has expired.
         :raises ServerError: if an unpredicted exception occurred.
         """
+        return self.parse_models(UserModel, self._fetch_page(token, fields, offset, count), fields)
+
+    def iter_all(
+        self,
+        token,
+        page_size: int = 100,
+        fields: XFieldList = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        prefetch: bool = True,
+    ) -> Iterator[UserModel]:
+        """
+        Iterate over all users in the database.
+
+        Other than :meth:`all`, the users are requested page by page
+        and every user is parsed only when it is consumed. So only one
+        page (two, if ``prefetch`` is enabled) is held in memory at a
+        time.
+
+        :param str token: The authentification token
+        :param int page_size: The number of users requested with every call.
+        :param XFieldList fields: A list of fieldnames that should be send back.
+            If omitted all attributes will be send back. *[Optional]*
+        :param int offset: Starting with the n-th element in the database.
+        :param int limit: The maximum number of users to yield. If omitted,
+            all users are returned.
+        :param bool prefetch: If True, the next page is requested in the
+            background, while the current page is consumed.
+        :return: A generator of :class:`UserModel` objects.
+        :raises TokenExpired: is the token has expired.
+        :raises ServerError: if an unpredicted exception occurred.
+        """
+        if page_size < 1:
+            raise ValueError("The page size has to be positive.")
+
+        offset = int(offset or 0)
+        remaining = limit
+
+        def fetch(page_offset: int) -> List[Dict[str, Any]]:
+            count = page_size if remaining is None else min(page_size, remaining)
+            return self._fetch_page(token, fields, page_offset, count) if count > 0 else []
+
+        page = fetch(offset)
+        while page:
+            # The server may return less users than requested, if the page
+            # size exceeds its configured maximum. So only an empty page
+            # marks the end.
+            last_page = False
+            if remaining is not None:
+                remaining -= len(page)
+                last_page = remaining <= 0
+
+            offset += len(page)
+            next_page = None
+            if prefetch and not last_page:
+                next_page = self.client.parallel().submit(fetch, offset)
+
+            try:
+                for user_data in page:
+                    yield self.parse_model(UserModel, user_data, fields)
+            except GeneratorExit:
+                if next_page is not None:
+                    next_page.cancel()
+                raise
+
+            if last_page:
+                return
+
+            page = next_page.result() if next_page is not None else fetch(offset)
+
+    def _fetch_page(
+        self, token, fields: XFieldList, offset: Optional[int], count: Optional[int]
+    ) -> List[Dict[str, Any]]:
         headers = self.create_default_header(token, fields=fields)
         url = self.url_for("/users/")
         params = {}
@@ -86,7 +161,7 @@ class UserService(AbstractService):
         if user_data is None:
             raise ServerError("No content provided.")
 
-        return parse_obj_as(List[UserModel], user_data)
+        return user_data
 
     def user_schema(self, token):
         headers = self.create_default_header(token=token)
@@ -123,7 +198,7 @@ class UserService(AbstractService):
         result = self.requests.get(url, headers=headers)
 
         if result.status_code == 200:
-            return parse_obj_as(List[RoleModel], result.json())
+            return self.parse_models(RoleModel, result.json(), fields)
 
         if result.status_code == 404:
             raise DoesNotExist()
@@ -148,7 +223,7 @@ class UserService(AbstractService):
             return None
 
         if result.status_code == 200:
-            return UserModel.parse_obj(result.json())
+            return self.parse_model(UserModel, result.json(), fields)
 
         return None
 
@@ -190,16 +265,58 @@ class UserService(AbstractService):
         except DoesNotExist:
             return None
 
-    def filter(self, token, query: Query):
+    def filter(self, token, query: Query) -> Union[UserList, Optional[UserModel], int]:
+        """
+        Get the users matching the query. The filtering is done
+        by the server.
 
-        response = self.requests.get(
-            self.url_for("/users/filter/"),
-            headers=self.create_default_header(token),
-            params=query.build,
-        )
+        :param str token: The authentification token
+        :param Query query: The query.
+        :return: A list of users. If the query is a ``first`` query, the
+            first matching user or None. If the query is a ``count`` query,
+            the number of matching users.
+        :raises InsufficientRights: If the requesting user has not the permission.
+        :raises TokenExpired: is the token has expired.
+        :raises ServerError: if an unpredicted exception occurred.
+        """
+        return self.run_query(token, "/users/filter/", UserModel, query)
 
-        self.check_response_status(response, expected_status=200)
-        return parse_obj_as(List[UserModel], response.json())
+    def count(self, token, **conditions) -> int:
+        """
+        Returns the number of users matching the conditions, without
+        requesting the users themselves.
+
+        .. code-block:: python
+
+            active_users = digicubes.user.count(token, is_active=True)
+
+        :param str token: The authentification token
+        :param conditions: Filters in the form ``attribute__function=value``.
+            See :meth:`Query.filter`.
+        :return: The number of matching users.
+        :rtype: int
+        """
+        return self.count_matching(token, "/users/filter/", UserModel, **conditions)
+
+    def exists(self, token, exclude_id: Optional[int] = None, **conditions) -> bool:
+        """
+        Checks, if a user matching the conditions exists. Only the id of
+        a matching user is requested.
+
+        .. code-block:: python
+
+            login_taken = digicubes.user.exists(token, login="jdoe", exclude_id=user_id)
+
+        :param str token: The authentification token
+        :param int exclude_id: The user with this id is ignored. *[Optional]*
+        :param conditions: Filters in the form ``attribute__function=value``.
+            See :meth:`Query.filter`.
+        :return: True, if a matching user exists.
+        :rtype: bool
+        """
+        return self.exists_matching(
+            token, "/users/filter/", UserModel, exclude_id=exclude_id, **conditions
+        )
 
     def get_by_email(self, token: str, email: str) -> Optional[UserModel]:
         """
@@ -239,19 +356,57 @@ class UserService(AbstractService):
         :raises TokenExpired: is the token has expired.
         :raises ServerError: if an unpredicted exception occurred.
         """
-        # user = self.cache.get_user(user_id)
-        # if user is not None:
-        #    logger.info("Cache hit for user %s", user.login)
-        #    return user  # Cache hit
+        # Only complete users are cached.
+        if fields is None:
+            user = self.cache.get_user(self.token_hash(token), user_id)
+            if user is not None:
+                return user  # Cache hit
 
         # Cache miss
+        return self._fetch(token, user_id, fields)
+
+    def get_many(
+        self, token, user_ids: List[int], fields: XFieldList = None
+    ) -> List[Optional[UserModel]]:
+        """
+        Get the users with the given ids.
+
+        Duplicate ids are requested only once. Cached users are read
+        with a single cache request and only the missing users are
+        requested from the server concurrently.
+
+        :param str token: The authentification token.
+        :param List[int] user_ids: The ids of the requested users.
+        :param XFieldList fields: The fields of the users, that should be returned.
+        :return: The requested users in the order of ``user_ids``. If
+            a user does not exist, its entry is None.
+        :rtype: A list of :class:`UserModel` objects.
+        :raises InsufficientRights: If the requesting user has not the permission.
+        :raises TokenExpired: is the token has expired.
+        :raises ServerError: if an unpredicted exception occurred.
+        """
+
+        def fetch(user_id: int) -> Optional[UserModel]:
+            try:
+                return self._fetch(token, user_id, fields)
+            except DoesNotExist:
+                return None
+
+        # Only complete users are cached.
+        cached = None
+        if fields is None:
+            cached = functools.partial(self.cache.get_users, self.token_hash(token))
+        return self.resolve_many(user_ids, fetch, cached)
+
+    def _fetch(self, token, user_id: int, fields: XFieldList = None) -> UserModel:
         headers = self.create_default_header(token, fields=fields)
         url = self.url_for(f"/user/{user_id}")
         response = self.requests.get(url, headers=headers)
 
         self.check_response_status(response, expected_status=200)
-        user = UserModel.parse_obj(response.json())
-        # self.cache.set_user(user)  # Cache the fetched user.
+        user = self.parse_model(UserModel, response.json(), fields)
+        if fields is None:
+            self.cache.set_user(self.token_hash(token), user)  # Cache the fetched user.
         return user
 
     def set_password(
@@ -267,11 +422,11 @@ class UserService(AbstractService):
         response = self.requests.post(url, headers=headers, data=data)
         self.check_response_status(response, expected_status=200)
 
+    @invalidates("USER:{user_id}", "USER:{user_id}:ROLES", "USER:{user_id}:RIGHTS")
     def delete(self, token, user_id: int) -> Optional[UserModel]:
         """
         Deletes a user from the database
         """
-        # TODO: Clear from cache (or wait for expiration of the key)
         headers = self.create_default_header(token)
         url = self.url_for(f"/user/{user_id}")
         result = self.requests.delete(url, headers=headers)
@@ -284,6 +439,7 @@ class UserService(AbstractService):
 
         return UserModel.parse_obj(result.json())
 
+    @invalidates("USER:*")
     def delete_all(self, token) -> None:
         """
         Delete all users from the database
@@ -382,6 +538,7 @@ class UserService(AbstractService):
         data = response.json()
         return data["token"]
 
+    @invalidates("USER:{result[0].id}")
     def verify_user(self, token: str):
         """
         Verifies the user, that is connected to this token. If the token is
@@ -404,6 +561,7 @@ class UserService(AbstractService):
 
         return UserModel.parse_obj(data["user"]), data["token"]
 
+    @invalidates(refresh="USER:{result.id}")
     def update(self, token, user: UserModelUpsert) -> UserModel:
         """
         Update an existing user.
@@ -425,11 +583,7 @@ class UserService(AbstractService):
         if response.status_code != 200:
             raise ServerError(f"Wrong status. Expected 200. Got {response.status_code}")
 
-        user = UserModel.parse_obj(response.json())
-
-        # Add or update the cached user
-        # self.cache.set_user(user)
-        return user  # TODO Check other status_codes
+        return UserModel.parse_obj(response.json())  # TODO Check other status_codes
 
     def get_rights(self, token: str, user_id: int) -> List[str]:
         """
@@ -462,7 +616,7 @@ class UserService(AbstractService):
                 return True
         return False
 
-    def get_roles(self, token, user: UserModel) -> List[RoleModel]:
+    def get_roles(self, token, user: UserModel, fields: XFieldList = None) -> List[RoleModel]:
         """
         Get all roles for user.
         """
@@ -472,8 +626,7 @@ class UserService(AbstractService):
         if user.id is None:
             raise ValueError("Invalid user provided. No id.")
 
-        # TODO Filter fields as parameter
-        headers = self.create_default_header(token)
+        headers = self.create_default_header(token, fields=fields)
         url = self.url_for(f"/user/{user.id}/roles/")
         result = self.requests.get(url, headers=headers)
 
@@ -483,8 +636,9 @@ class UserService(AbstractService):
         if result.status_code != 200:
             raise ServerError(f"Wrong status. Expected 200. Got {result.status_code}")
 
-        return parse_obj_as(List[RoleModel], result.json())
+        return self.parse_models(RoleModel, result.json(), fields)
 
+    @invalidates("USER:{user.id}:ROLES", "USER:{user.id}:RIGHTS")
     def add_role(self, token, user: UserModel, role: RoleModel) -> bool:
         """
         Adds a role to the user
@@ -494,6 +648,7 @@ class UserService(AbstractService):
         result = self.requests.put(url, headers=headers)
         return result.status_code == 200
 
+    @invalidates("USER:{user.id}:ROLES", "USER:{user.id}:RIGHTS")
     def remove_role(self, token, user: UserModel, role: RoleModel) -> bool:
         """
         Remove a role from the user
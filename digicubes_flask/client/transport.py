@@ -0,0 +1,206 @@
+"""
+The http transport used by the client to talk to the
+digicubes server.
+"""
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+__all__ = ["Transport", "create_transport"]
+
+logger = logging.getLogger(__name__)
+
+
+class Transport:
+    """
+    A pooled, keep-alive http transport.
+
+    The transport offers the same calling conventions as the
+    ``requests`` module (``get``, ``post``, ``put``, ``delete``),
+    so it can be used as a drop in replacement by the services.
+
+    Every thread gets its own ``requests.Session``, but all sessions
+    of a process share one connection pool. The pool is created lazily
+    and recreated, if the process id changes. So every (forked) gunicorn
+    worker owns its own pool and no sockets are shared between processes.
+
+    :param int pool_connections: The number of host pools to cache.
+    :param int pool_size: The maximum number of connections kept alive per host.
+    :param float connect_timeout: Seconds to wait for a connection to be established.
+    :param float read_timeout: Seconds to wait for the server to send a response.
+    :param int max_retries: How often failed requests are retried. Only idempotent
+        methods are retried after the request has been sent.
+    :param float backoff_factor: The backoff factor between retries. The sleep time
+        is ``backoff_factor * (2 ** (retry - 1))`` seconds.
+    """
+
+    RETRY_STATUS = (502, 503, 504)
+
+    def __init__(
+        self,
+        pool_connections: int = 4,
+        pool_size: int = 10,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 30.0,
+        max_retries: int = 3,
+        backoff_factor: float = 0.3,
+    ) -> None:
+        self.pool_connections = int(pool_connections)
+        self.pool_size = int(pool_size)
+        self.timeout = (float(connect_timeout), float(read_timeout))
+        self.max_retries = int(max_retries)
+        self.backoff_factor = float(backoff_factor)
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pid = None
+        self._adapter = None
+        self._sessions = 0
+        self._requests = 0
+        self._failures = 0
+
+    def _create_adapter(self) -> HTTPAdapter:
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.RETRY_STATUS,
+            raise_on_status=False,
+        )
+        return HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+        )
+
+    def _get_adapter(self) -> HTTPAdapter:
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    logger.debug("Creating http connection pool for process %d", pid)
+                    self._adapter = self._create_adapter()
+                    self._sessions = 0
+                    self._requests = 0
+                    self._failures = 0
+                    self._pid = pid
+        return self._adapter
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        Returns the session of the calling thread. All sessions
+        of a process share the same connection pool.
+        """
+        adapter = self._get_adapter()
+        session = getattr(self._local, "session", None)
+        if session is None or self._local.adapter is not adapter:
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._local.session = session
+            self._local.adapter = adapter
+            with self._lock:
+                self._sessions += 1
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a request using the pooled session of the calling thread.
+        If no timeout is provided, the configured timeouts are used.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        session = self.session
+        with self._lock:
+            self._requests += 1
+        try:
+            return session.request(method, url, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self._failures += 1
+            raise
+
+    def get(self, url: str, params=None, **kwargs) -> requests.Response:
+        # pylint: disable=C0111
+        return self.request("GET", url, params=params, **kwargs)
+
+    def post(self, url: str, data=None, json=None, **kwargs) -> requests.Response:
+        # pylint: disable=C0111
+        return self.request("POST", url, data=data, json=json, **kwargs)
+
+    def put(self, url: str, data=None, **kwargs) -> requests.Response:
+        # pylint: disable=C0111
+        return self.request("PUT", url, data=data, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        # pylint: disable=C0111
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self) -> None:
+        """
+        Closes all pooled connections of the current process.
+        """
+        with self._lock:
+            if self._adapter is not None and self._pid == os.getpid():
+                self._adapter.close()
+            self._adapter = None
+            self._pid = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns some statistics about the connection pool of the
+        current process.
+        """
+        pools = []
+        adapter = self._adapter if self._pid == os.getpid() else None
+        if adapter is not None:
+            manager = adapter.poolmanager
+            for key in manager.pools.keys():
+                pool = manager.pools.get(key)
+                if pool is None:
+                    continue
+                idle = sum(1 for conn in list(pool.pool.queue) if conn is not None)
+                pools.append(
+                    {
+                        "host": pool.host,
+                        "port": pool.port,
+                        "scheme": pool.scheme,
+                        "num_connections": pool.num_connections,
+                        "num_requests": pool.num_requests,
+                        "idle_connections": idle,
+                    }
+                )
+
+        return {
+            "pid": os.getpid(),
+            "pool_connections": self.pool_connections,
+            "pool_size": self.pool_size,
+            "connect_timeout": self.timeout[0],
+            "read_timeout": self.timeout[1],
+            "max_retries": self.max_retries,
+            "sessions": self._sessions if adapter is not None else 0,
+            "requests": self._requests if adapter is not None else 0,
+            "failures": self._failures if adapter is not None else 0,
+            "pools": pools,
+        }
+
+
+def create_transport(**kwargs) -> Transport:
+    """
+    Creates the transport. The settings are read from the
+    environment. Explicitly passed keyword arguments win.
+    """
+    settings: Dict[str, Optional[str]] = {
+        "pool_connections": os.getenv("DC_HTTP_POOL_CONNECTIONS", "4"),
+        "pool_size": os.getenv("DC_HTTP_POOL_SIZE", "10"),
+        "connect_timeout": os.getenv("DC_HTTP_CONNECT_TIMEOUT", "3.05"),
+        "read_timeout": os.getenv("DC_HTTP_READ_TIMEOUT", "30"),
+        "max_retries": os.getenv("DC_HTTP_MAX_RETRIES", "3"),
+        "backoff_factor": os.getenv("DC_HTTP_BACKOFF_FACTOR", "0.3"),
+    }
+    settings.update(kwargs)
+    return Transport(**settings)
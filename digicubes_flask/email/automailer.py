@@ -2,22 +2,69 @@ import logging
 import os
 import smtplib
 import threading
+import time
 from email.headerregistry import Address
 from email.message import EmailMessage
-from queue import Queue
-from typing import Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import quote
 
 from flask import current_app, url_for
 from jinja2 import Environment, PackageLoader, select_autoescape
 
+from digicubes_flask import DIGICUBES_ACCOUNT_ATTRIBUTE_NAME
 from digicubes_flask import exceptions as ex
 from digicubes_flask.client.model import UserModel
 
+from .mail_template import MailTemplate, load_templates
+from .metrics import MailMetrics
+from .outbox import Outbox, OutboxJob, backoff, create_outbox
+from .rate_limit import RateLimiter
+from .smtp import SmtpConnection
+
 # from email.utils import make_msgid
 
 
 logger = logging.getLogger(__name__)
 
+# The default subjects of the mail templates
+MAIL_SUBJECTS = {
+    "user_verification": "Verify your DigiCubes Account",
+}
+
+# The attributes of a recipient, that are stored with a mail
+RECIPIENT_FIELDS = {"id", "login", "first_name", "last_name", "email"}
+
+# Placeholder for the token in a queued verification link. The
+# token is created by the worker, right before the mail is sent.
+VERIFICATION_TOKEN = "__verification_token__"
+
+# Seconds between two checks of an idle worker, whether it is stopped
+STOP_CHECK_INTERVAL = 2.0
+
+# With a rate limit, a worker reserves only the mails it can send
+# within this share of the lease. A mail is not sent any more, if this
+# share of its lease has passed, as it may have been reserved again.
+RESERVE_LEASE_SHARE = 0.5
+SEND_LEASE_SHARE = 0.8
+
+
+def _is_permanent(error: Exception) -> bool:
+    """
+    Errors, that will not go away by trying again. Like
+    refused recipients or any other 5xx reply.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        # 4xx refusals, like greylisting, are temporary.
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and all(500 <= code < 600 for code in codes)
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600
+    return isinstance(error, (KeyError, ValueError, TypeError))
+
+
+def _has_passed(deadline: Optional[float]) -> bool:
+    return deadline is not None and deadline < time.monotonic()
+
 
 class MailCube:
     @staticmethod
@@ -63,14 +110,81 @@ class MailCube:
     def number_of_workers(self):
         return int(os.getenv("DC_MAILCUBE_WORKERS", 1))
 
+    @property
+    def enqueue_only(self) -> bool:
+        """
+        If set, the application only adds mails to the outbox and
+        starts no workers. The mails are sent by a separate worker
+        process. See :mod:`digicubes_flask.email.worker`.
+        """
+        return os.getenv("DC_MAILCUBE_ENQUEUE_ONLY", "False") == "True"
+
+    @property
+    def rate_limit(self) -> float:
+        """
+        Maximum number of mails sent per second by all workers of
+        this process. Zero disables the limit.
+        """
+        return float(os.getenv("DC_MAILCUBE_RATE_LIMIT", 0))
+
     @property
     def number_of_tries(self):
-        return int(os.getenv("DC_MAILCUBE_MAX_RETRY", 1))
+        return int(os.getenv("DC_MAILCUBE_MAX_RETRY", 5))
+
+    @property
+    def retry_delay(self) -> float:
+        """
+        Seconds to wait before the first retry of a failed mail.
+        The delay doubles with every further try.
+        """
+        return float(os.getenv("DC_MAILCUBE_RETRY_DELAY", 30))
+
+    @property
+    def max_retry_delay(self) -> float:
+        return float(os.getenv("DC_MAILCUBE_MAX_RETRY_DELAY", 3600))
+
+    @property
+    def smtp_idle_timeout(self) -> float:
+        """
+        Seconds, an unused smtp connection of a worker is kept open.
+        """
+        return float(os.getenv("DC_SMTP_IDLE_TIMEOUT", 30))
+
+    @property
+    def smtp_max_messages(self) -> int:
+        """
+        Number of messages sent with one smtp connection, before
+        it is renewed.
+        """
+        return int(os.getenv("DC_SMTP_MAX_MESSAGES", 100))
+
+    @property
+    def batch_size(self) -> int:
+        """
+        Maximum number of mails a worker renders and sends in one pass.
+        """
+        return int(os.getenv("DC_MAILCUBE_BATCH_SIZE", 50))
+
+    def create_smtp_connection(self) -> SmtpConnection:
+        return SmtpConnection(
+            self.smtp_host,
+            self.smtp_port,
+            username=self.smtp_username,
+            password=self.smtp_password,
+            max_messages=self.smtp_max_messages,
+            metrics=self.metrics,
+        )
 
     def __init__(self, app=None):
 
-        self.queue = Queue()
+        self.app = None
+        self.outbox: Optional[Outbox] = None
+        self.templates: Dict[str, MailTemplate] = {}
         self.workers = []
+        self.rate_limiter: Optional[RateLimiter] = None
+        self.reserve_size = 1
+        self.stopping = threading.Event()
+        self.metrics = MailMetrics()
         self.enabled = False
         self.config = None
 
@@ -82,71 +196,324 @@ class MailCube:
             self.init_app(app)
 
     def init_app(self, app):
+        self.app = app
         app.digicubes_mail_cube = self
         self.secret = app.config.get("secret", None)
         if self.secret is None:
             raise ex.ConfigurationError("Secret not configured")
 
-        for _ in range(self.number_of_workers):
+        # All templates are compiled once. The workers only render them.
+        self.templates = load_templates(self.jinja, MAIL_SUBJECTS)
+
+        if not self.is_enabled:
+            logger.info("The email module is not activated. No mail workers are started.")
+            return
+
+        # Mails are kept in a durable outbox, so they are sent,
+        # even if this process ends before its workers are done.
+        self.outbox = create_outbox()
+        if self.enqueue_only:
+            logger.info("The mails are sent by a separate worker process.")
+            return
+
+        self.start_workers()
+
+    def start_workers(self, number_of_workers: Optional[int] = None, rate_limit: float = None):
+        """
+        Starts the threads, that send the mails of the outbox. The
+        defaults are ``DC_MAILCUBE_WORKERS`` and ``DC_MAILCUBE_RATE_LIMIT``.
+        """
+        if self.outbox is None:
+            raise ex.ConfigurationError("The email module is not activated.")
+
+        if number_of_workers is None:
+            number_of_workers = self.number_of_workers
+
+        if rate_limit is None:
+            rate_limit = self.rate_limit
+
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.reserve_size = self.batch_size
+        if self.rate_limiter.enabled:
+            # The workers share the rate. A worker must be able to send
+            # all reserved mails, before their lease expires.
+            share = rate_limit * self.outbox.lease_timeout * RESERVE_LEASE_SHARE
+            self.reserve_size = max(1, min(self.batch_size, int(share / max(1, number_of_workers))))
+        self.stopping.clear()
+        for _ in range(number_of_workers):
             w = threading.Thread(target=self.__worker__, daemon=True)
             w.start()
             self.workers.append(w)
 
-    def __worker__(self):
-        while True:
-            obj = self.queue.get()
-            number_of_tries = obj.get("number_of_tries", 1)
-            recipient = obj["recipient"]
-            verification_address = obj["verification_address"]
+    def stop_workers(self, timeout: Optional[float] = None):
+        """
+        Stops the workers after their current mail. Mails, that
+        were reserved but not sent, are delivered again, when
+        their lease expires.
+        """
+        self.stopping.set()
+        for worker in self.workers:
+            worker.join(timeout)
+        self.workers = [worker for worker in self.workers if worker.is_alive()]
 
+    def __worker__(self):
+        # Every worker keeps its own connection, so a bulk of
+        # mails needs only one handshake and login per worker.
+        connection = self.create_smtp_connection()
+        try:
+            self.__work__(connection)
+        finally:
+            connection.close()
+
+    def __work__(self, connection: SmtpConnection):
+        while not self.stopping.is_set():
             try:
-                first_name = "" if not recipient.first_name else recipient.first_name
-                last_name = "" if not recipient.last_name else recipient.last_name
-                name = (
-                    recipient.login
-                    if not first_name and not last_name
-                    else f"{first_name} {last_name}"
-                )
+                # Short waits, so a stopped worker ends soon.
+                jobs = self.outbox.get_many(self.reserve_size, timeout=STOP_CHECK_INTERVAL)
+                deadline = time.monotonic() + self.outbox.lease_timeout * SEND_LEASE_SHARE
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Could not read from the outbox.")
+                self.stopping.wait(self.retry_delay)
+                continue
+
+            if not jobs:
+                if connection.idle_time() >= self.smtp_idle_timeout:
+                    connection.close()
+                continue
+
+            for job, message in self.render_batch(jobs):
+                if self.stopping.is_set():
+                    break
+                try:
+                    self.deliver(connection, job, message, deadline)
+                except Exception:  # pylint: disable=broad-except
+                    # The outbox could not be updated. The lease of the
+                    # job expires and it is taken again by some worker.
+                    logger.exception("Could not update mail %s in the outbox.", job.id)
+
+    def deliver(
+        self,
+        connection: SmtpConnection,
+        job: OutboxJob,
+        message: Union[EmailMessage, Exception],
+        deadline: Optional[float] = None,
+    ):
+        """
+        Sends a rendered mail and acks the job, or schedules it for
+        another try. Raises, if the outbox cannot be updated.
 
-                template = self.jinja.get_template("user_verification_plain.jinja")
-                plain_text = template.render(
-                    user=recipient, verification_address=verification_address
-                )
+        If the ``deadline`` (``time.monotonic``) has passed, the mail
+        is not sent. It is left to the worker, that reserves it again,
+        when the lease expires.
+        """
+        if isinstance(message, Exception):
+            self.handle_failure(job, message)
+            return
 
-                template = self.jinja.get_template("user_verification_html.jinja")
-                html_text = template.render(
-                    user=recipient, verification_address=verification_address
+        # The rate limit may block for a while, so the lease is
+        # checked again afterwards.
+        if not _has_passed(deadline):
+            self.rate_limiter.acquire()
+        if _has_passed(deadline):
+            logger.warning("The lease of mail %s is about to expire. Mail not sent.", job.id)
+            return
+
+        try:
+            connection.send_message(message)
+        except Exception as error:  # pylint: disable=broad-except
+            self.handle_failure(job, error)
+        else:
+            self.metrics.count("sent")
+            if job.created_at is not None:
+                self.metrics.observe("delivery_time", time.time() - job.created_at)
+            if not self.outbox.ack(job):
+                logger.warning(
+                    "The lease of mail %s expired before it was sent. It may be sent again.",
+                    job.id,
                 )
 
-                with smtplib.SMTP_SSL(self.smtp_host, self.smtp_port) as mailserver:
-                    mailserver.login(self.smtp_username, self.smtp_password)
-                    msg = EmailMessage()
-                    msg["Subject"] = "Verify your DigiCubes Account"
-                    msg.set_content("Automated testmail")
-                    msg["To"] = Address(display_name=name, addr_spec=recipient.email)
-                    msg["From"] = Address(
-                        display_name=self.smtp_from_display_name,
-                        addr_spec=self.smtp_from_email_addr,
-                    )
-                    msg.set_content(plain_text)
-                    msg.add_alternative(html_text, subtype="html")
-                    mailserver.send_message(msg)
-
-            except Exception:  # pylint: disable=bare-except
-                # Something failed, so we put
-                # the item back into he queue to try
-                # again "later"
-                number_of_tries += 1
-                if number_of_tries > self.number_of_tries:
-                    logger.exception(
-                        "Unable to send verification email for user with id %d. Tried %d times.",
-                        recipient.id,
-                        (number_of_tries - 1),
-                    )
-                else:
-                    self.queue.put(obj)
-            finally:
-                self.queue.task_done()
+    def statistics(self) -> Dict[str, Any]:
+        """
+        Returns the metrics of the mail workers of this process and
+        the number of jobs in the outbox, that is shared by all
+        processes.
+        """
+        result = self.metrics.as_dict()
+        result["workers"] = len(self.workers)
+        result["rate_limit"] = self.rate_limiter.rate if self.rate_limiter is not None else 0
+        result["queue"] = None
+        if self.outbox is not None:
+            try:
+                result["queue"] = self.outbox.stats()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Could not read the state of the outbox.")
+        return result
+
+    def handle_failure(self, job: OutboxJob, error: Exception):
+        """
+        Schedules a failed mail for another try, or moves it to the
+        dead letters, if it has been tried too often.
+        """
+        attempts = job.attempts + 1
+        message = str(error) or type(error).__name__
+        if attempts >= self.number_of_tries or _is_permanent(error):
+            logger.error(
+                "Unable to send mail %s. Tried %d times. Last error: %s", job.id, attempts, message
+            )
+            self.outbox.bury(job, message)
+            self.metrics.count("dead")
+        else:
+            delay = backoff(attempts, self.retry_delay, self.max_retry_delay)
+            logger.warning(
+                "Could not send mail %s (%s). Trying again in %.0f seconds.", job.id, message, delay
+            )
+            self.outbox.retry(job, delay, message)
+            self.metrics.count("retried")
+
+    @property
+    def sender(self) -> Address:
+        return Address(
+            display_name=self.smtp_from_display_name or "", addr_spec=self.smtp_from_email_addr
+        )
+
+    def render_batch(
+        self, jobs: List[OutboxJob]
+    ) -> List[Tuple[OutboxJob, Union[EmailMessage, Exception]]]:
+        """
+        Renders the messages for many jobs in one pass. The sender and
+        custom subjects are prepared once for the whole batch. A job,
+        that cannot be rendered, gets the error instead of a message.
+        """
+        sender = self.sender
+        subjects: Dict[Tuple[str, str], MailTemplate] = {}
+        tokens = self.create_verification_tokens(jobs)
+        result = []
+        for job in jobs:
+            try:
+                payload = job.payload
+                if job.id in tokens:
+                    payload = self.insert_verification_token(payload, tokens[job.id])
+                template = self.templates[payload["template"]]
+                subject = payload.get("subject", None)
+                if subject is not None:
+                    key = (template.name, subject)
+                    if key not in subjects:
+                        subjects[key] = template.with_subject(self.jinja, subject)
+                    template = subjects[key]
+
+                result.append((job, self.create_message(template, payload, sender)))
+            except Exception as error:  # pylint: disable=broad-except
+                result.append((job, error))
+        return result
+
+    def create_verification_tokens(
+        self, jobs: List[OutboxJob]
+    ) -> Dict[str, Union[str, Exception]]:
+        """
+        Creates the verification tokens for all verification mails of
+        a batch. The tokens are requested concurrently. Returns the
+        token or the error of the request for every job id.
+        """
+        user_ids = {
+            job.id: job.payload.get("recipient", {}).get("id")
+            for job in jobs
+            if "verification_link" in job.payload
+        }
+        if not user_ids:
+            return {}
+
+        manager = getattr(self.app, DIGICUBES_ACCOUNT_ATTRIBUTE_NAME, None)
+        if manager is None:
+            error = ex.ConfigurationError("No account manager. Cannot create tokens.")
+            return {job_id: error for job_id in user_ids}
+
+        service = manager.user
+
+        def fetch(user_id: int) -> Union[str, Exception]:
+            try:
+                return service.get_verification_token(user_id)
+            except Exception as error:  # pylint: disable=broad-except
+                return error
+
+        tokens = service.resolve_many(list(user_ids.values()), fetch)
+        return dict(zip(user_ids, tokens))
+
+    @staticmethod
+    def insert_verification_token(
+        payload: Dict[str, Any], token: Union[str, Exception]
+    ) -> Dict[str, Any]:
+        """
+        Returns a copy of the payload, with the verification link
+        in the context.
+        """
+        if isinstance(token, Exception):
+            raise token
+
+        link = payload["verification_link"].replace(VERIFICATION_TOKEN, quote(token, safe=""))
+        context = dict(payload.get("context", None) or {}, verification_address=link)
+        return dict(payload, context=context)
+
+    def create_message(
+        self, template: MailTemplate, payload: Dict[str, Any], sender: Address
+    ) -> EmailMessage:
+        """
+        Creates the message for a payload of the outbox.
+        """
+        recipient = UserModel.construct(**payload["recipient"])
+
+        first_name = "" if not recipient.first_name else recipient.first_name
+        last_name = "" if not recipient.last_name else recipient.last_name
+        name = f"{first_name} {last_name}".strip() or recipient.login
+
+        context = dict(payload.get("context", None) or {}, user=recipient)
+        return template.render(
+            context, sender, Address(display_name=name, addr_spec=recipient.email)
+        )
+
+    def send_mail(
+        self,
+        template_name: str,
+        recipients: Iterable[UserModel],
+        subject: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """
+        Sends the mail template ``template_name`` to every recipient.
+        The ``context`` is the same for all recipients and has to be
+        serializable to json. The recipient is available as ``user``
+        in the templates and in the ``subject``, that replaces the
+        default subject of the template.
+
+        Recipients without an email address are skipped. Returns the
+        number of queued mails. Raises an ``OutboxError``, if the mails
+        cannot be queued.
+        """
+        if not self.is_enabled:
+            logger.warning("Cannot send mails, because the email module is not activated.")
+            return 0
+
+        if template_name not in self.templates:
+            raise ValueError(f"Unknown mail template '{template_name}'")
+
+        payloads = []
+        for recipient in recipients:
+            if not recipient.email:
+                logger.warning("User %s has no email address. Mail not sent.", recipient.id)
+                continue
+
+            payload = {
+                "template": template_name,
+                "recipient": recipient.dict(include=RECIPIENT_FIELDS),
+            }
+            if subject is not None:
+                payload["subject"] = subject
+            if context:
+                payload["context"] = context
+            payloads.append(payload)
+
+        self.outbox.put_many(payloads)
+        self.metrics.count("enqueued", len(payloads))
+        return len(payloads)
 
     def create_verification_link(self, recipient: UserModel):
         from digicubes_flask import \
@@ -169,5 +536,42 @@ class MailCube:
         if not recipient.email:
             raise ValueError("Recipient has no email address. Cannot send email.")
 
-        url = self.create_verification_link(recipient)
-        self.queue.put({"recipient": recipient, "verification_address": url})
+        self.send_verification_emails([recipient])
+
+    def send_verification_emails(self, recipients: Iterable[UserModel]) -> int:
+        """
+        Sends a verification mail to every recipient.
+
+        Only the link with a placeholder for the token is queued. The
+        workers create the tokens for a whole batch of mails at once,
+        so queuing does not wait for the server, and a token is not
+        older than the mail, that contains it.
+
+        Recipients without an email address are skipped. Returns the
+        number of queued mails. Raises an ``OutboxError``, if the mails
+        cannot be queued.
+        """
+        if not self.is_enabled:
+            logger.warning(
+                "Cannot send verification emails, because the email module is not activated."
+            )
+            return 0
+
+        link = url_for("account.verify", token=VERIFICATION_TOKEN, _external=True)
+        payloads = []
+        for recipient in recipients:
+            if not recipient.email:
+                logger.warning("User %s has no email address. Mail not sent.", recipient.id)
+                continue
+
+            payloads.append(
+                {
+                    "template": "user_verification",
+                    "recipient": recipient.dict(include=RECIPIENT_FIELDS),
+                    "verification_link": link,
+                }
+            )
+
+        self.outbox.put_many(payloads)
+        self.metrics.count("enqueued", len(payloads))
+        return len(payloads)
@@ -0,0 +1,87 @@
+"""
+Compiled mail templates.
+"""
+from email.headerregistry import Address
+from email.message import EmailMessage
+from typing import Any, Dict, Optional
+
+from jinja2 import Environment, Template, TemplateNotFound
+
+__all__ = ["MailTemplate", "load_templates"]
+
+# Templates are named ``<name>_plain.jinja`` and ``<name>_html.jinja``.
+PLAIN_SUFFIX = "_plain.jinja"
+HTML_SUFFIX = "_html.jinja"
+
+
+def _compile_subject(jinja: Environment, subject: str) -> Template:
+    """
+    Compiles a subject. Subjects are plain text, so they are
+    never autoescaped, even if the environment escapes strings.
+    """
+    return jinja.overlay(autoescape=False).from_string(subject)
+
+
+class MailTemplate:
+    """
+    A mail template with a plain text and an optional html part.
+    Both parts and the subject are compiled once and rendered for
+    every recipient.
+
+    The recipient is available as ``user`` in the templates and in
+    the subject.
+    """
+
+    __slots__ = ["name", "subject", "plain", "html"]
+
+    def __init__(
+        self, name: str, subject: Template, plain: Template, html: Optional[Template] = None
+    ):
+        self.name = name
+        self.subject = subject
+        self.plain = plain
+        self.html = html
+
+    @staticmethod
+    def load(jinja: Environment, name: str, subject: str = "") -> "MailTemplate":
+        """
+        Loads and compiles the template ``name`` from the environment.
+        """
+        plain = jinja.get_template(f"{name}{PLAIN_SUFFIX}")
+        try:
+            html = jinja.get_template(f"{name}{HTML_SUFFIX}")
+        except TemplateNotFound:
+            html = None
+        return MailTemplate(name, _compile_subject(jinja, subject), plain, html)
+
+    def with_subject(self, jinja: Environment, subject: str) -> "MailTemplate":
+        """
+        Returns a copy of the template with another subject.
+        """
+        return MailTemplate(self.name, _compile_subject(jinja, subject), self.plain, self.html)
+
+    def render(self, context: Dict[str, Any], sender: Address, recipient: Address) -> EmailMessage:
+        """
+        Renders the message for a single recipient.
+        """
+        msg = EmailMessage()
+        msg["Subject"] = self.subject.render(context)
+        msg["To"] = recipient
+        msg["From"] = sender
+        msg.set_content(self.plain.render(context))
+        if self.html is not None:
+            msg.add_alternative(self.html.render(context), subtype="html")
+        return msg
+
+
+def load_templates(jinja: Environment, subjects: Dict[str, str]) -> Dict[str, MailTemplate]:
+    """
+    Loads and compiles all mail templates of the environment. The
+    default subject of a template is taken from ``subjects``.
+    """
+    names = [
+        template_name[: -len(PLAIN_SUFFIX)]
+        for template_name in jinja.list_templates()
+        if template_name.endswith(PLAIN_SUFFIX)
+    ]
+    return {name: MailTemplate.load(jinja, name, subjects.get(name, "")) for name in names}
@@ -0,0 +1,96 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("enqueued", "sent", "retried", "dead", "connects", "connect_errors")
+
+# Upper bounds in seconds of the histogram buckets
+HISTOGRAMS: Dict[str, Tuple[float, ...]] = {
+    # Time to open a connection and log in
+    "connect_time": (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    # Time to transmit a single message
+    "send_time": (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    # Time from adding a mail to the outbox until it has been sent
+    "delivery_time": (1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 3600.0),
+}
+
+Listener = Callable[[str, float], None]
+
+
+class Histogram:
+    """
+    Counts observed values in fixed buckets. The buckets are
+    cumulative, like the buckets of a prometheus histogram.
+    """
+
+    __slots__ = ["bounds", "counts", "count", "sum"]
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for index, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self) -> Dict[str, Any]:
+        buckets = {str(bound): count for bound, count in zip(self.bounds, self.counts)}
+        buckets["+Inf"] = self.count
+        return {"buckets": buckets, "count": self.count, "sum": self.sum}
+
+
+class MailMetrics:
+    """
+    Thread safe counters and histograms of the mail workers of
+    one process.
+
+    The current values are returned by :meth:`as_dict`. Listeners,
+    registered with :meth:`add_listener`, are called with the name
+    and the value of every single event, e.g. to forward them to a
+    statsd server. Counters are reported with the amount, they have
+    been increased by. E.g. adding 20 mails to the outbox at once is
+    reported as ``("enqueued", 20)``.
+    """
+
+    def __init__(self):
+        self.counters = {name: 0 for name in COUNTERS}
+        self.histograms = {name: Histogram(bounds) for name, bounds in HISTOGRAMS.items()}
+        self.listeners: List[Listener] = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener: Listener):
+        self.listeners.remove(listener)
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] += value
+        self._notify(name, value)
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            self.histograms[name].observe(value)
+        self._notify(name, value)
+
+    def _notify(self, name: str, value: float):
+        for listener in self.listeners:
+            try:
+                listener(name, value)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Mail metrics listener failed.")
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            result: Dict[str, Any] = dict(self.counters)
+            for name, histogram in self.histograms.items():
+                result[name] = histogram.as_dict()
+        return result
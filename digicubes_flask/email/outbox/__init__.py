@@ -0,0 +1,53 @@
+import os
+
+from digicubes_flask.exceptions import ConfigurationError
+
+from .outbox import Outbox, OutboxJob, backoff
+from .redis_outbox import RedisOutbox
+from .sqlite_outbox import SqliteOutbox
+
+__all__ = [
+    "Outbox",
+    "OutboxJob",
+    "RedisOutbox",
+    "SqliteOutbox",
+    "backoff",
+    "create_outbox",
+]
+
+
+def create_outbox() -> Outbox:
+    """
+    Creates the configured outbox for outgoing mails.
+
+    The backend is selected by ``DC_OUTBOX_BACKEND``, which is either
+    ``sqlite`` or ``redis``. If it is not set, redis is used when
+    ``DC_REDIS_HOST`` is set and a local sqlite database otherwise.
+    The database file is configured by ``DC_OUTBOX_PATH``.
+    """
+    redis_server = os.getenv("DC_REDIS_HOST")
+    backend = os.getenv("DC_OUTBOX_BACKEND", "sqlite" if redis_server is None else "redis")
+    backend = backend.lower()
+
+    if backend not in ("sqlite", "redis"):
+        raise ConfigurationError(f"Unknown outbox backend '{backend}'")
+
+    lease_timeout = float(os.getenv("DC_OUTBOX_LEASE_TIMEOUT", "300"))
+
+    if backend == "redis":
+        if redis_server is None:
+            raise ConfigurationError("The redis outbox needs DC_REDIS_HOST.")
+
+        return RedisOutbox(
+            host=redis_server,
+            db=int(os.getenv("DC_REDIS_DB", "0")),
+            password=os.getenv("DC_REDIS_PASSWORD"),
+            port=int(os.getenv("DC_REDIS_PORT", "6379")),
+            prefix=os.getenv("DC_REDIS_PREFIX", "dcweb:"),
+            lease_timeout=lease_timeout,
+            max_dead_letters=int(os.getenv("DC_OUTBOX_MAX_DEAD_LETTERS", "10000")),
+        )
+
+    return SqliteOutbox(
+        os.getenv("DC_OUTBOX_PATH", "digicubes-outbox.sqlite3"), lease_timeout=lease_timeout
+    )
@@ -0,0 +1,175 @@
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+def backoff(attempts: int, base: float, maximum: float) -> float:
+    """
+    Returns the delay in seconds before the next try of a job, that
+    failed ``attempts`` times. The delay doubles with every attempt
+    up to ``maximum``. A random jitter of up to 10 percent prevents
+    failed jobs from being retried all at once.
+    """
+    delay = min(base * (2 ** max(attempts - 1, 0)), maximum)
+    return delay * random.uniform(0.9, 1.0)
+
+
+class OutboxJob:
+    """
+    A job reserved from the outbox. The ``lease`` identifies the
+    reservation. Only the holder of the current lease can finish
+    the job.
+    """
+
+    __slots__ = ["id", "payload", "attempts", "created_at", "last_error", "lease"]
+
+    def __init__(
+        self,
+        job_id: str,
+        payload: Dict[str, Any],
+        attempts: int = 0,
+        created_at: Optional[float] = None,
+        last_error: Optional[str] = None,
+        lease: Optional[str] = None,
+    ):
+        self.id = job_id
+        self.payload = payload
+        self.attempts = attempts
+        self.created_at = created_at
+        self.last_error = last_error
+        self.lease = lease
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "payload": self.payload,
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "last_error": self.last_error,
+        }
+
+    def __repr__(self) -> str:
+        return f"OutboxJob(id={self.id}, attempts={self.attempts})"
+
+
+class Outbox:
+    """
+    The base class of the durable outbound queues.
+
+    Jobs are delivered at least once. A reserved job is hidden from
+    other consumers for ``lease_timeout`` seconds. If it is neither
+    acknowledged nor rescheduled within that time, because the worker
+    crashed or hung, it is delivered again.
+
+    Subclasses implement the storage. The waiting for new jobs is
+    done here by polling the storage. Jobs added in the same process
+    wake up the waiting workers at once.
+    """
+
+    def __init__(self, lease_timeout: float = 300.0, poll_interval: float = 1.0):
+        self.lease_timeout = lease_timeout
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Condition()
+
+    def put(self, payload: Dict[str, Any], delay: float = 0.0) -> str:
+        """
+        Adds a new job and returns its id. The job is not
+        delivered before ``delay`` seconds have passed.
+        """
+        return self.put_many([payload], delay=delay)[0]
+
+    def put_many(self, payloads: List[Dict[str, Any]], delay: float = 0.0) -> List[str]:
+        """
+        Adds many jobs at once and returns their ids. Raises an
+        ``OutboxError``, if the jobs cannot be stored.
+        """
+        if not payloads:
+            return []
+
+        job_ids = self._put_many(payloads, time.time() + delay)
+        with self._wakeup:
+            self._wakeup.notify_all()
+        return job_ids
+
+    def get(self, timeout: Optional[float] = None) -> Optional[OutboxJob]:
+        """
+        Reserves the next due job. Waits at most ``timeout`` seconds
+        for a job and returns None, if there is none. Without a timeout
+        it waits until a job is available.
+        """
+        jobs = self.get_many(1, timeout=timeout)
+        return jobs[0] if jobs else None
+
+    def get_many(self, max_jobs: int, timeout: Optional[float] = None) -> List[OutboxJob]:
+        """
+        Reserves up to ``max_jobs`` due jobs. Waits like :meth:`get`
+        for the first job, but not for more. Returns an empty list,
+        if no job became due within the ``timeout``.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            jobs = self._reserve_many(time.time(), max(1, max_jobs))
+            if jobs:
+                return jobs
+
+            wait = self.poll_interval
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                wait = min(wait, remaining)
+
+            with self._wakeup:
+                self._wakeup.wait(wait)
+
+    def ack(self, job: OutboxJob) -> bool:
+        """
+        Removes a finished job. Returns False, if the lease of
+        the job has expired and the job has been reserved again.
+        """
+        raise NotImplementedError()
+
+    def retry(self, job: OutboxJob, delay: float, error: Optional[str] = None) -> bool:
+        """
+        Counts a failed attempt and delivers the job again after
+        ``delay`` seconds.
+        """
+        raise NotImplementedError()
+
+    def bury(self, job: OutboxJob, error: Optional[str] = None) -> bool:
+        """
+        Moves a job, that cannot be delivered, to the dead letters.
+        """
+        raise NotImplementedError()
+
+    def dead_letters(self, limit: int = 100) -> List[OutboxJob]:
+        """
+        Returns the latest dead letters, newest first.
+        """
+        raise NotImplementedError()
+
+    def requeue_dead_letters(self) -> int:
+        """
+        Moves all dead letters back into the queue with a fresh
+        count of attempts. Returns the number of requeued jobs.
+        """
+        raise NotImplementedError()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the number of ``ready``, ``delayed``, ``reserved``
+        and ``dead`` jobs.
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """
+        Releases the resources of the outbox.
+        """
+
+    def _put_many(self, payloads: List[Dict[str, Any]], available_at: float) -> List[str]:
+        raise NotImplementedError()
+
+    def _reserve_many(self, now: float, limit: int) -> List[OutboxJob]:
+        raise NotImplementedError()
@@ -0,0 +1,257 @@
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import orjson
+import redis
+
+from digicubes_flask.exceptions import OutboxError
+
+from .outbox import Outbox, OutboxJob
+
+logger = logging.getLogger(__name__)
+
+# KEYS: queue, jobs, leases
+# ARGV: now, lease expiration, lease, limit
+# Returns the ids and jobs as a flat list. A lost job is
+# returned as an empty string.
+RESERVE = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[4]))
+local result = {}
+for _, id in ipairs(ids) do
+    redis.call('ZADD', KEYS[1], ARGV[2], id)
+    redis.call('HSET', KEYS[3], id, ARGV[3])
+    table.insert(result, id)
+    table.insert(result, redis.call('HGET', KEYS[2], id) or '')
+end
+return result
+"""
+
+# KEYS: queue, jobs, leases
+# ARGV: id, lease
+ACK = """
+if redis.call('HGET', KEYS[3], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[1])
+return 1
+"""
+
+# KEYS: queue, jobs, leases
+# ARGV: id, lease, job, available at
+RETRY = """
+if redis.call('HGET', KEYS[3], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[3])
+redis.call('ZADD', KEYS[1], ARGV[4], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[1])
+return 1
+"""
+
+# KEYS: queue, jobs, leases, dead
+# ARGV: id, lease, job, max dead letters
+BURY = """
+if redis.call('HGET', KEYS[3], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[1])
+redis.call('LPUSH', KEYS[4], ARGV[3])
+redis.call('LTRIM', KEYS[4], 0, tonumber(ARGV[4]) - 1)
+return 1
+"""
+
+
+class RedisOutbox(Outbox):
+    """
+    An outbox shared by all hosts using the same redis database.
+
+    The due time of every job is kept in a sorted set, the jobs
+    themselves in a hash. A reservation moves the due time of the
+    job to the end of its lease, so it is delivered again, if the
+    lease expires. The dead letters are kept in a list, that is
+    trimmed to ``max_dead_letters`` entries.
+
+    All changes are done by lua scripts, so they are atomic.
+    """
+
+    def __init__(
+        self,
+        host: str = None,
+        port: int = None,
+        db: str = None,
+        password: str = None,
+        prefix: str = "dcweb:",
+        lease_timeout: float = 300.0,
+        poll_interval: float = 1.0,
+        max_dead_letters: int = 10000,
+    ):
+        super().__init__(lease_timeout=lease_timeout, poll_interval=poll_interval)
+        kwargs = {}
+
+        if host is not None:
+            kwargs["host"] = host
+
+        if port is not None:
+            kwargs["port"] = port
+
+        if db is not None:
+            kwargs["db"] = db
+
+        if password is not None:
+            kwargs["password"] = password
+
+        self.redis = redis.Redis(**kwargs)
+        self.max_dead_letters = max_dead_letters
+
+        self.queue_key = f"{prefix}outbox:queue"
+        self.jobs_key = f"{prefix}outbox:jobs"
+        self.leases_key = f"{prefix}outbox:leases"
+        self.dead_key = f"{prefix}outbox:dead"
+        self.id_key = f"{prefix}outbox:id"
+
+        self._reserve_script = self.redis.register_script(RESERVE)
+        self._ack_script = self.redis.register_script(ACK)
+        self._retry_script = self.redis.register_script(RETRY)
+        self._bury_script = self.redis.register_script(BURY)
+
+    def close(self):
+        self.redis.close()
+
+    @property
+    def _keys(self) -> List[str]:
+        return [self.queue_key, self.jobs_key, self.leases_key]
+
+    def _put_many(self, payloads: List[Dict[str, Any]], available_at: float) -> List[str]:
+        try:
+            last_id = self.redis.incrby(self.id_key, len(payloads))
+            job_ids = [str(job_id) for job_id in range(last_id - len(payloads) + 1, last_id + 1)]
+            now = time.time()
+
+            pipeline = self.redis.pipeline(transaction=True)
+            for job_id, payload in zip(job_ids, payloads):
+                job = {"payload": payload, "attempts": 0, "created_at": now, "last_error": None}
+                pipeline.hset(self.jobs_key, job_id, orjson.dumps(job))
+            pipeline.zadd(self.queue_key, {job_id: available_at for job_id in job_ids})
+            pipeline.execute()
+        except redis.RedisError as error:
+            raise OutboxError(f"Could not add jobs to the outbox: {error}") from error
+        return job_ids
+
+    def _reserve_many(self, now: float, limit: int) -> List[OutboxJob]:
+        lease = uuid.uuid4().hex
+        try:
+            result = self._reserve_script(
+                keys=self._keys, args=[now, now + self.lease_timeout, lease, limit]
+            )
+        except redis.RedisError:
+            logger.warning("Could not reserve jobs from the outbox.", exc_info=True)
+            return []
+
+        jobs = []
+        for job_id, raw_job in zip(result[::2], result[1::2]):
+            if not raw_job:
+                # The job data is lost. There is nothing to deliver.
+                self.redis.zrem(self.queue_key, job_id)
+                self.redis.hdel(self.leases_key, job_id)
+                continue
+
+            job = orjson.loads(raw_job)
+            jobs.append(
+                OutboxJob(
+                    job_id.decode("utf-8"),
+                    job["payload"],
+                    attempts=job["attempts"],
+                    created_at=job["created_at"],
+                    last_error=job["last_error"],
+                    lease=lease,
+                )
+            )
+        return jobs
+
+    def _dump(self, job: OutboxJob, attempts: int, error: Optional[str]) -> bytes:
+        return orjson.dumps(
+            {
+                "id": job.id,
+                "payload": job.payload,
+                "attempts": attempts,
+                "created_at": job.created_at,
+                "last_error": error,
+            }
+        )
+
+    def ack(self, job: OutboxJob) -> bool:
+        return self._ack_script(keys=self._keys, args=[job.id, job.lease]) == 1
+
+    def retry(self, job: OutboxJob, delay: float, error: Optional[str] = None) -> bool:
+        return (
+            self._retry_script(
+                keys=self._keys,
+                args=[
+                    job.id,
+                    job.lease,
+                    self._dump(job, job.attempts + 1, error),
+                    time.time() + delay,
+                ],
+            )
+            == 1
+        )
+
+    def bury(self, job: OutboxJob, error: Optional[str] = None) -> bool:
+        return (
+            self._bury_script(
+                keys=self._keys + [self.dead_key],
+                args=[
+                    job.id,
+                    job.lease,
+                    self._dump(job, job.attempts + 1, error),
+                    self.max_dead_letters,
+                ],
+            )
+            == 1
+        )
+
+    def dead_letters(self, limit: int = 100) -> List[OutboxJob]:
+        jobs = []
+        for raw_job in self.redis.lrange(self.dead_key, 0, limit - 1):
+            job = orjson.loads(raw_job)
+            jobs.append(
+                OutboxJob(
+                    job["id"],
+                    job["payload"],
+                    attempts=job["attempts"],
+                    created_at=job["created_at"],
+                    last_error=job["last_error"],
+                )
+            )
+        return jobs
+
+    def requeue_dead_letters(self) -> int:
+        count = 0
+        while True:
+            raw_job = self.redis.rpop(self.dead_key)
+            if raw_job is None:
+                break
+            self._put_many([orjson.loads(raw_job)["payload"]], time.time())
+            count += 1
+
+        with self._wakeup:
+            self._wakeup.notify_all()
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        now = time.time()
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.zcount(self.queue_key, "-inf", now)
+        pipeline.zcount(self.queue_key, f"({now}", "+inf")
+        pipeline.hlen(self.leases_key)
+        pipeline.llen(self.dead_key)
+        ready, waiting, leases, dead = pipeline.execute()
+        # Expired leases are counted as ready.
+        reserved = min(leases, waiting)
+        return {"ready": ready, "delayed": waiting - reserved, "reserved": reserved, "dead": dead}
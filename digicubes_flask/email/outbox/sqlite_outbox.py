@@ -0,0 +1,206 @@
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+from digicubes_flask.exceptions import OutboxError
+
+from .outbox import Outbox, OutboxJob
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_available_at ON outbox (available_at);
+CREATE TABLE IF NOT EXISTS outbox_dead (
+    id INTEGER PRIMARY KEY,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    failed_at REAL NOT NULL
+);
+"""
+
+
+class SqliteOutbox(Outbox):
+    """
+    An outbox stored in a local sqlite database. The database
+    uses the write ahead log, so it survives crashes of the
+    process and can be shared by all processes of one host.
+
+    Every thread uses its own connection.
+    """
+
+    def __init__(self, path: str, lease_timeout: float = 300.0, poll_interval: float = 1.0):
+        super().__init__(lease_timeout=lease_timeout, poll_interval=poll_interval)
+        self.path = path
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Transactions are started explicitly.
+            connection = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _put_many(self, payloads: List[Dict[str, Any]], available_at: float) -> List[str]:
+        try:
+            connection = self._connect()
+            now = time.time()
+            job_ids = []
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                for payload in payloads:
+                    cursor = connection.execute(
+                        "INSERT INTO outbox (payload, available_at, created_at) VALUES (?, ?, ?)",
+                        (orjson.dumps(payload).decode("utf-8"), available_at, now),
+                    )
+                    job_ids.append(str(cursor.lastrowid))
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as error:
+            raise OutboxError(f"Could not add jobs to the outbox: {error}") from error
+        return job_ids
+
+    def _reserve_many(self, now: float, limit: int) -> List[OutboxJob]:
+        connection = self._connect()
+        lease = uuid.uuid4().hex
+        # Locks the database for writing, so no
+        # other consumer reserves the same jobs.
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute(
+                "SELECT id, payload, attempts, last_error, created_at FROM outbox "
+                "WHERE available_at <= ? ORDER BY available_at, id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            # The jobs of one reservation share the lease.
+            connection.executemany(
+                "UPDATE outbox SET available_at = ?, lease = ? WHERE id = ?",
+                [(now + self.lease_timeout, lease, row[0]) for row in rows],
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+        return [
+            OutboxJob(
+                str(job_id),
+                orjson.loads(payload),
+                attempts=attempts,
+                created_at=created_at,
+                last_error=last_error,
+                lease=lease,
+            )
+            for job_id, payload, attempts, last_error, created_at in rows
+        ]
+
+    def ack(self, job: OutboxJob) -> bool:
+        cursor = self._connect().execute(
+            "DELETE FROM outbox WHERE id = ? AND lease = ?", (int(job.id), job.lease)
+        )
+        return cursor.rowcount == 1
+
+    def retry(self, job: OutboxJob, delay: float, error: Optional[str] = None) -> bool:
+        cursor = self._connect().execute(
+            "UPDATE outbox SET attempts = attempts + 1, available_at = ?, lease = NULL, "
+            "last_error = ? WHERE id = ? AND lease = ?",
+            (time.time() + delay, error, int(job.id), job.lease),
+        )
+        return cursor.rowcount == 1
+
+    def bury(self, job: OutboxJob, error: Optional[str] = None) -> bool:
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = connection.execute(
+                "INSERT INTO outbox_dead "
+                "(id, payload, attempts, last_error, created_at, failed_at) "
+                "SELECT id, payload, attempts + 1, ?, created_at, ? FROM outbox "
+                "WHERE id = ? AND lease = ?",
+                (error, time.time(), int(job.id), job.lease),
+            )
+            buried = cursor.rowcount == 1
+            if buried:
+                connection.execute("DELETE FROM outbox WHERE id = ?", (int(job.id),))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return buried
+
+    def dead_letters(self, limit: int = 100) -> List[OutboxJob]:
+        rows = self._connect().execute(
+            "SELECT id, payload, attempts, last_error, created_at FROM outbox_dead "
+            "ORDER BY failed_at DESC LIMIT ?",
+            (limit,),
+        )
+        return [
+            OutboxJob(
+                str(job_id),
+                orjson.loads(payload),
+                attempts=attempts,
+                created_at=created_at,
+                last_error=last_error,
+            )
+            for job_id, payload, attempts, last_error, created_at in rows
+        ]
+
+    def requeue_dead_letters(self) -> int:
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = connection.execute(
+                "INSERT INTO outbox (payload, available_at, created_at) "
+                "SELECT payload, ?, created_at FROM outbox_dead",
+                (time.time(),),
+            )
+            count = cursor.rowcount
+            connection.execute("DELETE FROM outbox_dead")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+        with self._wakeup:
+            self._wakeup.notify_all()
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        now = time.time()
+        ready, delayed, reserved = self._connect().execute(
+            "SELECT "
+            "COALESCE(SUM(available_at <= ?), 0), "
+            "COALESCE(SUM(available_at > ? AND lease IS NULL), 0), "
+            "COALESCE(SUM(available_at > ? AND lease IS NOT NULL), 0) "
+            "FROM outbox",
+            (now, now, now),
+        ).fetchone()
+        (dead,) = self._connect().execute("SELECT COUNT(*) FROM outbox_dead").fetchone()
+        return {"ready": ready, "delayed": delayed, "reserved": reserved, "dead": dead}
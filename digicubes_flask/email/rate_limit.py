@@ -0,0 +1,44 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Limits the rate of an action for all threads of a process.
+
+    The limiter is a token bucket. It holds up to ``burst`` tokens and
+    gains ``rate`` tokens per second. Every action takes one token and
+    waits, if there is none. A rate of zero or less disables the limit.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self):
+        """
+        Takes a token. Blocks until one is available.
+        """
+        if not self.enabled:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+
+            time.sleep(wait)
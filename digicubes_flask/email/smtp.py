@@ -0,0 +1,161 @@
+"""
+A persistent connection to the smtp server.
+"""
+import logging
+import smtplib
+import time
+from email.message import EmailMessage
+from typing import Optional
+
+from .metrics import MailMetrics
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["SmtpConnection"]
+
+
+class SmtpConnection:
+    """
+    A logged in connection to the smtp server, that is reused for
+    many messages. The connection is opened with the first message.
+    It is renewed after ``max_messages`` messages and, if the server
+    closed it, the message is sent again with a new connection.
+
+    A connection is not thread safe. Every worker uses its own.
+
+    :param str host: The smtp host
+    :param int port: The port of the smtp host. The connection uses ssl.
+    :param str username: The login for the smtp server
+    :param str password: The password for the smtp server
+    :param int max_messages: Number of messages sent, before the
+        connection is renewed.
+    :param float timeout: Socket timeout in seconds
+    :param MailMetrics metrics: Records the connect and send times.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        max_messages: int = 100,
+        timeout: float = 30.0,
+        metrics: Optional[MailMetrics] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.max_messages = max(1, max_messages)
+        self.timeout = timeout
+        self.metrics = metrics
+
+        self._server: Optional[smtplib.SMTP_SSL] = None
+        self._sent = 0
+        self._last_used = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self._server is not None
+
+    def idle_time(self) -> float:
+        """
+        Seconds since the connection has been used the last time.
+        """
+        return time.monotonic() - self._last_used if self.is_open else 0.0
+
+    def open(self):
+        """
+        Opens a new connection and logs in. An open connection
+        is closed first.
+        """
+        self.close()
+        started_at = time.monotonic()
+        try:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.username is not None:
+                    server.login(self.username, self.password)
+            except Exception:
+                server.close()
+                raise
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.count("connect_errors")
+            raise
+
+        if self.metrics is not None:
+            self.metrics.count("connects")
+            self.metrics.observe("connect_time", time.monotonic() - started_at)
+
+        logger.debug("Opened smtp connection to %s:%d", self.host, self.port)
+        self._server = server
+        self._sent = 0
+        self._last_used = time.monotonic()
+
+    def close(self):
+        """
+        Closes the connection. Errors are ignored, as the server
+        may have closed the connection already.
+        """
+        if self._server is None:
+            return
+
+        server, self._server = self._server, None
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+        logger.debug(
+            "Closed smtp connection to %s:%d after %d messages", self.host, self.port, self._sent
+        )
+
+    def send_message(self, msg: EmailMessage):
+        """
+        Sends a message. If the connection has been closed by the
+        server, the message is sent again with a new connection.
+        If the server rejects the message, the error is raised and
+        the connection is kept. Every other error is raised and the
+        connection is closed.
+        """
+        if self._server is not None and self._sent >= self.max_messages:
+            self.close()
+
+        while True:
+            fresh = self._server is None
+            if fresh:
+                self.open()
+
+            started_at = time.monotonic()
+            try:
+                self._server.send_message(msg)
+                if self.metrics is not None:
+                    self.metrics.observe("send_time", time.monotonic() - started_at)
+                break
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self.close()
+                if fresh:
+                    raise
+                # The connection was idle and the server closed
+                # it. Try again once with a new connection.
+            except (
+                smtplib.SMTPRecipientsRefused,
+                smtplib.SMTPSenderRefused,
+                smtplib.SMTPDataError,
+            ):
+                # The message was rejected, but the connection is fine.
+                self._last_used = time.monotonic()
+                raise
+            except Exception:
+                self.close()
+                raise
+
+        self._sent += 1
+        self._last_used = time.monotonic()
+
+    def __enter__(self) -> "SmtpConnection":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,102 @@
+"""
+A standalone process, that sends the mails of the outbox.
+
+The web processes only add the mails to the outbox, if
+``DC_MAILCUBE_ENQUEUE_ONLY`` is set to ``True``. Start one or more
+workers, that share the outbox of the web processes::
+
+    python -m digicubes_flask.email.worker --workers 4 --rate 10
+
+The outbox has to be shared, so use redis or the same sqlite file.
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m digicubes_flask.email.worker",
+        description="Sends the mails of the DigiCubes outbox.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of threads sending mails. Defaults to DC_MAILCUBE_WORKERS.",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="Maximum number of mails sent per second. Zero disables the limit. "
+        "Defaults to DC_MAILCUBE_RATE_LIMIT.",
+    )
+    parser.add_argument(
+        "--stop-timeout",
+        type=float,
+        default=30.0,
+        help="Seconds to wait for the workers to finish their current mail on shutdown.",
+    )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        default=60.0,
+        help="Seconds between two logs of the mail statistics. Zero disables the logs.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+
+    # The worker uses the configuration of the web application, but
+    # it must not start the workers of the application itself.
+    os.environ["DC_MAILCUBE_ENQUEUE_ONLY"] = "True"
+
+    # pylint: disable=import-outside-toplevel
+    from digicubes_flask.web import create_app, mail_cube
+
+    create_app()
+    if not mail_cube.is_enabled:
+        logger.error("The email module is not activated. Set DC_SMTP_HOST and DC_SMTP_ENABLED.")
+        return 1
+
+    stopped = threading.Event()
+
+    def stop(signum, frame):  # pylint: disable=unused-argument
+        logger.info("Received signal %d. Stopping the mail workers.", signum)
+        stopped.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    mail_cube.start_workers(args.workers, args.rate)
+    logger.info(
+        "Started %d mail workers. Rate limit is %s mails per second.",
+        len(mail_cube.workers),
+        mail_cube.rate_limiter.rate or "no",
+    )
+
+    next_stats = time.monotonic() + args.stats_interval
+    while not stopped.wait(1.0):
+        if 0 < args.stats_interval and next_stats <= time.monotonic():
+            logger.info("Mail statistics: %s", json.dumps(mail_cube.statistics()))
+            next_stats = time.monotonic() + args.stats_interval
+
+    mail_cube.stop_workers(args.stop_timeout)
+    if mail_cube.workers:
+        logger.warning("%d mail workers did not stop in time.", len(mail_cube.workers))
+    mail_cube.outbox.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -52,3 +52,7 @@ class NotAuthenticated(DigiCubeError):
 
 class ConfigurationError(DigiCubeError):
     """Configuration wrong or missing"""
+
+
+class OutboxError(DigiCubeError):
+    """The mail outbox is not available"""
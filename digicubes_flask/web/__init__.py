@@ -149,9 +149,11 @@ def create_app(cfg_file_name=None):
         g.digitoken_received = False
 
         if token is not None:
-            # So we have a token. Now lets refresh it
+            # So we have a token. Now lets verify it. Recently verified
+            # tokens are served from the cache and only refreshed,
+            # when they are about to expire.
             try:
-                data = accm.refresh_token(token)
+                data = accm.verify_token(token)
 
                 # current_user.token = token
                 current_user.set_data(data)
@@ -5,13 +5,14 @@ import logging
 import os
 from datetime import datetime
 
-from flask import Flask, abort, current_app, redirect, url_for
+from flask import Flask, abort, current_app, redirect, request, url_for
 from flask_wtf.csrf import CSRFError
 from markdown import markdown
 
 from digicubes_flask import account_manager, current_user, get_version_string
-from digicubes_flask.client import (DigiCubeClient, RightService, RoleService,
-                                    SchoolService, UserService)
+from digicubes_flask.client import (DigiCubeClient, FetchGroup, RightService,
+                                    RoleService, SchoolService, UserService)
+from digicubes_flask.client.importer import UserImporter
 from digicubes_flask.client.model import BearerTokenData
 
 from .momentjs import to_local_datetime
@@ -57,20 +58,14 @@ class DigicubesAccountManager:
             # are written to the session. Or removed if requested.
             # app.after_request(update_current_user)
 
+            # Both helpers are called many times per page. They are
+            # backed by the rights and roles of the current user, which
+            # are loaded at most once per request.
             def has_role(role_name: str) -> bool:
-                # TODO: Using cached roles
-                for role in self.user.get_my_roles(self.token):
-                    if role.name == role_name:
-                        return True
-
-                return False
+                return current_user.has_role(role_name)
 
             def has_right(right: str) -> bool:
-                # Vielleicht nicht über den user_service machen, sondern
-                # über den account manager. Dann hätte man die Möglichkeit,
-                # die Rechte zumindest im g Scope zu sichern.
-                rights = self.user.get_my_rights(self.token)
-                return "no_limits" in rights or right in rights
+                return current_user.has_right(right)
 
             def is_root(user_id: int) -> bool:
                 return has_right("no_limits")
@@ -216,8 +211,18 @@ class DigicubesAccountManager:
         """
         Logs the current user out
         """
+        # Neither the current token nor the one the browser sent
+        # may be accepted from the token cache anymore.
+        for token in {current_user.token, request.cookies.get("digicubes", None)}:
+            if token is not None:
+                self._client.forget_token(token)
         current_user.reset()
 
+    @property
+    def cache(self):
+        """The cache of the client"""
+        return self._client.cache
+
     @property
     def user(self) -> UserService:
         """user servives"""
@@ -236,5 +241,23 @@ class DigicubesAccountManager:
     def school(self) -> SchoolService:
         return self._client.school_service
 
+    def parallel(self) -> FetchGroup:
+        """
+        Returns a new group to run independent service calls
+        concurrently during the current request.
+        """
+        return self._client.parallel()
+
+    def importer(self, token, **kwargs) -> UserImporter:
+        """
+        Returns a new importer, that imports users with the
+        pool of the client. See :class:`UserImporter` for the
+        supported arguments.
+        """
+        return UserImporter(self._client, token, **kwargs)
+
     def refresh_token(self, token) -> BearerTokenData:
         return self._client.refresh_token(token)
+
+    def verify_token(self, token) -> BearerTokenData:
+        return self._client.verify_token(token)
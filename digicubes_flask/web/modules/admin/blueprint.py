@@ -5,16 +5,20 @@ All routes should be only accessible by users, who have the
 role 'admin'
 """
 import logging
+import os
 
-from flask import Blueprint, redirect, render_template, request, url_for
+from flask import (Blueprint, abort, jsonify, redirect, render_template,
+                   request, url_for)
 from flask.helpers import flash
 
-from digicubes_flask import digicubes, login_required
+from digicubes_flask import digicubes, login_required, requested_html
 from digicubes_flask.client.model import RoleModel, SchoolModel, UserModel
+from digicubes_flask.email import mail_cube
 from digicubes_flask.web.account_manager import DigicubesAccountManager
 
-from .forms import SimpleTextForm
+from .forms import SimpleTextForm, UserImportForm
 from .rfc import AdminRFC, RfcRequest
+from .user_import import get_import_progress, start_import
 
 admin_blueprint = Blueprint("admin", __name__, template_folder="templates")
 
@@ -51,6 +55,63 @@ def remove_user_role(user_id: int, role_id: int):
     return redirect(url_for("user.update", user_id=user_id))
 
 
+@admin_blueprint.route("/users/import/", methods=("GET", "POST"))
+@login_required
+def import_users():
+    """
+    Import users from a csv or json file
+    """
+    form = UserImportForm()
+
+    if form.validate_on_submit():
+        upload = form.file.data
+        file_format = os.path.splitext(upload.filename)[1].lstrip(".").lower()
+        job_id = start_import(
+            upload.stream,
+            file_format,
+            server.token,
+            roles=[role.strip() for role in (form.roles.data or "").split(",")],
+            school_id=form.school_id.data,
+            school_space="teacher" if form.as_teacher.data else "student",
+        )
+        return redirect(url_for("admin.import_progress", job_id=job_id))
+
+    return render_template(
+        "admin/import_users.jinja", form=form, action=url_for("admin.import_users")
+    )
+
+
+@admin_blueprint.route("/users/import/<job_id>/")
+@login_required
+def import_progress(job_id: str):
+    """
+    The progress of an import
+    """
+    progress = get_import_progress(job_id)
+    if progress is None:
+        abort(404)
+
+    if requested_html():
+        return render_template(
+            "admin/import_progress.jinja",
+            job_id=job_id,
+            progress=progress,
+            progress_url=url_for("admin.import_progress", job_id=job_id),
+        )
+
+    return jsonify(progress)
+
+
+@admin_blueprint.route("/mail/stats/")
+@login_required
+def mail_stats():
+    """
+    The metrics of the mail workers of this process
+    and the state of the outbox.
+    """
+    return jsonify(mail_cube.statistics())
+
+
 @admin_blueprint.route("/rfc/", methods=("GET", "POST", "PUT"))
 @login_required
 def rfc():
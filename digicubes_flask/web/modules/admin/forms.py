@@ -4,13 +4,15 @@ Some forms to be used with the wtforms package.
 import logging
 
 from flask_wtf import FlaskForm
-from wtforms import (PasswordField, StringField, SubmitField, TextAreaField,
-                     validators)
+from flask_wtf.file import FileAllowed, FileField, FileRequired
+from wtforms import (BooleanField, IntegerField, PasswordField, StringField,
+                     SubmitField, TextAreaField, validators)
 from wtforms.validators import ValidationError
 
 import digicubes_flask.web.wtforms_widgets as w
 from digicubes_flask import digicubes
 from digicubes_flask import exceptions as ex
+from digicubes_flask.client.importer import FILE_FORMATS
 from digicubes_flask.client.model import SchoolModel
 
 logger = logging.getLogger(__name__)
@@ -19,6 +21,7 @@ __ALL__ = [
     "SchoolForm",
     "CourseForm",
     "CourseForm",
+    "UserImportForm",
 ]
 
 
@@ -78,7 +81,10 @@ class SchoolNameAvailable:
             if not field.data:
                 raise ValidationError("Name may not be empty")
 
-            school: SchoolModel = digicubes.school.get_by_name(digicubes.token, field.data)
+            # Only the id is needed to compare the schools.
+            school: SchoolModel = digicubes.school.get_by_name(
+                digicubes.token, field.data, fields=["id"]
+            )
 
             if self.school_id is not None and school.id == self.school_id:
                 # Of course the school may keep its name
@@ -116,3 +122,24 @@ class SimpleTextForm(FlaskForm):
         validators=[validators.InputRequired("A login is required.")],
     )
     submit = SubmitField("Ok", widget=w.materialize_submit)
+
+
+class UserImportForm(FlaskForm):
+    """
+    Form to import users from a csv or json file.
+    """
+
+    file = FileField(
+        "File",
+        widget=w.materialize_file,
+        validators=[
+            FileRequired("A file is required."),
+            FileAllowed(FILE_FORMATS, "Only csv, json and jsonl files are supported."),
+        ],
+    )
+    roles = StringField("Roles (comma separated)", widget=w.materialize_input)
+    school_id = IntegerField(
+        "School id", widget=w.materialize_input, validators=[validators.Optional()]
+    )
+    as_teacher = BooleanField("Add to school as", widget=w.materialize_switch)
+    submit = SubmitField("Import", widget=w.materialize_submit)
@@ -1,17 +1,36 @@
-from typing import Dict, Text, Union
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Text, Union
 
 import attr
+from flask import copy_current_request_context, g
 
 from digicubes_flask import CurrentUser, current_user, digicubes
-from digicubes_flask.client.model import RoleModel, SchoolModel, UserModel
+from digicubes_flask.client.model import (CourseModel, RoleModel, SchoolModel,
+                                          UserModel)
+from digicubes_flask.exceptions import DigiCubeError, DoesNotExist
 from digicubes_flask.web.account_manager import DigicubesAccountManager
 
+logger = logging.getLogger(__name__)
+
 server: DigicubesAccountManager = digicubes
 user: CurrentUser = current_user
 
 ValueType = Union[str, float, int, bool]
 DataType = Dict[Text, ValueType]
 
+# The maximum number of calls in a single batch
+MAX_BATCH_SIZE = 500
+
+# Calls with the same value for one of these keys change the same
+# entity. They are executed one after the other in the order of the
+# batch. All other calls run concurrently.
+DEPENDENCY_KEYS = ("user_id", "school_id")
+
+# The rfc functions setting a flag of a user and the user fields they read
+USER_FLAG_FUNCTIONS = ("user_set_active_state", "user_set_verified_state")
+USER_FLAG_FIELDS = ["id", "is_active", "is_verified", "modified_at"]
+
 
 @attr.s(auto_attribs=True)
 class RfcRequest:
@@ -32,31 +51,17 @@ class RfcError(Exception):
     pass
 
 
+def _isoformat(value: Optional[datetime]) -> Optional[Text]:
+    return value.isoformat() if value is not None else None
+
+
 class AdminRFC:
 
     STATUS_OK = 200
 
     @staticmethod
     def rfc_user_set_active_state(data: DataType) -> RfcResponse:
-        user_id = data.get("user_id", None)
-        mode = data.get("mode", "toggle")
-
-        user = server.user.get(server.token, user_id, fields=["is_active"])
-        new_state = user.is_active
-
-        if mode == "toggle":
-            new_state = not new_state
-        elif mode == "on":
-            new_state = True
-        elif mode == "off":
-            new_state = False
-        else:
-            raise ValueError("Unknown mode")
-
-        if new_state != user.is_active:
-            server.user.update(server.token, UserModel(id=user_id, is_active=new_state))
-
-        return RfcResponse(data={"user_id": user_id, "state": new_state})
+        return AdminRFC._set_user_flag(data, "is_active")
 
     @staticmethod
     def rfc_user_toggle_role(data: DataType) -> RfcResponse:
@@ -85,39 +90,198 @@ class AdminRFC:
     def rfc_school_get_course_info(data: DataType) -> RfcResponse:
         school_id = data.get("school_id", None)
         assert school_id is not None, "No school id provided"
-        courses = server.school.get_courses(server.token, SchoolModel(id=school_id))
-        # TODO: An dieser stelle brauche ich nicht alle Felder der
-        # Kurse. Aber die Methode get_courses unterstützt das
+        courses = server.school.get_courses(
+            server.token, SchoolModel(id=school_id), fields=["id", "is_private"]
+        )
+        return RfcResponse(data=AdminRFC._course_info(courses))
 
-        private_courses = list([c.id for c in courses if c.is_private])
+    @staticmethod
+    def rfc_schools_get_course_info(data: DataType) -> RfcResponse:
+        """
+        Same as ``SCHOOL_GET_COURSE_INFO``, but for all ``school_ids``
+        at once. The courses of the schools are requested concurrently.
+        Schools, that do not exist, are left out.
+        """
+        school_ids = data.get("school_ids", None)
+        assert isinstance(school_ids, list), "No school ids provided"
+        course_lists = server.school.get_courses_many(
+            server.token, school_ids, fields=["id", "is_private"]
+        )
         return RfcResponse(
-            data={"count_courses": len(courses), "count_private_courses": len(private_courses)}
+            data={
+                "schools": [
+                    dict(AdminRFC._course_info(courses), school_id=school_id)
+                    for school_id, courses in zip(school_ids, course_lists)
+                    if courses is not None
+                ]
+            }
         )
 
+    @staticmethod
+    def _course_info(courses: List[CourseModel]) -> DataType:
+        private_courses = list([c.id for c in courses if c.is_private])
+        return {"count_courses": len(courses), "count_private_courses": len(private_courses)}
+
     @staticmethod
     def rfc_user_set_verified_state(data: DataType) -> RfcResponse:
+        return AdminRFC._set_user_flag(data, "is_verified")
+
+    @staticmethod
+    def _set_user_flag(data: DataType, attribute: Text) -> RfcResponse:
+        """
+        Sets a boolean attribute of a user. The ``mode`` is ``on``,
+        ``off`` or ``toggle``. Only ``toggle`` has to read the user
+        first, so clients knowing the current state should send the
+        new state explicitly.
+
+        The server does not support conditional updates. So if two
+        admins change the same user at the same time, the last
+        update wins.
+        """
         user_id = data.get("user_id", None)
         assert user_id is not None, "No user id provided"
 
         mode = data.get("mode", "toggle")
+        if mode not in ("on", "off", "toggle"):
+            raise ValueError("Unknown mode")
 
-        user = server.user.get(server.token, user_id, fields=["is_verified"])
-        new_state = user.is_verified
+        user = None
+        if mode == "toggle":
+            # Users of a batch may have been read in advance.
+            user = g.get("rfc_users", {}).get(user_id, None)
+            if user is None:
+                user = server.user.get(server.token, user_id, fields=[attribute, "modified_at"])
 
         if mode == "toggle":
-            new_state = not new_state
-        elif mode == "on":
-            new_state = True
-        elif mode == "off":
-            new_state = False
+            new_state = not getattr(user, attribute)
         else:
-            raise ValueError("Unknown mode")
+            new_state = mode == "on"
+
+        if user is not None and getattr(user, attribute) == new_state:
+            modified_at = user.modified_at
+        else:
+            updated = server.user.update(
+                server.token, UserModel(id=user_id, **{attribute: new_state})
+            )
+            modified_at = updated.modified_at
+
+        return RfcResponse(
+            data={"user_id": user_id, "state": new_state, "modified_at": _isoformat(modified_at)}
+        )
 
-        if new_state != user.is_verified:
-            u = UserModel(id=user_id, is_verified=new_state)
-            u = server.user.update(server.token, u)
+    @staticmethod
+    def rfc_batch(data: DataType) -> RfcResponse:
+        """
+        Executes a list of calls with a single request. The payload is
+
+        .. code-block:: json
+
+            {"calls": [{"name": "USER_SET_ACTIVE_STATE", "data": {"user_id": 1}}, ...]}
+
+        The response contains the result of every call in the order
+        of the calls. A failing call does not stop the other calls.
+        """
+        calls = data.get("calls", None) if isinstance(data, dict) else None
+        if not isinstance(calls, list):
+            return RfcResponse(status=400, text="Bad request. No list of calls provided.")
+
+        if len(calls) > MAX_BATCH_SIZE:
+            return RfcResponse(
+                status=400, text=f"Bad request. At most {MAX_BATCH_SIZE} calls are allowed."
+            )
 
-        return RfcResponse(data={"user_id": user_id, "state": new_state})
+        rfc_requests = [
+            RfcRequest(call.get("name", None), call.get("data", None) or {})
+            if isinstance(call, dict)
+            else RfcRequest(None)
+            for call in calls
+        ]
+
+        # Dependent calls are chained, so they run in order.
+        chains: Dict[Any, List[int]] = {}
+        for index, rfc_request in enumerate(rfc_requests):
+            chains.setdefault(AdminRFC._dependency(rfc_request, index), []).append(index)
+
+        users = AdminRFC._prefetch_users(rfc_requests, chains)
+
+        results: List[Optional[RfcResponse]] = [None] * len(rfc_requests)
+        # The current user lives in the app context, that is not
+        # shared with the copied request contexts of the workers.
+        digiuser = current_user._get_current_object()  # pylint: disable=protected-access
+
+        def run_chain(indices: List[int]):
+            g.digiuser = digiuser
+            g.rfc_users = users
+            for index in indices:
+                results[index] = AdminRFC.call_safely(rfc_requests[index])
+
+        with server.parallel() as group:
+            for indices in chains.values():
+                group.submit(copy_current_request_context(run_chain), indices)
+
+        return RfcResponse(data={"results": [attr.asdict(result) for result in results]})
+
+    @staticmethod
+    def _prefetch_users(
+        rfc_requests: List[RfcRequest], chains: Dict[Any, List[int]]
+    ) -> Dict[int, UserModel]:
+        """
+        Reads the users, whose flags are set by the batch, with a single
+        multi-get instead of one request per call. Only users changed by
+        a single call are read in advance. Later calls of a chain have
+        to see the changes of the earlier ones.
+        """
+        user_ids = []
+        for indices in chains.values():
+            if len(indices) != 1:
+                continue
+            request = rfc_requests[indices[0]]
+            data = request.data if isinstance(request.data, dict) else {}
+            user_id = data.get("user_id", None)
+            if (
+                isinstance(request.function_name, str)
+                and request.function_name.lower() in USER_FLAG_FUNCTIONS
+                and isinstance(user_id, int)
+                and data.get("mode", "toggle") == "toggle"
+            ):
+                user_ids.append(user_id)
+
+        if not user_ids:
+            return {}
+
+        users = server.user.get_many(server.token, user_ids, fields=USER_FLAG_FIELDS)
+        return {user_id: user for user_id, user in zip(user_ids, users) if user is not None}
+
+    @staticmethod
+    def _dependency(request: RfcRequest, index: int) -> Any:
+        data = request.data if isinstance(request.data, dict) else {}
+        for key in DEPENDENCY_KEYS:
+            if data.get(key, None) is not None:
+                return (key, str(data[key]))
+        return index
+
+    @staticmethod
+    def call_safely(request: RfcRequest) -> RfcResponse:
+        """
+        Calls a function like :meth:`call`, but returns errors
+        as a response instead of raising them.
+        """
+        if request.function_name is not None and request.function_name.lower() == "batch":
+            return RfcResponse(status=400, text="Bad request. Batches cannot be nested.")
+
+        try:
+            return AdminRFC.call(request)
+        except (AssertionError, ValueError, TypeError) as error:
+            return RfcResponse(status=400, text=f"Bad request. {error}")
+        except DoesNotExist as error:
+            return RfcResponse(status=404, text=str(error) or "Not found")
+        except DigiCubeError as error:
+            logger.exception("RFC %s failed.", request.function_name)
+            return RfcResponse(status=500, text=str(error) or type(error).__name__)
+        except Exception:  # pylint: disable=broad-except
+            # Any other error must only fail this call, not the whole batch.
+            logger.exception("RFC %s failed unexpectedly.", request.function_name)
+            return RfcResponse(status=500, text="Internal error")
 
     @staticmethod
     def no_such_function(request: RfcRequest) -> RfcResponse:
@@ -0,0 +1,108 @@
+"""
+Runs user imports in the background.
+
+An import runs in its own thread, so the request returns at once.
+The progress is kept in the process running the import. It is also
+published to the cache, but other worker processes can only report
+it, if the cache is shared, i.e. ``redis`` or ``tiered``. Without a
+shared cache the progress is only known to the process, that has
+started the import.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from digicubes_flask import digicubes
+from digicubes_flask.client.importer import ImportProgress, read_rows
+
+logger = logging.getLogger(__name__)
+
+# Seconds, the progress of an import is kept in the cache
+PROGRESS_MAX_AGE = 3600
+
+# Minimum number of seconds between two updates of the cache
+PUBLISH_INTERVAL = 0.5
+
+# The imports of this process. Finished imports are kept
+# for PROGRESS_MAX_AGE seconds, like in the cache.
+_jobs: Dict[str, ImportProgress] = {}
+_jobs_lock = threading.Lock()
+
+
+def _forget_finished_jobs():
+    expired = time.time() - PROGRESS_MAX_AGE
+    with _jobs_lock:
+        for job_id, progress in list(_jobs.items()):
+            if progress.finished_at is not None and progress.finished_at < expired:
+                del _jobs[job_id]
+
+
+def _publish(manager, job_id: str, progress: ImportProgress):
+    try:
+        manager.cache.set_import_progress(job_id, progress.as_dict(), PROGRESS_MAX_AGE)
+    except Exception:  # pylint: disable=broad-except
+        logger.warning("Could not publish the progress of import %s.", job_id, exc_info=True)
+
+
+def start_import(upload, file_format: str, token: str, **options) -> str:
+    """
+    Starts a new import of the uploaded file and returns the id of
+    the job. The options are passed to the
+    :class:`~digicubes_flask.client.importer.UserImporter`.
+    """
+    job_id = uuid.uuid4().hex
+    progress = ImportProgress()
+    # The import thread runs outside of the app context.
+    manager = digicubes._get_current_object()  # pylint: disable=protected-access
+
+    # The upload is only available during the request.
+    with tempfile.NamedTemporaryFile(suffix=f".{file_format}", delete=False) as target:
+        shutil.copyfileobj(upload, target)
+        path = target.name
+
+    last_published = [0.0]
+
+    def on_progress(current: ImportProgress):
+        now = time.monotonic()
+        if current.done or now - last_published[0] >= PUBLISH_INTERVAL:
+            last_published[0] = now
+            _publish(manager, job_id, current)
+
+    def run():
+        try:
+            importer = manager.importer(token, on_progress=on_progress, **options)
+            with open(path, newline="", encoding="utf-8") as stream:
+                importer.run(read_rows(stream, file_format), progress)
+        except Exception as error:  # pylint: disable=broad-except
+            logger.exception("Could not run import %s.", job_id)
+            progress.finish(str(error))
+            _publish(manager, job_id, progress)
+        finally:
+            os.unlink(path)
+
+    _forget_finished_jobs()
+    with _jobs_lock:
+        _jobs[job_id] = progress
+
+    _publish(manager, job_id, progress)
+    threading.Thread(target=run, name=f"user-import-{job_id}", daemon=True).start()
+    return job_id
+
+
+def get_import_progress(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the progress of an import or None, if the
+    import is unknown.
+    """
+    with _jobs_lock:
+        progress = _jobs.get(job_id, None)
+
+    if progress is not None:
+        return progress.as_dict()
+
+    return digicubes.cache.get_import_progress(job_id)
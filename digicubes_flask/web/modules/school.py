@@ -49,7 +49,10 @@ class SchoolNameAvailable:
             if not field.data:
                 raise ValidationError("Name may not be empty")
 
-            db_school: SchoolModel = digicubes.school.get_by_name(digicubes.token, field.data)
+            # Only the id is needed to compare the schools.
+            db_school: SchoolModel = digicubes.school.get_by_name(
+                digicubes.token, field.data, fields=["id"]
+            )
 
             if self.school_id is not None and db_school.id == self.school_id:
                 # Of course the school may keep its name
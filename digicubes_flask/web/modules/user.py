@@ -1,11 +1,12 @@
 """
 The User Blueprint
 """
+import itertools
 import logging
 from typing import List
 
-from flask import (Blueprint, abort, flash, redirect, render_template, request,
-                   url_for)
+from flask import (Blueprint, Response, abort, current_app, flash, redirect,
+                   render_template, request, stream_with_context, url_for)
 from flask_wtf import FlaskForm
 from wtforms import (BooleanField, Field, FormField, StringField, SubmitField,
                      ValidationError, validators)
@@ -26,6 +27,10 @@ logger = logging.getLogger(__name__)
 server: DigicubesAccountManager = digicubes
 user: CurrentUser = current_user
 
+# The number of rows loaded at once by the admin user table.
+USER_PAGE_SIZE = 50
+MAX_USER_PAGE_SIZE = 500
+
 # =========================================================================
 # THE FORMS
 # =========================================================================
@@ -124,13 +129,17 @@ class UserLoginAvailable:
             raise ValidationError("Login may not be empty.")
 
         try:
-            user_model = digicubes.user.get_by_login(digicubes.token, field.data)
-            if self.user_id is not None and self.user_id == user_model.id:
-                return
-
+            exists = digicubes.user.exists(
+                digicubes.token, exclude_id=self.user_id, login=field.data
+            )
+        except ValueError:
+            # The login contains characters, that cannot be part of a
+            # filter query. So we have to look it up directly.
+            user = digicubes.user.get_by_login_or_none(digicubes.token, field.data)
+            exists = user is not None and user.id != self.user_id
+
+        if exists:
             raise ValidationError("User already exists. Try a different login.")
-        except ex.DoesNotExist:
-            pass
 
 
 # =========================================================================
@@ -142,13 +151,46 @@ class UserLoginAvailable:
 @login_required
 def get_all():
     """The user list route."""
-    user_list = digicubes.user.all(digicubes.token)
     if requested_html():
-        return render_template("admin/users.jinja", users=user_list, token=digicubes.token)
+        # Only the first page is rendered. The other
+        # pages are requested by the table on demand.
+        user_list = digicubes.user.all(digicubes.token, count=USER_PAGE_SIZE)
+        return render_template(
+            "admin/users.jinja",
+            users=user_list,
+            page_size=USER_PAGE_SIZE,
+            has_more=len(user_list) > 0,
+        )
 
+    user_list = digicubes.user.all(digicubes.token)
     return UserModel.list_model(user_list).json()
 
 
+@blueprint.route("/page/")
+@login_required
+def get_page():
+    """
+    A page of the user table. Returns the rendered rows
+    together with the position of the page as json.
+    """
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    count = request.args.get("count", USER_PAGE_SIZE, type=int)
+    count = min(max(count, 1), MAX_USER_PAGE_SIZE)
+    try:
+        user_list = digicubes.user.all(digicubes.token, offset=offset, count=count)
+    except ex.DigiCubeError:
+        abort(500)
+
+    return {
+        "offset": offset,
+        "count": len(user_list),
+        # The server may return less users than requested, so
+        # only an empty page marks the end of the table.
+        "has_more": len(user_list) > 0,
+        "html": render_template("admin/fragments/user_rows.jinja", users=user_list),
+    }
+
+
 @blueprint.route("/create/", methods=("GET", "POST"))
 @login_required
 def create():
@@ -263,22 +305,28 @@ def delete(user_id: int):
 def get(user_id: int):
     """Display detaild information for an existing user"""
     token = server.token
-    # Getting the user details from the server
-    user: UserModel = server.user.get(token, user_id)
-
-    # Getting the user roles from the server
-    user_roles_names = [role.name for role in server.user.get_roles(token, user)]
-    all_roles = server.role.all(token)
-
-    role_list = [(role, role.name in user_roles_names) for role in all_roles]
+    # The calls are independent of each other, so they are
+    # executed concurrently. For the role and school requests
+    # only the id of the user is needed.
+    user_ref = UserModel(id=user_id)
+    with server.parallel() as fetch:
+        user = fetch(server.user.get, token, user_id)
+        user_roles = fetch(server.user.get_roles, token, user_ref)
+        all_roles = fetch(server.role.all, token)
+        headmaster_schools = fetch(server.school.get_headmaster_schools, token, user_ref)
+        teacher_schools = fetch(server.school.get_teacher_schools, token, user_ref)
+        student_schools = fetch(server.school.get_student_schools, token, user_ref)
+
+    user_roles_names = [role.name for role in user_roles.result()]
+    role_list = [(role, role.name in user_roles_names) for role in all_roles.result()]
 
     return render_template(
         "user/user.jinja",
-        user=user,
+        user=user.result(),
         roles=role_list,
-        headmaster_schools=server.school.get_headmaster_schools(token, user),
-        teacher_schools=server.school.get_teacher_schools(token, user),
-        student_schools=server.school.get_student_schools(token, user),
+        headmaster_schools=headmaster_schools.result(),
+        teacher_schools=teacher_schools.result(),
+        student_schools=student_schools.result(),
     )
 
 
@@ -286,11 +334,27 @@ def get(user_id: int):
 @login_required
 def panel_user_table():
     """The user list route."""
-    offset = request.args.get("offset", None)
-    count = request.args.get("count", None)
+    offset = request.args.get("offset", 0, type=int)
+    count = request.args.get("count", None, type=int)
     token = digicubes.token
     try:
-        user_list = digicubes.user.all(token, offset=offset, count=count)
-        return render_template("admin/panel/user_table.jinja", users=user_list)
+        users = digicubes.user.iter_all(token, offset=offset, limit=count)
+        # Request the first page now, so errors are reported,
+        # before the response is started.
+        first_user = next(users, None)
     except ex.DigiCubeError:
         abort(500)
+
+    if first_user is not None:
+        users = itertools.chain([first_user], users)
+    return _stream_template("account/panel/user_table.jinja", users=users)
+
+
+def _stream_template(template_name: str, **context) -> Response:
+    """
+    Renders the template while the response is sent. So large
+    lists can be rendered without holding them in memory.
+    """
+    current_app.update_template_context(context)
+    template = current_app.jinja_env.get_template(template_name)
+    return Response(stream_with_context(template.generate(context)))
@@ -3,54 +3,334 @@ var inactive_html = '<i class="small material-icons blue-grey-text text-lighten-
 var verified_html = '<i class="small material-icons light-blue-text">verified_user</i>';
 var unverified_html = '<i class="small material-icons blue-grey-text text-lighten-5">verified_user</i>';
 
-function toggle_active_state() {
-    $container = $( this )
-    user_id = $container.attr("dc-user-id");
-    DigiCubes.toggleUserActiveState(user_id)
-    .then( (data) => {
-        if (data.state === true) {
-            $( this ).html(active_html);
+// Pages further away from the visible area than this many
+// screen heights are removed from the document.
+var USER_TABLE_KEPT_SCREENS = 3;
+
+// The next page is requested, when the end of the table
+// is less than this many screen heights below the view.
+var USER_TABLE_PRELOAD_SCREENS = 1;
+
+/**
+ * Sends the new state explicitly, so the server does not have to
+ * read the user first. Setting a state is idempotent, so concurrent
+ * clicks of several admins end in the state, that was chosen last.
+ */
+function toggle_state(cell, funcName, states, on_html, off_html) {
+    var $cell = $(cell);
+    var state = $cell.attr("dc-state") !== states[0];
+
+    DigiCubes.setUserState($cell.attr("dc-user-id"), funcName, state)
+    .then((response) => {
+        if (response.status != 200) {
+            throw new Error(response.text);
+        }
+        if (response.data.state === true) {
+            $cell.attr("dc-state", states[0]);
+            $cell.html(on_html);
         } else {
-            $( this ).html(inactive_html);
-        }        
+            $cell.attr("dc-state", states[1]);
+            $cell.html(off_html);
+        }
+    })
+    .catch((error) => {
+        console.log(error);
     });
 };
 
+function toggle_active_state() {
+    toggle_state(this, "USER_SET_ACTIVE_STATE", ["active", "inactive"], active_html, inactive_html);
+};
+
 function toggle_verified_state() {
-    $container = $( this )
-    user_id = $container.attr("dc-user-id");
-    DigiCubes.toggleUserVerifiedState(user_id)
-    .then( (data) => {
-        if (data.state === true) {
-            $( this ).html(verified_html);
-        } else {
-            $( this ).html(unverified_html);
-        }
-    });
+    toggle_state(
+        this, "USER_SET_VERIFIED_STATE", ["verified", "unverified"], verified_html, unverified_html);
 };
 
-function init() {
-    $("td[dc-state=active").each(function( index ) {
+function init_state_icons(container) {
+    $(container).find("td[dc-state=active]").each(function( index ) {
         $( this ).html(active_html);
         $( this ).addClass("dc-clickable");
         $( this ).click(toggle_active_state);
     });
 
-    $("td[dc-state=inactive").each(function( index ) {
+    $(container).find("td[dc-state=inactive]").each(function( index ) {
         $( this ).html(inactive_html);
         $( this ).addClass("dc-clickable");
         $( this ).click(toggle_active_state);
     });
 
-    $("td[dc-state=verified").each(function( index ) {
+    $(container).find("td[dc-state=verified]").each(function( index ) {
         $( this ).html(verified_html);
         $( this ).addClass("dc-clickable");
         $( this ).click(toggle_verified_state);
     });
 
-    $("td[dc-state=unverified").each(function( index ) {
+    $(container).find("td[dc-state=unverified]").each(function( index ) {
         $( this ).html(unverified_html);
         $( this ).addClass("dc-clickable");
         $( this ).click(toggle_verified_state);
     });
 };
+
+function init() {
+    init_state_icons(document);
+};
+
+/**
+ * The admin user table. Only the first page is rendered by the
+ * server. Every page lives in its own tbody. The next page is
+ * requested, when the end of the table comes into view. Pages far
+ * outside of the view are replaced by an empty row of the same
+ * height and restored from the page cache, when they are scrolled
+ * back. So the number of rows in the document stays the same, no
+ * matter how many users exist.
+ *
+ * @param {jQuery} $table The table element
+ */
+function init_user_table($table) {
+    var $first = $table.find("tbody[dc-page=0]");
+    var table = {
+        $table: $table,
+        url: $table.attr("dc-page-url"),
+        pageSize: parseInt($table.attr("dc-page-size")),
+        hasMore: $table.attr("dc-has-more") === "true",
+        loading: false,
+        scheduled: false,
+        // The page cache. The html of a page is kept, while its
+        // rows are removed from the document.
+        pages: [{
+            $body: $first,
+            offset: 0,
+            count: $first.children("tr").length,
+            userIds: user_ids($first),
+            html: null,
+            height: 0
+        }],
+        // The ids of the selected users. The selection survives,
+        // while the page of a user is removed from the document.
+        selected: new Set()
+    };
+
+    var schedule = function() {
+        if (!table.scheduled) {
+            table.scheduled = true;
+            window.requestAnimationFrame(() => {
+                table.scheduled = false;
+                update_user_table(table);
+            });
+        }
+    };
+
+    $(window).on("scroll resize", schedule);
+    init_user_selection(table);
+    update_user_table(table);
+}
+
+function update_user_table(table) {
+    var screen = window.innerHeight;
+    var kept = screen * USER_TABLE_KEPT_SCREENS;
+
+    table.pages.forEach((page) => {
+        var rect = page.$body[0].getBoundingClientRect();
+        var near = rect.bottom > -kept && rect.top < screen + kept;
+
+        if (near && page.html !== null) {
+            page.$body.html(page.html);
+            page.html = null;
+            init_state_icons(page.$body);
+            restore_user_selection(table, page.$body);
+        } else if (!near && page.html === null) {
+            page.height = rect.height;
+            page.html = page.$body.html();
+            page.$body.html(
+                '<tr class="dc-spacer"><td colspan="8" style="padding: 0; height: '
+                + page.height + 'px;"></td></tr>');
+        }
+    });
+
+    var last = table.pages[table.pages.length - 1];
+    var bottom = last.$body[0].getBoundingClientRect().bottom;
+    if (table.hasMore && !table.loading && bottom < screen * (1 + USER_TABLE_PRELOAD_SCREENS)) {
+        load_user_page(table, last.offset + last.count);
+    }
+}
+
+async function load_user_page(table, offset) {
+    var url = new URL(table.url, window.location);
+    url.searchParams.append('offset', offset);
+    url.searchParams.append('count', table.pageSize);
+
+    table.loading = true;
+    try {
+        var data = await fetch(url, {
+                method: 'GET',
+                mode: 'same-origin',
+                cache: 'default',
+                credentials: 'same-origin',
+                headers: {
+                    'Accept': 'application/json'
+                },
+                redirect: 'follow',
+                referrer: 'no-referrer'
+            })
+            .then(response => {
+                if (response.status == 200) {
+                    return response.json();
+                }
+                throw new Error(response.statusText);
+            });
+
+        table.hasMore = data.has_more;
+        if (data.count > 0) {
+            var $body = $('<tbody></tbody>')
+                .attr("dc-page", table.pages.length)
+                .html(data.html);
+            table.$table.append($body);
+            init_state_icons($body);
+            if ($("#dc-select-all").prop("checked")) {
+                user_ids($body).forEach((user_id) => table.selected.add(user_id));
+                update_user_selection(table);
+            }
+            restore_user_selection(table, $body);
+            table.pages.push({
+                $body: $body,
+                offset: data.offset,
+                count: data.count,
+                userIds: user_ids($body),
+                html: null,
+                height: 0
+            });
+        }
+    } catch (error) {
+        console.log(error);
+        table.hasMore = false;
+    } finally {
+        table.loading = false;
+    }
+
+    // The page may not fill the screen yet.
+    update_user_table(table);
+}
+
+function user_ids($container) {
+    return $container.find("input[dc-select-user]").map(function() {
+        return $( this ).attr("dc-select-user");
+    }).get();
+}
+
+/**
+ * Selection of users and the bulk actions for the selected
+ * users. A bulk action is sent as a single batch request, no
+ * matter how many users are selected.
+ */
+function init_user_selection(table) {
+    table.$table.on("change", "input[dc-select-user]", function() {
+        var user_id = $( this ).attr("dc-select-user");
+        if ($( this ).prop("checked")) {
+            table.selected.add(user_id);
+        } else {
+            table.selected.delete(user_id);
+        }
+        update_user_selection(table);
+    });
+
+    // Selects all loaded users, including the pages
+    // outside of the view.
+    $("#dc-select-all").change(function() {
+        var checked = $( this ).prop("checked");
+        table.pages.forEach((page) => {
+            page.userIds.forEach((user_id) => {
+                if (checked) {
+                    table.selected.add(user_id);
+                } else {
+                    table.selected.delete(user_id);
+                }
+            });
+        });
+        table.$table.find("input[dc-select-user]").prop("checked", checked);
+        update_user_selection(table);
+    });
+
+    $("[dc-bulk-action]").click(function(event) {
+        event.preventDefault();
+        if (table.selected.size > 0) {
+            run_bulk_action(table, $( this ).attr("dc-bulk-action"), $( this ).attr("dc-bulk-mode"));
+        }
+    });
+
+    update_user_selection(table);
+}
+
+function restore_user_selection(table, $container) {
+    $container.find("input[dc-select-user]").each(function() {
+        $( this ).prop("checked", table.selected.has($( this ).attr("dc-select-user")));
+    });
+}
+
+function update_user_selection(table) {
+    var count = table.selected.size;
+    $("[dc-bulk-action]").toggleClass("disabled", count == 0);
+    $("#dc-selected-count").text(count > 0 ? count + " selected" : "");
+}
+
+async function run_bulk_action(table, funcName, mode) {
+    var user_ids = Array.from(table.selected);
+    var $buttons = $("[dc-bulk-action]");
+    $buttons.addClass("disabled");
+
+    try {
+        var results = await DigiCubes.setUsersState(user_ids, funcName, mode);
+        var failed = 0;
+        results.forEach((result) => {
+            if (result.status == 200) {
+                set_user_state(table, funcName, result.data.user_id, result.data.state);
+            } else {
+                failed++;
+                console.log(result.text);
+            }
+        });
+        if (failed > 0) {
+            M.toast({html: failed + " of " + results.length + " users could not be updated."});
+        }
+    } catch (error) {
+        console.log(error);
+        M.toast({html: "The users could not be updated."});
+    } finally {
+        update_user_selection(table);
+    }
+}
+
+/**
+ * Updates the state icon of a user. For pages outside of the
+ * view only the cached html is updated.
+ */
+function set_user_state(table, funcName, user_id, state) {
+    var states = funcName == "USER_SET_ACTIVE_STATE"
+        ? ["active", "inactive"]
+        : ["verified", "unverified"];
+    var selector = "td[dc-user-id=" + user_id + "][dc-state=" + states[0] + "], "
+        + "td[dc-user-id=" + user_id + "][dc-state=" + states[1] + "]";
+    var new_state = state === true ? states[0] : states[1];
+
+    table.pages.forEach((page) => {
+        if (page.userIds.indexOf(String(user_id)) < 0) {
+            return;
+        }
+
+        if (page.html === null) {
+            var $cell = page.$body.find(selector);
+            $cell.attr("dc-state", new_state);
+            $cell.html({
+                "active": active_html,
+                "inactive": inactive_html,
+                "verified": verified_html,
+                "unverified": unverified_html
+            }[new_state]);
+        } else {
+            var $cached = $("<tbody></tbody>").html(page.html);
+            $cached.find(selector).attr("dc-state", new_state);
+            page.html = $cached.html();
+        }
+    });
+}
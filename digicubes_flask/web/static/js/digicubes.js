@@ -167,6 +167,53 @@ DigiCubes.toggleUserVerifiedState = async function(user_id) {
     });
 }
 
+/**
+ * Sets the active or verified state of a user to the given state
+ * with a single request. Resolves to the response with the ``status``
+ * and the ``data`` containing the new ``state`` and ``modified_at``
+ * of the user.
+ *
+ * @param {Number} user_id The id of the user
+ * @param {String} funcName USER_SET_ACTIVE_STATE or USER_SET_VERIFIED_STATE
+ * @param {Boolean} state The new state
+ */
+DigiCubes.setUserState = async function(user_id, funcName, state) {
+    data = {
+        "user_id" : user_id,
+        "mode" : state ? "on" : "off"
+    };
+    return DigiCubes.adminRFC("PUT", funcName, data);
+}
+
+// The maximum number of calls the server accepts in a single batch
+DigiCubes.MAX_BATCH_SIZE = 500;
+
+/**
+ * Sets the active or verified state of many users with as few
+ * requests as possible. Every request contains at most
+ * MAX_BATCH_SIZE calls. Resolves to the results in the order of
+ * the user ids.
+ *
+ * @param {Array} user_ids The ids of the users
+ * @param {String} funcName USER_SET_ACTIVE_STATE or USER_SET_VERIFIED_STATE
+ * @param {String} mode on, off or toggle
+ */
+DigiCubes.setUsersState = async function(user_ids, funcName, mode) {
+    var calls = user_ids.map((user_id) => {
+        return {
+            "name" : funcName,
+            "data" : { "user_id" : parseInt(user_id), "mode" : mode }
+        };
+    });
+
+    var results = [];
+    for (var start = 0; start < calls.length; start += DigiCubes.MAX_BATCH_SIZE) {
+        var batch = calls.slice(start, start + DigiCubes.MAX_BATCH_SIZE);
+        results = results.concat(await DigiCubes.adminBatchRFC("PUT", batch));
+    }
+    return results;
+}
+
 DigiCubes.getSchoolCoursesInfo = async function(school_id) {
     data = {
         "school_id" : school_id 
@@ -178,6 +225,23 @@ DigiCubes.getSchoolCoursesInfo = async function(school_id) {
     });
 }
 
+/**
+ * Requests the course info of several schools with a single
+ * request. Resolves to an object mapping the school ids to
+ * their course info.
+ */
+DigiCubes.getSchoolsCoursesInfo = async function(school_ids) {
+    return DigiCubes.adminRFC(
+        "PUT", "SCHOOLS_GET_COURSE_INFO", { "school_ids" : school_ids })
+    .then((response_data) => {
+        result = {}
+        response_data.data.schools.forEach((info) => {
+            result[info.school_id] = info;
+        });
+        return result;
+    });
+}
+
 DigiCubes.toggleUserRole = async function(user_id, role_id, operation = "toggle") {
     return DigiCubes.adminRFC(
         "PUT", "USER_TOGGLE_ROLE",
@@ -191,6 +255,22 @@ DigiCubes.toggleUserRole = async function(user_id, role_id, operation = "toggle"
     });
 }
 
+/**
+ * Executes a list of rfc calls with a single request. Every call is
+ * an object with the function ``name`` and its ``data``. Resolves to
+ * the list of responses in the order of the calls. Each response has
+ * a ``status``, a ``text`` and the ``data`` of the call.
+ */
+DigiCubes.adminBatchRFC = async function(method, calls) {
+    return DigiCubes.adminRFC(method, "BATCH", { "calls" : calls })
+    .then((response_data) => {
+        if (response_data.status != 200) {
+            throw Error(response_data.text);
+        }
+        return response_data.data.results;
+    });
+}
+
 DigiCubes.adminRFC = async function(method, funcName, data) {
     return fetch('/admin/rfc/', {
         method: method,
@@ -63,9 +63,11 @@ def materialize_input(field: Field, **kwargs):
         "name": field_id,
         "type": field_type,
         "class": "validate",
-        "required": "",
     }
 
+    if kwargs.get("required", True):
+        attributes["required"] = ""
+
     if field.data is not None and kwargs.get("value", True):
         attributes["value"] = escape(field.data)
 
@@ -91,6 +93,33 @@ def materialize_input(field: Field, **kwargs):
     return "".join(html)
 
 
+def materialize_file(field: Field, **kwargs):
+    """
+    A widget for the materialize file input.
+    """
+    field_id = kwargs.pop("id", field.id)
+
+    attributes = {"id": field_id, "name": field_id, "type": "file"}
+    if "accept" in kwargs:
+        attributes["accept"] = kwargs["accept"]
+
+    grid = kwargs.get("grid", "")
+    outer_params = {"class": f"file-field input-field col {grid}"}
+
+    html = [f"<div {html_params(**outer_params)}>"]
+    html.append(f"<div class='btn light-blue lighten-1'><span>{ escape(field.label.text) }</span>")
+    html.append(f"<input {html_params(**attributes)}></input></div>")
+    html.append("<div class='file-path-wrapper'>")
+    html.append("<input class='file-path validate' type='text'></input></div>")
+    if len(field.errors) > 0:
+        error_text = ", ".join(field.errors)
+        attributes = {"class": "red-text"}
+        html.append(f"<span { html_params(**attributes) }>{ error_text }</span>")
+    html.append("</div>")
+
+    return "".join(html)
+
+
 def materialize_textarea(field: Field, **kwargs):
     """
     A widget for the materialize textarea.
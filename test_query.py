@@ -0,0 +1,79 @@
+import pytest
+
+from digicubes_flask.client.service.filter import FilterFunction, Query
+
+
+def test_filter_functions():
+    assert FilterFunction.from_name("icontains") == FilterFunction.ICONTAINS
+    assert FilterFunction.from_name("EQUALS") == FilterFunction.EQUALS
+    assert str(FilterFunction.ISTARTSWITH) == "istartswith"
+    assert FilterFunction.EQUALS.build("login") == "login"
+    assert FilterFunction.ENDSWITH.build("login") == "login__endswith"
+
+    with pytest.raises(ValueError):
+        FilterFunction.from_name("like")
+
+
+def test_filter_keywords():
+    query = Query().filter(login__istartswith="adm", is_active=True)
+    assert query.build() == {"f": "login,3,adm:is_active,0,True"}
+
+
+def test_filter_unknown_function():
+    with pytest.raises(ValueError):
+        Query().filter(login__like="adm")
+
+
+@pytest.mark.parametrize(
+    "attribute, value",
+    [("login", "a,b"), ("login", "a:b"), ("lo,gin", "a"), ("lo:gin", "a")],
+)
+def test_add_filter_rejects_separators(attribute, value):
+    query = Query()
+    with pytest.raises(ValueError):
+        query.add_filter(attribute, FilterFunction.EQUALS, value)
+    assert query.build() == {}
+
+
+@pytest.mark.parametrize("offset, limit", [(-1, 10), (0, 0), (5, -1)])
+def test_page_rejects_invalid_values(offset, limit):
+    with pytest.raises(ValueError):
+        Query().page(offset, limit)
+
+
+def test_page_and_limit():
+    assert Query().page(offset=20, limit=10).build() == {"p": "10:20"}
+    assert Query().limit(5).build() == {"p": "5:0"}
+
+
+def test_specials():
+    query = Query().count().first().count()
+    assert query.is_count
+    assert query.is_first
+    assert query.build() == {"s": "count,first"}
+    assert not Query().is_count
+
+
+def test_columns():
+    assert Query().selected_columns is None
+    query = Query().columns("id", "login")
+    assert query.selected_columns == ["id", "login"]
+    assert query.build() == {"c": "id,login"}
+
+
+def test_build():
+    query = (
+        Query()
+        .filter(login__istartswith="adm", is_active=True)
+        .order_by("last_name", "-first_name")
+        .columns("id", "login")
+        .page(offset=0, limit=20)
+    )
+    assert query.build() == {
+        "f": "login,3,adm:is_active,0,True",
+        "o": "last_name,-first_name",
+        "c": "id,login",
+        "p": "20:0",
+    }
+    assert query._asdict() == query.build()
+    assert repr(query) == f"Query({query.build()!r})"